@@ -1,260 +1,98 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from flask import (
+    Flask, Request, request, jsonify, render_template, redirect, url_for, g, has_request_context, Response,
+    stream_with_context
+)
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import pdfplumber
 import requests
+import hashlib
 import io
+import json
 import os
 import re
+import tempfile
+import time
 import transformers
 import logging
-from transformers import TFAutoModelForTokenClassification, AutoTokenizer, pipeline, TFRobertaForSequenceClassification, RobertaTokenizer
 import tensorflow as tf
 import ekstraktor
+import jobs
+import metrics
+from ner_decoder import ner_entities
+from model_loader import ModelSlot, ModelUnavailable, start_slots, ready, INFERENCE_BACKEND, MODEL_LOADING
+from onnx_backend import ONNX_VARIANT
+from models import (
+    id2label, classification_model_path, classification_weights_path, ner_model_path, ner_weights_path,
+    load_ner, load_classification,
+    predict_probabilities, predict_windows, aggregate_windows, WINDOW_AGGREGATIONS
+)
+from inference_pool import InferencePool, InferenceBusy, INFERENCE_THREADS, INFERENCE_RETRY_AFTER
+from batcher import MicroBatcher
+from write_behind import WriteBehindBuffer
+from prediction_cache import PredictionCache, weights_fingerprint, normalize_for_key
+from extract_cache import ExtractCache
+from ekstraksi import (
+    _normalize_text, _extract_nomor, _extract_pemohon_termohon, _extract_pemohon_termohon_sources,
+    _extract_pdf_fields, _spool_upload, UploadTooLarge, EXTRACT_MAX_UPLOAD_MB, EXTRACTOR_VERSION, GAZETTEER
+)
 import warnings
 import webbrowser
+import threading
+import uuid
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from threading import Timer
 from typing import List, Tuple, Pattern
+from sqlalchemy import select, insert, update, case, inspect, event, text as sql_text, table, column
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Minimal log noise
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
 
-# Hindari TensorFlow menggunakan semua thread CPU
-tf.config.threading.set_intra_op_parallelism_threads(1)
+# Hindari TensorFlow menggunakan semua thread CPU (INFERENCE_THREADS, default 1)
+tf.config.threading.set_intra_op_parallelism_threads(INFERENCE_THREADS)
 tf.config.threading.set_inter_op_parallelism_threads(1)
 
 # Hindari crash akibat alokasi memori besar
 os.environ["TF_FORCE_GPU_ALLOW_GROWTH"] = "true"
 
+# ==== batas ukuran body request ====
+# Dicek Werkzeug dari Content-Length (atau saat stream chunked melewati batas) SEBELUM body dibaca,
+# jadi upload kebesaran ditolak 413 tanpa di-buffer dulu. Batas umum = EXTRACT_MAX_UPLOAD_MB
+# (+1 MB untuk overhead multipart); /api/jobs/extract boleh sebesar satu ZIP (JOBS_MAX_ZIP_MB).
+UPLOAD_FORM_OVERHEAD = 1024 * 1024
+UPLOAD_LIMITS = {
+    'api_create_extract_job': int(max(jobs.JOBS_MAX_ZIP_MB, EXTRACT_MAX_UPLOAD_MB) * 1024 * 1024) + UPLOAD_FORM_OVERHEAD,
+}
+
+class UploadLimitedRequest(Request):
+    @property
+    def max_content_length(self):
+        return UPLOAD_LIMITS.get(self.endpoint, super().max_content_length)
+
 app = Flask(__name__)
+app.request_class = UploadLimitedRequest
+app.config['MAX_CONTENT_LENGTH'] = int(EXTRACT_MAX_UPLOAD_MB * 1024 * 1024) + UPLOAD_FORM_OVERHEAD
 CORS(app)
 
 transformers.logging.set_verbosity_error()
 logging.getLogger('tensorflow').setLevel(logging.ERROR)
 warnings.filterwarnings("ignore", category=ResourceWarning)
 
-# Define the directory to save PDF files
+# Define the directory to save PDF files (sekarang berisi cache hasil ekstraksi, lihat extract_cache.py)
 SAVE_DIRECTORY = 'pdfFile'
 os.makedirs(SAVE_DIRECTORY, exist_ok=True)
 
 # Database configuration
 print("Connecting to database...")
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://ananthayullian:1234@db:5432/classification_db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'postgresql://ananthayullian:1234@db:5432/classification_db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
-# ==== regex dasar ====
-ROMAN = r"[IVXLCDM]+"
-
-NOMOR_REGEX = re.compile(
-    rf"(?:Nomor(?:\s+Registrasi)?\s*[:;]?\s*)"
-    rf"([0-9]{{2,4}}\s*/\s*{ROMAN}(?:\s*/\s*[A-Z-]+)*\s*/\s*\d{{4}}|[0-9A-Z/\-]{{6,}})",
-    flags=re.IGNORECASE
-)
-
-# === label tegas & generik (tanpa duplikasi) ===
-NAMA_PEMOHON_LABEL   = re.compile(r"(?mi)^\s*Nama\s+Pemohon\s*:\s*(\S.+)$")
-NAMA_TERMOHON_STRICT = re.compile(r"(?mi)^\s*Nama\s+Termohon\s*:\s*(\S.+)$")
-GENERIC_NAMA         = re.compile(r"(?mi)^\s*Nama\s*:\s*(\S.+)$")  # dipakai HANYA saat scanning per-blok
-
-# === judul blok ===
-PEMOHON_MARK     = re.compile(r"(?mi)^\s*PEMOHON\s*$")
-TERMOHON_MARK    = re.compile(r"(?mi)^\s*TERMOHON\s*$")
-TERHADAP_MELAWAN = re.compile(r"(?mi)^\s*(TERHADAP|MELAWAN)\b")
-
-# --- stopwords tetap dipakai agar tidak menangkap kuasa/perwakilan ---
-PEMOHON_STOP = re.compile(
-    r"(?i)\b(Kuasa( Hukum)?|Advokat|Pengacara|Lawyer|Paralegal|Selaku|"
-    r"yang bertindak untuk dan atas nama|bertindak untuk dan atas nama|"
-    r"untuk dan atas nama|Perwakilan|Wali|Alamat|Berkedudukan di)\b"
-)
-
-# === narasi termohon ===
-NARASI_TERMOHON = re.compile(
-    r"(?is)(?:^|\n)\s*(?:Terhadap|Melawan)\s*:?\s*(.+?)"
-    r"(?:\n\s*Selanjutnya\s+disebut\s+sebagai\s+Termohon\b|\n\s*TERMOHON\b|\n\s*PEMOHON\b|\n\n|$)"
-)
-
-# === kamus badan publik & penanda nama orang ===
-ORG_HINT = re.compile(
-    r"\b("
-    r"PT\s+.*Persero|BUMN|BUMD|Perum|Perseroan|"
-    r"Kementerian|Kemen\w+|Direktorat\s+Jenderal|Ditjen|Sekretariat|"
-    r"Pemerintah|Pemprov|Pemkot|Pemkab|Provinsi|Kabupaten|Kota|Kecamatan|Kelurahan|"
-    r"Komisi|Komisi\s+Informasi|Badan|Dinas|Inspektorat|Bappeda|BPN|BPJS|BPK|BPKP|"
-    r"Kejaksaan|Kejari|Kejati|Kepolisian|Polri|TNI|Mahkamah|Pengadilan|"
-    r"Universitas|Institut|Politeknik|Sekolah\s+Tinggi|"
-    r"RSUD|Rumah\s+Sakit|Puskesmas|PDAM|PLN|Pertamina|Telkom"
-    r")\b", re.IGNORECASE
-)
-
-PERSON_HINT = re.compile(
-    r"\b(Dr\.?|Dra\.?|Ir\.?|H\.|Hj\.?|Bapak|Ibu|Sdr\.?|Sdri\.?)\b|"
-    r"\b(S\.E\.|S\.H\.|S\.Kom\.?|S\.Si\.?|M\.H\.?|M\.Si\.?)\b",
-    re.IGNORECASE
-)
-# header blok (kalau suatu saat ikut tercapture ke dalam blok)
-HEADER_MARK = re.compile(r"(?mi)^\s*(PEMOHON|TERMOHON)\s*:?\s*$")
-
-# perluas daftar label yang harus dilewati jika sendirian
-LABEL_WORDS = {
-    "nama", "nama pemohon", "nama termohon",  # ← tambahkan ini
-    "alamat", "jabatan", "kuasa", "badan publik", "kedudukan hukum",
-    "pemohon", "termohon"                     # ← dan ini (jaga-jaga)
-}
-
-# ==== util ====
-def _normalize_text(s: str) -> str:
-    if not s: return ""
-    s = (s.replace("\xa0"," ").replace("\u00A0"," ").replace("\uf0b7"," ")
-           .replace("•"," ").replace("●"," ").replace("：",":").replace("–","-").replace("—","-"))
-    s = re.sub(r"(\w)-\n(\w)", r"\1\2", s)  # gabung kata terpotong
-    s = s.replace("\r","")
-    s = re.sub(r"[ \t]+", " ", s)
-    s = re.sub(r"\s*:\s*", ": ", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    return s.strip()
-
-def _clean_value(v: str) -> str:
-    if not v: return ""
-    v = v.strip(" .;,")
-    # buang label yang ikut tercapture
-    v = re.sub(r"(?i)^\s*Nama(?:\s+(Pemohon|Termohon))?\s*:?\s*", "", v).strip(" .;,")
-    # buang “Selanjutnya disebut …”
-    v = re.sub(r"(?is)\bSelanjutnya\s+disebut\s+sebagai\s+.*$", "", v).strip(" .;,")
-    return re.sub(r"\s{2,}", " ", v)
-
-def _extract_block(text: str, start_pat: Pattern, end_pats: List[Pattern]) -> str:
-    m = start_pat.search(text)
-    if not m: return ""
-    start = m.end()
-    ends = [ep.search(text, start).start() for ep in end_pats if ep.search(text, start)]
-    end = min(ends) if ends else len(text)
-    return text[start:end].strip()
-
-def _first_nonlabel_line(block: str) -> str:
-    for line in block.splitlines():
-        if HEADER_MARK.match(line):        # ← lewati "PEMOHON"/"TERMOHON"
-            continue
-        L = _clean_value(line)
-        if not L: 
-            continue
-        if L.lower() in LABEL_WORDS:       # ← lewati "nama", "pemohon", dst (tanpa isi)
-            continue
-        if re.match(r"(?i)^\s*Nama(?:\s+(Pemohon|Termohon))?\s*:?\s*$", line.strip()):
-            continue
-        return L
-    return ""
-
-def _pick_pemohon_line(block: str) -> str:
-    for line in block.splitlines():
-        if HEADER_MARK.match(line):        # ← lewati header blok
-            continue
-        L = _clean_value(line)
-        if not L:
-            continue
-        if L.lower() in LABEL_WORDS:       # ← lewati label sendirian
-            continue
-        if re.match(r"(?i)^\s*Nama(?:\s+(Pemohon|Termohon))?\s*:?\s*$", line.strip()):
-            continue
-        if PEMOHON_STOP.search(L):
-            continue
-        return L
-    return ""
-
-def _pick_public_body_line(snippet: str) -> str:
-    # cari baris “instansi” (bukan nama orang)
-    for line in snippet.splitlines():
-        L = _clean_value(line)
-        if L and ORG_HINT.search(L) and not PERSON_HINT.search(L):
-            return L
-    # berikutnya: baris pertama yang bukan nama orang
-    for line in snippet.splitlines():
-        L = _clean_value(line)
-        if L and not PERSON_HINT.search(L):
-            return L
-    # fallback
-    return _first_nonlabel_line(snippet)
-
-def _first_group(regex: Pattern, s: str) -> str:
-    m = regex.search(s)
-    return _clean_value(m.group(1)) if m else ""
-
-# === scanner “Nama:” generik berbasis blok ===
-def _scan_generic_nama_by_block(text: str) -> Tuple[str, str]:
-    pemohon, termohon = "", ""
-    current = None
-    for raw in text.splitlines():
-        line = raw.strip()
-        if PEMOHON_MARK.match(line):  current = 'PEMOHON';  continue
-        if TERMOHON_MARK.match(line): current = 'TERMOHON'; continue
-        if not current:               continue
-
-        m = GENERIC_NAMA.match(raw)
-        if not m: continue
-        val = _clean_value(m.group(1))
-        if not val: continue
-
-        if current == 'PEMOHON' and not pemohon:
-            pemohon = val  # ← TIDAK difilter org/person
-            continue
-        if current == 'TERMOHON' and not termohon:
-            # tetap wajib badan publik
-            termohon = _pick_public_body_line(val)
-    return _clean_value(pemohon), _clean_value(termohon)
-
-
-# ==== ekstraksi field utama ====
-def _extract_nomor(text: str) -> str:
-    m = NOMOR_REGEX.search(text)
-    if not m: return ""
-    nomor = re.sub(r"\s+", "", m.group(1))
-    return re.sub(r"[.;,]+$", "", nomor)
-
-def _extract_pemohon_termohon(text: str) -> Tuple[str, str]:
-    # 0) label spesifik global
-    pemohon  = _first_group(NAMA_PEMOHON_LABEL,   text)
-    termohon = _first_group(NAMA_TERMOHON_STRICT, text)
-
-    # 1) “Nama:” generik tapi HANYA jika berada di dalam blok
-    if not pemohon or not termohon:
-        p2, t2 = _scan_generic_nama_by_block(text)
-        if not pemohon and p2:   pemohon = p2
-        if not termohon and t2:  termohon = t2
-
-    # 2) blok PEMOHON / TERMOHON (tanpa label)
-    if not pemohon:
-        pb = _extract_block(text, PEMOHON_MARK, [TERHADAP_MELAWAN, TERMOHON_MARK])
-        if pb:
-            pemohon = _pick_pemohon_line(pb)  # ← menerima orang ATAU organisasi
-    if not termohon:
-        tb = _extract_block(text, TERMOHON_MARK, [PEMOHON_MARK, TERHADAP_MELAWAN])
-        if tb:
-            termohon = _pick_public_body_line(tb)
-
-    # 3) narasi TERHADAP/MELAWAN … (Termohon) & “diajukan oleh …” (Pemohon)
-    if not termohon:
-        m = NARASI_TERMOHON.search(text)
-        if m:
-            termohon = _pick_public_body_line(m.group(1))
-    if not pemohon:
-        m = re.search(r"(?is)diajukan\s+oleh\s*:?\s*(.+?)(?:\bSelanjutnya\b|\bPemohon\b|\n\n|$)", text)
-        if m:
-            pemohon = _clean_value(m.group(1).splitlines()[0])
-
-    # 4) kebersihan akhir & aturan KIP
-    pemohon  = _clean_value(pemohon)
-    termohon = _clean_value(termohon)
-
-    # Termohon tak boleh nama orang
-    if termohon and PERSON_HINT.search(termohon):
-        termohon = ""
-    # Anti-dobel
-    if pemohon and termohon and pemohon.lower() == termohon.lower():
-        termohon = ""
-
-    return pemohon, termohon
-
 # Define the ClassificationResult model
 class ClassificationResult(db.Model):
     __tablename__ = 'classification_result'
@@ -263,64 +101,215 @@ class ClassificationResult(db.Model):
     predicted_category = db.Column(db.Text, nullable=True)
     corrected_category = db.Column(db.Text, nullable=True)
     validated_category = db.Column(db.Text, nullable=True)
+    # sha256 teks (spasi dinormalisasi): "teks ini sudah pernah dilabeli?" cukup lookup index
+    text_hash = db.Column(db.String(64), nullable=True, index=True)
+
+    # partial index untuk antrean validasi (dikoreksi, belum divalidasi): /api/validasi-data
+    # cukup index scan urut id, tanpa seq scan seluruh tabel
+    __table_args__ = (
+        db.Index('ix_classification_result_pending_validation', 'id',
+                 postgresql_where=db.and_(corrected_category.isnot(None), validated_category.is_(None))),
+    )
+
+# Job ekstraksi PDF massal (antrean di tabel ini, tanpa broker eksternal)
+class ExtractionJob(db.Model):
+    __tablename__ = 'extraction_job'
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(16), nullable=False, default='queued', index=True)  # queued/running/done/failed
+    total_files = db.Column(db.Integer, nullable=False, default=0)
+    processed_files = db.Column(db.Integer, nullable=False, default=0)
+    failed_files = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)  # heartbeat worker: diklaim + tiap potongan hasil disimpan
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class ExtractionJobFile(db.Model):
+    __tablename__ = 'extraction_job_file'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('extraction_job.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.Text, nullable=False)
+    path = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending/done/error
+    nomor = db.Column(db.Text, nullable=True)
+    pemohon = db.Column(db.Text, nullable=True)
+    termohon = db.Column(db.Text, nullable=True)
+    termohon_id = db.Column(db.String(64), nullable=True, index=True)  # id gazetteer badan publik (dedup)
+    pages_read = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+# Hasil proses ulang arsip (backfill.py): satu baris per dokumen arsip, ditimpa tiap kali arsip
+# diproses ulang dengan versi ekstraktor/bobot baru. Ditulis massal (COPY), bukan lewat ORM.
+class ArchiveResult(db.Model):
+    __tablename__ = 'archive_result'
+    doc_key = db.Column(db.Text, primary_key=True)  # path absolut file arsip / id teks di manifest
+    kind = db.Column(db.String(8), nullable=False, index=True)  # pdf / text
+    # pdf: sha256 byte file (sama dengan kunci cache ekstraksi); text: text_hash (sama dengan classification_result)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    version = db.Column(db.String(64), nullable=False)
+    nomor = db.Column(db.Text, nullable=True)
+    pemohon = db.Column(db.Text, nullable=True)
+    termohon = db.Column(db.Text, nullable=True)
+    termohon_id = db.Column(db.String(64), nullable=True, index=True)
+    pages_read = db.Column(db.Integer, nullable=True)
+    predicted_category = db.Column(db.Text, nullable=True)
+    predicted_detail_category = db.Column(db.Text, nullable=True)
+    confidence = db.Column(db.Float, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    processed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 print("Database connected successfully...")
 
-# Define the paths for saving/loading
-ner_model_path = "pretrainedModel/BERT"
-ner_tokenizer_path = "pretrainedModel/BERT"
-classification_model_path = "pretrainedModel/ROBERTA"
-classification_tokenizer_path = "pretrainedModel/ROBERTA"
+# ==== metrik latensi (METRICS_ENABLED, default 1) ====
+# GET /metrics -> format teks Prometheus, lihat metrics.py. Per request: histogram latensi per
+# endpoint + hitungan per status; per query & commit Postgres: tahap db_query / db_commit.
+# PROFILE_SLOW_MS > 0: request lebih lama dari itu (atau header X-Profile: 1) disimpan sebagai
+# folded stacks di PROFILE_DIRECTORY.
+if metrics.METRICS_ENABLED:
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _query_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _query_end(conn, cursor, statement, parameters, context, executemany):
+        metrics.observe("stage_seconds", time.perf_counter() - conn.info["query_start"].pop(), stage="db_query")
+
+    @event.listens_for(Session, "before_commit")
+    def _commit_start(session):
+        session.info["commit_start"] = time.perf_counter()
+
+    @event.listens_for(Session, "after_commit")
+    def _commit_end(session):
+        t0 = session.info.pop("commit_start", None)
+        if t0 is not None:
+            metrics.observe("stage_seconds", time.perf_counter() - t0, stage="db_commit")
+
+@app.before_request
+def request_metrics_start():
+    g.request_start = time.perf_counter()
+    if metrics.profiler is not None:
+        g.profile_ident = metrics.profiler.begin()
+
+@app.after_request
+def request_metrics(response):
+    elapsed = time.perf_counter() - g.pop("request_start", time.perf_counter())
+    endpoint = request.endpoint or "unmatched"
+    metrics.observe("http_request_seconds", elapsed, endpoint=endpoint)
+    metrics.inc("http_requests_total", endpoint=endpoint, status=response.status_code)
+    ident = g.pop("profile_ident", None)
+    if ident is not None:
+        samples = metrics.profiler.end(ident)
+        if elapsed * 1000.0 >= metrics.PROFILE_SLOW_MS or request.headers.get("X-Profile") == "1":
+            try:
+                metrics.profiler.dump(samples, endpoint, elapsed * 1000.0)
+            except OSError as e:
+                print(f"Profile for {endpoint} not written ({e})")
+    return response
+
+@app.teardown_request
+def request_profile_cleanup(exc):
+    # request yang gagal dengan exception tidak lewat after_request
+    ident = g.pop("profile_ident", None)
+    if ident is not None:
+        metrics.profiler.end(ident)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# ==== pool proses inferensi (opsional, INFERENCE_WORKERS>0) ====
+# Kalau aktif, model TIDAK dimuat di proses gunicorn: NER & klasifikasi dijalankan di proses
+# inferensi terpisah (lihat inference_pool.py). Waktu tunggu antrean & waktu proses per request
+# dikirim balik lewat header Server-Timing.
+inference_pool = InferencePool()
+
+# Batas waktu per request dari front end async (asgi.py: environ "sipsi.deadline", time.monotonic()).
+# Tanpa front end async -> None (pakai INFERENCE_TIMEOUT).
+def _deadline_remaining():
+    deadline = request.environ.get("sipsi.deadline") if has_request_context() else None
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+def _pool_call(kind, chunks, batch_size):
+    results = inference_pool.map(kind, chunks, batch_size, timeout=_deadline_remaining())
+    if has_request_context():
+        # potongan diproses paralel -> yang dihitung potongan paling lama
+        g.setdefault("inference_timings", []).append(
+            (max(r.queue_wait_ms for r in results), max(r.service_ms for r in results)))
+    return [v for r in results for v in r.value]
+
+@app.after_request
+def inference_server_timing(response):
+    timings = g.pop("inference_timings", None)
+    if timings:
+        response.headers["Server-Timing"] = "inference-queue;dur={:.1f}, inference;dur={:.1f}".format(
+            sum(t[0] for t in timings), sum(t[1] for t in timings))
+    return response
 
 # NER model setup
-print("Loading NER model...")
-id2label = {0: 'B-CRD', 1: 'B-DAT', 2: 'B-EVT', 3: 'B-FAC', 4: 'B-GPE', 5: 'B-LAN', 6: 'B-LAW', 7: 'B-LOC', 8: 'B-MON', 9: 'B-NOR', 10: 'B-ORD', 11: 'B-ORG', 12: 'B-PER', 13: 'B-PRC', 14: 'B-PRD', 15: 'B-QTY', 16: 'B-REG', 17: 'B-TIM', 18: 'B-WOA', 19: 'I-CRD', 20: 'I-DAT', 21: 'I-EVT', 22: 'I-FAC', 23: 'I-GPE', 24: 'I-LAN', 25: 'I-LAW', 26: 'I-LOC', 27: 'I-MON', 28: 'I-NOR', 29: 'I-ORD', 30: 'I-ORG', 31: 'I-PER', 32: 'I-PRC', 33: 'I-PRD', 34: 'I-QTY', 35: 'I-REG', 36: 'I-TIM', 37: 'I-WOA', 38: 'O'}
-label2id = {v: k for k, v in id2label.items()}
-
-# Load or save the NER model and tokenizer
-try:
-    verificationModel = TFAutoModelForTokenClassification.from_pretrained(ner_model_path, num_labels=39, id2label=id2label, label2id=label2id)
-    tokenizer = AutoTokenizer.from_pretrained(ner_tokenizer_path)
-    print("NER model loaded successfully from local storage.")
-except:
-    pretrainedBert = 'indolem/indobert-base-uncased'
-    verificationModel = TFAutoModelForTokenClassification.from_pretrained(pretrainedBert, num_labels=39, id2label=id2label, label2id=label2id, from_pt=True)
-    tokenizer = AutoTokenizer.from_pretrained(pretrainedBert)
-    verificationModel.save_pretrained(ner_model_path)
-    tokenizer.save_pretrained(ner_tokenizer_path)
-    print("NER model downloaded and saved locally.")
-
-verificationModel.load_weights("NER-INDO/INDO-NER-weights")
-
-# NER pipeline (lazy init biar nggak duplikasi & ringan)
-ner_pipeline = None
-def get_ner():
-    global ner_pipeline
-    if ner_pipeline is None:
-        # grouped_entities=True biar output lebih rapi ke ekstraktor
-        try:
-            from transformers import pipeline
-            ner_pipeline = pipeline("ner", tokenizer=tokenizer, model=verificationModel, grouped_entities=True)
-        except Exception:
-            ner_pipeline = None
-    return ner_pipeline
+# Model dimuat lewat model_loader (paralel/lazy, artefak siap-muat, tanpa download di production);
+# path, label & loader ada di models.py
+def _warmup_ner(loaded):
+    ner_entities(["Budi Santoso", "Dinas Komunikasi dan Informatika Provinsi Jawa Barat"],
+                 loaded.model, loaded.tokenizer, id2label)
+
+ner_slot = ModelSlot("ner", load_ner, _warmup_ner)
+
+# === OPTIONAL: gunakan NER + ekstraktor kamu untuk "polishing" ===
+# Input/output: list (pemohon, termohon). Semua string (dari satu atau banyak dokumen)
+# dijalankan langsung ke model NER per batch, tanpa HF pipeline; tag BIO didekode
+# di ner_decoder.py ke format {"entity", "word"} yang dibaca ekstraktor.
+# Kalau model (belum siap)/antrean inferensi penuh/ekstraktor gagal, hasil regex tetap dipakai.
+def polish_parties(pairs):
+    return _polish_parties(pairs)[0]
+
+def _polish_parties(pairs):
+    # -> (hasil, NER benar-benar jalan?); hasil fallback regex tidak boleh masuk cache ekstraksi
+    polished = [list(p) for p in pairs]
+    ner_ok = False
+    try:
+        pem_idx = [i for i, (p, _) in enumerate(pairs) if p]
+        ter_idx = [i for i, (_, t) in enumerate(pairs) if t]
+        if not (pem_idx or ter_idx):
+            return [tuple(p) for p in polished], True
+        texts = [pairs[i][0] for i in pem_idx] + [pairs[i][1] for i in ter_idx]
+        with metrics.stage("ner"):
+            if inference_pool.enabled:
+                entities = _pool_call("ner", [texts], jobs.JOBS_NER_BATCH)
+            else:
+                ner = ner_slot.get()
+                entities = ner_entities(texts, ner.model, ner.tokenizer, id2label, batch_size=jobs.JOBS_NER_BATCH)
+        ner_ok = True
+
+        for k, i in enumerate(pem_idx):
+            try:
+                names = ekstraktor.extract_names(entities[k])
+                if names:
+                    polished[i][0] = " ".join(names)
+            except Exception:
+                pass
+        for k, i in enumerate(ter_idx, start=len(pem_idx)):
+            try:
+                orgs = ekstraktor.extract_organization(entities[k])
+                if orgs:
+                    polished[i][1] = " ".join(orgs)
+            except Exception:
+                pass
+    except Exception:
+        pass
+    return [tuple(p) for p in polished], ner_ok
 
 
 # Classification model setup
-print("Loading classification model...")
-try:
-    recomendationModel = TFRobertaForSequenceClassification.from_pretrained(classification_model_path, num_labels=13)
-    roberta_tokenizer = RobertaTokenizer.from_pretrained(classification_tokenizer_path)
-    print("Classification model loaded successfully from local storage.")
-except:
-    pretrainedRoberta = 'cahya/roberta-base-indonesian-522M'
-    recomendationModel = TFRobertaForSequenceClassification.from_pretrained(pretrainedRoberta, num_labels=13)
-    roberta_tokenizer = RobertaTokenizer.from_pretrained(pretrainedRoberta)
-    recomendationModel.save_pretrained(classification_model_path)
-    roberta_tokenizer.save_pretrained(classification_tokenizer_path)
-    print("Classification model downloaded and saved locally.")
-
-recomendationModel.load_weights('SavedWeight/Roberta Weight Run 4.1')
+def _warmup_classification(loaded):
+    # bentuk (batch, token) yang umum: satu teks pendek, satu batch micro-batcher, satu teks maksimal
+    for batch, length in [(1, 64), (CLASSIFY_MAX_BATCH, 128), (1, 512)]:
+        inputs = loaded.tokenizer(["informasi publik"] * batch, padding="max_length", truncation=True,
+                                  max_length=length, return_tensors="tf")
+        loaded.model(inputs.data)
+
+classification_slot = ModelSlot("classification", load_classification, _warmup_classification)
 
 category_mapping = {
     0: {"category": "Kategori 1", "detail_category":"Pasal 9 ayat (2) UU Nomor 14 Tahun 2008", "pasal": "Informasi yang Wajib Disediakan dan Diumumkan Secara Berkala", "informasi": "INFORMASI YANG WAJIB DISEDIAKAN DAN DIUMUMKAN"},
@@ -338,13 +327,90 @@ category_mapping = {
     12: {"category": "Kategori 9", "detail_category":"Pasal 17 poin f UU Nomor 14 Tahun 2008", "pasal": "Informasi Publik yang apabila dibuka dan diberikan kepada Pemohon Informasi Publik, dapat merugikan kepentingan hubungan luar negeri", "informasi": "INFORMASI YANG DIKECUALIKAN"}
 }
 
+def text_hash(text):
+    return hashlib.sha256(normalize_for_key(text).encode("utf-8")).hexdigest()
+
+# Rekap feedback per teks (per text_hash); baris lama tanpa hash baru ikut setelah backfill-text-hash
+FEEDBACK_COUNTS_VIEW = 'classification_feedback_counts'
+FEEDBACK_COUNTS_SQL = '''
+SELECT text_hash,
+       COUNT(*) AS total,
+       COUNT(predicted_category) AS predicted,
+       COUNT(corrected_category) AS corrected,
+       COUNT(validated_category) AS validated,
+       MAX(id) AS last_id
+FROM classification_result
+WHERE text_hash IS NOT NULL
+GROUP BY text_hash
+'''
+feedback_counts = table(FEEDBACK_COUNTS_VIEW, column('text_hash'), column('total'), column('predicted'),
+                        column('corrected'), column('validated'), column('last_id'))
+
+def _ensure_feedback_schema():
+    # create_all tidak menambah kolom/index ke tabel yang sudah ada; worker lain bisa saja
+    # menjalankan DDL yang sama bersamaan, jadi semuanya idempoten
+    postgres = db.engine.dialect.name == 'postgresql'
+    if 'text_hash' not in {c['name'] for c in inspect(db.engine).get_columns('classification_result')}:
+        with db.engine.begin() as conn:
+            conn.execute(sql_text('ALTER TABLE classification_result ADD COLUMN '
+                                  + ('IF NOT EXISTS ' if postgres else '') + 'text_hash VARCHAR(64)'))
+    for index in ClassificationResult.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        create = 'CREATE OR REPLACE VIEW' if postgres else 'CREATE VIEW IF NOT EXISTS'
+        conn.execute(sql_text(f'{create} {FEEDBACK_COUNTS_VIEW} AS {FEEDBACK_COUNTS_SQL}'))
+
+def _ensure_job_schema():
+    # kolom yang ditambahkan belakangan; baris lama tetap NULL
+    #   extraction_job_file.termohon_id (gazetteer badan publik), extraction_job.updated_at (heartbeat)
+    postgres = db.engine.dialect.name == 'postgresql'
+    for table, column, ddl in (('extraction_job_file', 'termohon_id', 'VARCHAR(64)'),
+                               ('extraction_job', 'updated_at', 'TIMESTAMP')):
+        if column not in {c['name'] for c in inspect(db.engine).get_columns(table)}:
+            with db.engine.begin() as conn:
+                conn.execute(sql_text(f'ALTER TABLE {table} ADD COLUMN '
+                                      + ('IF NOT EXISTS ' if postgres else '') + f'{column} {ddl}'))
+    for index in ExtractionJobFile.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+
 with app.app_context():
     db.create_all()
+    try:
+        _ensure_feedback_schema()
+    except Exception as e:
+        print(f"Feedback schema update skipped ({e})")
+    try:
+        _ensure_job_schema()
+    except Exception as e:
+        print(f"Job schema update skipped ({e})")
+
+# Migrasi satu kali untuk baris yang dibuat sebelum kolom text_hash ada:
+#   MODEL_LOADING=lazy flask --app app backfill-text-hash
+# Diproses per potongan id (keyset), satu commit per potongan; aman diulang/dihentikan di tengah.
+@app.cli.command('backfill-text-hash')
+def backfill_text_hash_command():
+    total, last_id = 0, 0
+    while True:
+        rows = (db.session.query(ClassificationResult.id, ClassificationResult.text)
+                .filter(ClassificationResult.id > last_id, ClassificationResult.text_hash.is_(None))
+                .order_by(ClassificationResult.id).limit(1000).all())
+        if not rows:
+            break
+        db.session.execute(update(ClassificationResult), [{"id": i, "text_hash": text_hash(t)} for i, t in rows])
+        db.session.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+        print(f"text_hash backfilled for {total} rows (last id {last_id})")
+    print(f"Done, {total} rows updated.")
 
 def classify_texts(kalimat):
-    inputs = roberta_tokenizer(kalimat, padding=True, truncation=True, return_tensors="tf")
-    outputs = recomendationModel(inputs.data)
-    predictions = tf.nn.softmax(outputs.logits, axis=-1)
+    classifier = classification_slot.get()
+    with metrics.stage("tokenize", model="roberta"):
+        inputs = classifier.tokenizer(kalimat, padding=True, truncation=True, return_tensors="tf")
+    metrics.inc("tokens_processed_total", int(tf.reduce_sum(inputs["attention_mask"])), model="roberta")
+    with metrics.stage("forward", model="roberta"):
+        outputs = classifier.model(inputs.data)
+        predictions = tf.nn.softmax(outputs.logits, axis=-1)
     predicted_classes = tf.argmax(predictions, axis=1).numpy()
     predicted_categories = [category_mapping[pred]['category'] for pred in predicted_classes]
     predicted_detail_categories = [category_mapping[pred]['detail_category'] for pred in predicted_classes]
@@ -352,6 +418,158 @@ def classify_texts(kalimat):
     predicted_informasi = [category_mapping[pred]['informasi'] for pred in predicted_classes]
     return predicted_categories, predicted_detail_categories, predicted_pasals, predicted_informasi, predictions.numpy()
 
+# ==== micro-batching untuk /api/classify ====
+# Request klasifikasi yang datang bersamaan digabung jadi satu forward pass RoBERTa.
+# CLASSIFY_MAX_BATCH=1 praktis mematikan batching.
+CLASSIFY_MAX_BATCH = int(os.environ.get("CLASSIFY_MAX_BATCH", "16"))
+CLASSIFY_BATCH_WINDOW_MS = float(os.environ.get("CLASSIFY_BATCH_WINDOW_MS", "10"))
+
+def _classify_probabilities(texts):
+    return list(classify_texts(texts)[4])
+
+classify_batcher = MicroBatcher(_classify_probabilities, max_batch_size=CLASSIFY_MAX_BATCH,
+                                max_wait_ms=CLASSIFY_BATCH_WINDOW_MS, name="classify-batcher")
+
+# ==== cache prediksi ====
+# Kunci ikut identitas model + bobot, jadi begitu bobot diganti cache lama otomatis tidak dipakai.
+# PREDICTION_CACHE_PATH kosong = hanya cache memori. Tier disk dibatasi PREDICTION_CACHE_DISK_SIZE
+# baris (LRU, 0 = tanpa batas), supaya file SQLite tidak tumbuh tanpa batas.
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_PATH = os.environ.get("PREDICTION_CACHE_PATH", "")
+PREDICTION_CACHE_DISK_SIZE = int(os.environ.get("PREDICTION_CACHE_DISK_SIZE", "100000"))
+
+prediction_cache = PredictionCache(
+    weights_fingerprint(classification_model_path, classification_weights_path)
+    + ("" if INFERENCE_BACKEND == "tf" else f"-{INFERENCE_BACKEND}-{ONNX_VARIANT}"),
+    max_entries=PREDICTION_CACHE_SIZE,
+    disk_path=PREDICTION_CACHE_PATH,
+    disk_entries=PREDICTION_CACHE_DISK_SIZE or None
+)
+
+def _prediction_result(probabilities):
+    pred = int(max(range(len(probabilities)), key=lambda k: probabilities[k]))
+    return {
+        "predicted_category": category_mapping[pred]['category'],
+        "predicted_detail_category": category_mapping[pred]['detail_category'],
+        "predicted_pasal": category_mapping[pred]['pasal'],
+        "informasi": category_mapping[pred]['informasi'],
+        "confidence": float(probabilities[pred]),
+        "probabilities": {category_mapping[k]['category']: float(p) for k, p in enumerate(probabilities)}
+    }
+
+def classify_cached(text):
+    probabilities = prediction_cache.get(text)
+    if probabilities is None and inference_pool.enabled:
+        # pool menggabungkan request yang antre bersamaan di proses inferensinya sendiri
+        probabilities = _pool_call("classification", [[text]], CLASSIFY_BATCH_SIZE)[0]
+        prediction_cache.put(text, probabilities)
+    elif probabilities is None:
+        probabilities = [float(p) for p in classify_batcher(text)]
+        prediction_cache.put(text, probabilities)
+    return probabilities
+
+# ==== klasifikasi massal (bucket per panjang token, lihat models.predict_probabilities) ====
+CLASSIFY_BATCH_SIZE = int(os.environ.get("CLASSIFY_BATCH_SIZE", "32"))
+CLASSIFY_BATCH_MAX_TEXTS = int(os.environ.get("CLASSIFY_BATCH_MAX_TEXTS", "5000"))
+
+def predict_bucketed(texts, batch_size=CLASSIFY_BATCH_SIZE):
+    if not inference_pool.enabled:
+        return predict_probabilities(classification_slot.get(), texts, batch_size)
+    # dibagi rata ke semua proses inferensi; tiap potongan tetap di-bucket di prosesnya
+    size = max(batch_size, -(-len(texts) // inference_pool.workers))
+    return _pool_call("classification", [texts[i:i + size] for i in range(0, len(texts), size)], batch_size)
+
+def classify_texts_bucketed(texts, batch_size=CLASSIFY_BATCH_SIZE):
+    # hanya teks yang belum ada di cache (dan unik) yang masuk model
+    probabilities = [prediction_cache.get(t) for t in texts]
+    pending = {}
+    for i, p in enumerate(probabilities):
+        if p is None:
+            pending.setdefault(texts[i], []).append(i)
+    if pending:
+        unique = list(pending)
+        for t, p in zip(unique, predict_bucketed(unique, batch_size)):
+            prediction_cache.put(t, p)
+            for i in pending[t]:
+                probabilities[i] = p
+
+    return [dict(index=i, **_prediction_result(p)) for i, p in enumerate(probabilities)]
+
+# ==== klasifikasi dokumen panjang (jendela geser) ====
+# Teks > 512 token tidak dipotong: dipecah jadi jendela LONGDOC_MAX_LENGTH token yang tumpang-tindih
+# LONGDOC_STRIDE token, jendela semua dokumen dijalankan bersama per batch, lalu probabilitasnya
+# digabung (mean / max / attention, lihat models.aggregate_windows).
+LONGDOC_MAX_LENGTH = int(os.environ.get("LONGDOC_MAX_LENGTH", "512"))
+LONGDOC_STRIDE = int(os.environ.get("LONGDOC_STRIDE", "128"))
+LONGDOC_MAX_WINDOWS = int(os.environ.get("LONGDOC_MAX_WINDOWS", "64"))
+LONGDOC_AGGREGATION = os.environ.get("LONGDOC_AGGREGATION", "mean")
+LONGDOC_TEMPERATURE = float(os.environ.get("LONGDOC_TEMPERATURE", "0.1"))
+LONGDOC_MAX_TEXTS = int(os.environ.get("LONGDOC_MAX_TEXTS", "50"))
+
+def classify_long_documents(texts, aggregation=LONGDOC_AGGREGATION):
+    options = (CLASSIFY_BATCH_SIZE, LONGDOC_MAX_LENGTH, LONGDOC_STRIDE, LONGDOC_MAX_WINDOWS)
+    if inference_pool.enabled:
+        documents = _pool_call("classification_windows", [texts], options)
+    else:
+        documents = predict_windows(classification_slot.get(), texts, batch_size=options[0],
+                                    max_length=options[1], stride=options[2], max_windows=options[3])
+    results = []
+    for i, doc in enumerate(documents):
+        windows = doc["windows"]
+        probabilities, weights = aggregate_windows([w["probabilities"] for w in windows], aggregation,
+                                                   LONGDOC_TEMPERATURE)
+        evidence = []
+        for k, (w, weight) in enumerate(zip(windows, weights)):
+            window_result = _prediction_result(w["probabilities"])
+            evidence.append({
+                "window": k,
+                "token_start": w["token_start"],
+                "token_end": w["token_end"],
+                "excerpt": w["excerpt"],
+                "predicted_category": window_result["predicted_category"],
+                "confidence": window_result["confidence"],
+                "weight": round(weight, 6)
+            })
+        results.append(dict(
+            index=i,
+            **_prediction_result(probabilities),
+            aggregation=aggregation,
+            tokens=doc["tokens"],
+            truncated=bool(windows) and windows[-1]["token_end"] < doc["tokens"],
+            windows=evidence
+        ))
+    return results
+
+# ==== startup & health ====
+# /healthz: proses hidup (liveness). /readyz: model siap melayani (readiness), 503 selama loading.
+@app.errorhandler(ModelUnavailable)
+def model_unavailable(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '10'}
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    limit_mb = (request.max_content_length - UPLOAD_FORM_OVERHEAD) / (1024 * 1024)
+    return jsonify({'error': f'Request is too large (max {limit_mb:g} MB)!'}), 413
+
+@app.errorhandler(InferenceBusy)
+def inference_busy(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': INFERENCE_RETRY_AFTER}
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if inference_pool.enabled:
+        is_ready = inference_pool.ready()
+        return jsonify({"ready": is_ready, "inference_workers": inference_pool.status()}), 200 if is_ready else 503
+    is_ready = ready(ner_slot, classification_slot)
+    return jsonify({
+        "ready": is_ready,
+        "models": {"ner": ner_slot.status(), "classification": classification_slot.status()}
+    }), 200 if is_ready else 503
+
 # Route for serving the index.html
 @app.route('/')
 @app.route('/index')
@@ -368,22 +586,57 @@ def validasi():
 def verifikasi():
     return render_template('verifikasi.html')
 
-# API to get all validation data
+# API data yang menunggu validasi (dikoreksi, belum divalidasi)
+# Paginasi keyset: ?after_id=<id terakhir>&limit=<n> -> header X-Next-After-Id kalau masih ada.
+# Tanpa limit: semua data, diambil per VALIDASI_CHUNK baris (keyset) dan di-stream sebagai satu
+# array JSON, jadi memori worker tetap kecil berapa pun jumlah barisnya.
+VALIDASI_CHUNK = int(os.environ.get("VALIDASI_CHUNK", "500"))
+VALIDASI_MAX_LIMIT = 1000
+
+def _pending_validation_query(after_id, limit):
+    # dipakai juga oleh asgi.py (driver async)
+    return (select(ClassificationResult.id, ClassificationResult.text, ClassificationResult.corrected_category)
+            .where(ClassificationResult.corrected_category.isnot(None),
+                   ClassificationResult.validated_category.is_(None),
+                   ClassificationResult.id > after_id)
+            .order_by(ClassificationResult.id).limit(limit))
+
+def _pending_validation(after_id, limit):
+    return db.session.execute(_pending_validation_query(after_id, limit)).all()
+
+def _validasi_json(row):
+    row_id, text, corrected_category = row
+    return json.dumps({"id": row_id, "text": text, "corrected_category": corrected_category})
+
+def _stream_json_array(rows):
+    yield "["
+    for i, row in enumerate(rows):
+        yield ("," if i else "") + _validasi_json(row)
+    yield "]"
+
 @app.route('/api/validasi-data', methods=['GET'])
 def api_validasi_data():
-    results = ClassificationResult.query.filter(
-        ClassificationResult.corrected_category.isnot(None),
-        ClassificationResult.validated_category.is_(None)
-    ).all()
-    result_data = [
-        {
-            "id": result.id,
-            "text": result.text,
-            "corrected_category": result.corrected_category
-        }
-        for result in results
-    ]
-    return jsonify(result_data)
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    headers = {}
+
+    if limit is not None:
+        limit = min(max(1, limit), VALIDASI_MAX_LIMIT)
+        rows = _pending_validation(after_id, limit + 1)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers['X-Next-After-Id'] = str(rows[-1][0])
+    else:
+        def chunks(last_id):
+            while True:
+                chunk = _pending_validation(last_id, VALIDASI_CHUNK)
+                yield from chunk
+                if len(chunk) < VALIDASI_CHUNK:
+                    return
+                last_id = chunk[-1][0]
+        rows = chunks(after_id)
+
+    return Response(stream_with_context(_stream_json_array(rows)), mimetype='application/json', headers=headers)
 
 # ===== API untuk ekstraksi nomor, pemohon, termohon (tanpa OCR) =====
 @app.route('/api/extract', methods=['POST'])
@@ -397,124 +650,529 @@ def api_extract_text():
     if not pdf_file.filename.lower().endswith('.pdf'):
         return jsonify({'error': 'File is not a PDF!'}), 400
 
-    pdf_bytes = pdf_file.read()
+    digest = hashlib.sha256()
+    try:
+        pdf_path = _spool_upload(pdf_file, int(EXTRACT_MAX_UPLOAD_MB * 1024 * 1024), digest)
+    except UploadTooLarge:
+        return jsonify({'error': f'File is too large (max {EXTRACT_MAX_UPLOAD_MB:g} MB)!'}), 413
 
-    # Baca teks dari beberapa halaman awal (tanpa OCR)
-    text = ""
+    # PDF yang sama (byte identik) sudah pernah diekstrak -> tidak perlu parsing ulang
+    key = digest.hexdigest()
+    cached = _extract_cache_get(key)
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            pages = min(6, len(pdf.pages))  # banyak putusan: identitas di 1–3
-            for i in range(pages):
-                t = pdf.pages[i].extract_text() or ""
-                text += t + "\n"
-    except Exception:
-        text = ""
+        # Baca teks halaman demi halaman (tanpa OCR), berhenti begitu field lengkap
+        fields = cached if cached is not None else _extract_pdf_fields(pdf_path)
+    finally:
+        os.unlink(pdf_path)
+    return jsonify(_extract_response(key, fields, cached)), 200
+
+# ==== cache hasil ekstraksi PDF ====
+# Kunci sha256 byte upload; versi = kode ekstraksi/ekstraktor + bobot NER (polishing ikut di-cache),
+# jadi ganti versi otomatis membuang entri lama. Disk tier di SAVE_DIRECTORY, dibagi semua worker.
+# EXTRACT_CACHE_SIZE=0 mematikan tier disk; EXTRACT_CACHE_MEMORY=0 mematikan tier memori.
+EXTRACT_CACHE_SIZE = int(os.environ.get("EXTRACT_CACHE_SIZE", "5000"))
+EXTRACT_CACHE_MEMORY = int(os.environ.get("EXTRACT_CACHE_MEMORY", "256"))
+EXTRACT_CACHE_PATH = os.environ.get("EXTRACT_CACHE_PATH", os.path.join(SAVE_DIRECTORY, "extract_cache.sqlite3"))
+
+extract_cache = ExtractCache(
+    f"{EXTRACTOR_VERSION}-{weights_fingerprint(ner_model_path, ner_weights_path)}",
+    max_entries=EXTRACT_CACHE_SIZE,
+    memory_entries=EXTRACT_CACHE_MEMORY,
+    disk_path=EXTRACT_CACHE_PATH
+)
 
-    if not text.strip():
-        # Tetap 200 agar front-end bisa bedakan "image-only" case tanpa exception
-        return jsonify({'error': 'PDF contains no extractable text (probably image-only).'}), 200
+def _extract_cache_get(key):
+    cached = extract_cache.get(key)
+    metrics.inc("extract_cache_total", result="miss" if cached is None else ("hit" if "names" in cached else "partial"))
+    return cached
+
+def _extract_response(key, fields, cached=None):
+    # fields: hasil _extract_pdf_fields atau entri cache (bentuk sama, tanpa raw_text)
+    if cached is None:
+        entry = {
+            "text": fields["text"],
+            "raw_len": len(fields["raw_text"]),
+            "nomor": fields["nomor"],
+            "pemohon": fields["pemohon"],
+            "termohon": fields["termohon"],
+            "termohon_id": fields["termohon_id"],
+            "pages_read": fields["pages_read"],
+            "early_exit": fields["early_exit"],
+        }
+    else:
+        entry = dict(cached)
 
-    raw_text = text
-    text = _normalize_text(text)
+    if not entry["text"].strip():
+        if cached is None:
+            extract_cache.put(key, entry)
+        # Tetap 200 agar front-end bisa bedakan "image-only" case tanpa exception
+        return {'error': 'PDF contains no extractable text (probably image-only).'}
+
+    # === OPTIONAL: NER + ekstraktor untuk "polishing" (lihat polish_parties) ===
+    if "names" in entry:
+        pemohon_name, termohon_name = entry["names"]
+    else:
+        # entri tanpa "names" = NER belum siap saat itu; coba polish lagi, simpan kalau sudah berhasil
+        polished, ner_ok = _polish_parties([(entry["pemohon"], entry["termohon"])])
+        pemohon_name, termohon_name = polished[0]
+        if ner_ok:
+            entry["names"] = [pemohon_name, termohon_name]
+        if cached is None or ner_ok:
+            extract_cache.put(key, entry)
+    return _extract_result(entry, pemohon_name, termohon_name, cache_hit=cached is not None)
+
+# Termohon yang dikenali gazetteer badan publik dikembalikan dengan nama kanonik + id-nya,
+# jadi "Kemenkeu RI" dan "Kementerian Keuangan Republik Indonesia" jatuh ke nilai yang sama
+def _canonical_termohon(termohon_name, termohon_id):
+    entry = GAZETTEER.get(termohon_id) if termohon_id else None
+    return (entry.canonical, entry.id) if entry else (termohon_name, None)
+
+def _extract_result(fields, pemohon_name, termohon_name, cache_hit=False):
+    termohon_name, termohon_id = _canonical_termohon(termohon_name, fields.get("termohon_id"))
+    return {
+        'Nomor': fields["nomor"] or "Not found",
+        'Pemohon': pemohon_name or "Not found",
+        'Termohon': termohon_name or "Not found",
+        'TermohonId': termohon_id,
+        'debug': {
+            'raw_len': fields["raw_len"] if "raw_len" in fields else len(fields["raw_text"]),
+            'normalized_len': len(fields["text"]),
+            'pages_read': fields["pages_read"],
+            'early_exit': fields["early_exit"],
+            'cache': "hit" if cache_hit else "miss"
+        }
+    }
 
-    nomor = _extract_nomor(text) or "Not found"
-    pemohon_name, termohon_name = _extract_pemohon_termohon(text)
+@app.route('/api/extract/stats', methods=['GET'])
+def extract_stats():
+    return jsonify(extract_cache.stats())
+
+# ==== job ekstraksi PDF massal ====
+# Tiap worker gunicorn punya satu thread dispatcher yang mengklaim job 'queued' dari tabel
+# extraction_job secara atomik, lalu menyebar file-nya ke process pool (lihat jobs.py).
+# Hasil disimpan per potongan JOBS_NER_BATCH file, sekaligus polishing NER satu batch.
+JOBS_POLL_SECONDS = float(os.environ.get("JOBS_POLL_SECONDS", "5"))
+JOBS_PAGE_LIMIT = int(os.environ.get("JOBS_PAGE_LIMIT", "100"))
+# job 'running' yang heartbeat-nya (updated_at, diperbarui tiap potongan JOBS_NER_BATCH hasil
+# disimpan) lebih lama dari ini dianggap yatim (worker yang mengklaimnya mati: OOM, SIGKILL,
+# redeploy) lalu ditandai failed. 0 = nonaktif. Cukup di atas waktu satu potongan, bukan satu job.
+JOBS_STALE_SECONDS = float(os.environ.get("JOBS_STALE_SECONDS", "1800"))
+
+_job_thread = None
+_job_thread_pid = None
+_job_wakeup = threading.Event()
+_job_thread_lock = threading.Lock()
+
+def _ensure_job_dispatcher():
+    global _job_thread, _job_thread_pid
+    with _job_thread_lock:
+        if _job_thread is None or _job_thread_pid != os.getpid() or not _job_thread.is_alive():
+            _job_thread = threading.Thread(target=_job_dispatcher_loop, name="job-dispatcher", daemon=True)
+            _job_thread_pid = os.getpid()
+            _job_thread.start()
+    _job_wakeup.set()
+
+def _job_dispatcher_loop():
+    while True:
+        job_id = None
+        try:
+            with app.app_context():
+                _reap_stale_jobs()
+                job_id = _claim_next_job()
+                if job_id:
+                    _run_extraction_job(job_id)
+        except Exception as e:
+            print(f"Job dispatcher error: {e}")
+        if not job_id:
+            _job_wakeup.wait(JOBS_POLL_SECONDS)
+            _job_wakeup.clear()
+
+def _reap_stale_jobs():
+    if JOBS_STALE_SECONDS <= 0:
+        return
+    cutoff = datetime.utcnow() - timedelta(seconds=JOBS_STALE_SECONDS)
+    # baris dari sebelum kolom updated_at ada: pakai started_at
+    heartbeat = db.func.coalesce(ExtractionJob.updated_at, ExtractionJob.started_at)
+    stale = [job_id for job_id, in db.session.query(ExtractionJob.id)
+             .filter(ExtractionJob.status == 'running', heartbeat < cutoff)]
+    for job_id in stale:
+        # UPDATE bersyarat seperti klaim: hanya satu worker yang menandai & membersihkan job ini
+        reaped = ExtractionJob.query.filter(
+            ExtractionJob.id == job_id, ExtractionJob.status == 'running', heartbeat < cutoff
+        ).update({'status': 'failed', 'finished_at': datetime.utcnow(),
+                  'error': f"Job worker stopped responding (no progress for {JOBS_STALE_SECONDS:g}s)"},
+                 synchronize_session=False)
+        db.session.commit()
+        if reaped:
+            print(f"Job {job_id} made no progress since {cutoff.isoformat()}, marked failed")
+            jobs.remove_job_files(job_id)
+
+def _claim_next_job():
+    job = ExtractionJob.query.filter_by(status='queued').order_by(ExtractionJob.created_at).first()
+    if not job:
+        return None
+    # UPDATE bersyarat: kalau worker lain lebih dulu mengklaim, rowcount = 0
+    now = datetime.utcnow()
+    claimed = ExtractionJob.query.filter_by(id=job.id, status='queued').update(
+        {'status': 'running', 'started_at': now, 'updated_at': now}, synchronize_session=False
+    )
+    db.session.commit()
+    return job.id if claimed else None
+
+def _store_job_results(job_id, batch):
+    ok = [(file_id, r) for file_id, r in batch if not r.get("error")]
+    polished = polish_parties([(r["pemohon"], r["termohon"]) for _, r in ok])
+    names = dict(zip([file_id for file_id, _ in ok], polished))
+
+    mappings = []
+    for file_id, r in batch:
+        if r.get("error"):
+            mappings.append({"id": file_id, "status": "error", "error": r["error"], "pages_read": r.get("pages_read")})
+        else:
+            pemohon, termohon = names[file_id]
+            termohon, termohon_id = _canonical_termohon(termohon, r.get("termohon_id"))
+            mappings.append({"id": file_id, "status": "done", "nomor": r["nomor"] or None,
+                             "pemohon": pemohon or None, "termohon": termohon or None,
+                             "termohon_id": termohon_id, "pages_read": r["pages_read"]})
+    db.session.bulk_update_mappings(ExtractionJobFile, mappings)
+    failed = len(batch) - len(ok)
+    ExtractionJob.query.filter_by(id=job_id).update({
+        ExtractionJob.processed_files: ExtractionJob.processed_files + len(batch),
+        ExtractionJob.failed_files: ExtractionJob.failed_files + failed,
+        ExtractionJob.updated_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
 
-    # === OPTIONAL: gunakan NER + ekstraktor kamu untuk "polishing" ===
-    # Hanya dijalankan kalau pipeline siap; kalau tidak, hasil regex sudah cukup.
+def _run_extraction_job(job_id):
+    files = (db.session.query(ExtractionJobFile.id, ExtractionJobFile.path)
+             .filter_by(job_id=job_id, status='pending').order_by(ExtractionJobFile.position).all())
+    status, error = 'done', None
     try:
-        ner = get_ner()
-        if ner and pemohon_name:
-            pemohon_entities = ner(pemohon_name)
-            # ekstraktor.py milikmu: menerima output pipeline untuk ekstraksi tipe entitas
+        pool = jobs.get_pool()
+        futures = {pool.submit(jobs.extract_file, path): file_id for file_id, path in files}
+        batch = []
+        for fut in as_completed(futures):
             try:
-                names = ekstraktor.extract_names(pemohon_entities)
-                if names:
-                    pemohon_name = " ".join(names)
-            except Exception:
-                pass
+                result = fut.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            batch.append((futures[fut], result))
+            if len(batch) >= jobs.JOBS_NER_BATCH:
+                _store_job_results(job_id, batch)
+                batch = []
+        if batch:
+            _store_job_results(job_id, batch)
+    except BrokenProcessPool as e:
+        jobs.reset_pool()
+        db.session.rollback()
+        status, error = 'failed', f"Process pool crashed: {e}"
+    except Exception as e:
+        db.session.rollback()
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+    finally:
+        jobs.remove_job_files(job_id)
+
+    # bersyarat: kalau job sudah ditandai failed oleh _reap_stale_jobs, putusan itu tidak ditimpa
+    finished = ExtractionJob.query.filter_by(id=job_id, status='running').update(
+        {'status': status, 'error': error, 'finished_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    if not finished:
+        print(f"Job {job_id} was already marked stale, final status '{status}' not written")
+
+def _job_file_result(f):
+    return {
+        "position": f.position,
+        "filename": f.filename,
+        "status": f.status,
+        "Nomor": f.nomor or ("Not found" if f.status == 'done' else None),
+        "Pemohon": f.pemohon or ("Not found" if f.status == 'done' else None),
+        "Termohon": f.termohon or ("Not found" if f.status == 'done' else None),
+        "TermohonId": f.termohon_id,
+        "pages_read": f.pages_read,
+        "error": f.error
+    }
 
-        if ner and termohon_name:
-            termohon_entities = ner(termohon_name)
-            try:
-                orgs = ekstraktor.extract_organization(termohon_entities)
-                if orgs:
-                    termohon_name = " ".join(orgs)
-            except Exception:
-                pass
-    except Exception:
-        # kalau NER/ekstraktor gagal, hasil regex tetap dipakai
-        pass
+# API untuk membuat job ekstraksi banyak PDF (atau ZIP berisi PDF)
+@app.route('/api/jobs/extract', methods=['POST'])
+def api_create_extract_job():
+    files = request.files.getlist('pdf_files')
+    if not files:
+        return jsonify({'error': 'No file in request!'}), 400
+
+    job_id = uuid.uuid4().hex
+    saved, rejected = jobs.save_uploads(files, job_id, int(EXTRACT_MAX_UPLOAD_MB * 1024 * 1024))
+    if not saved or len(saved) > jobs.JOBS_MAX_FILES:
+        jobs.remove_job_files(job_id)
+        error = 'No PDF found in request!' if not saved else f'Too many files (max {jobs.JOBS_MAX_FILES})!'
+        return jsonify({'error': error, 'rejected': [{"filename": n, "error": e} for n, e in rejected]}), 400
+
+    db.session.add(ExtractionJob(id=job_id, status='queued', total_files=len(saved)))
+    db.session.flush()
+    db.session.bulk_insert_mappings(ExtractionJobFile, [
+        {"job_id": job_id, "position": i, "filename": name, "path": path, "status": "pending"}
+        for i, (name, path) in enumerate(saved)
+    ])
+    db.session.commit()
+    _ensure_job_dispatcher()
 
     return jsonify({
-        'Nomor': nomor,
-        'Pemohon': pemohon_name or "Not found",
-        'Termohon': termohon_name or "Not found",
-        'debug': {
-            'raw_len': len(raw_text),
-            'normalized_len': len(text)
-        }
-    }), 200
+        "job_id": job_id,
+        "status": "queued",
+        "total_files": len(saved),
+        "rejected": [{"filename": n, "error": e} for n, e in rejected]
+    }), 202
+
+# API status + hasil job (paginasi via offset/limit)
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    job = db.session.get(ExtractionJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found!'}), 404
+    if job.status == 'queued':
+        _ensure_job_dispatcher()
+
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', JOBS_PAGE_LIMIT, type=int)), 1000)
+    files = (ExtractionJobFile.query.filter_by(job_id=job_id)
+             .order_by(ExtractionJobFile.position).offset(offset).limit(limit).all())
+    next_offset = offset + len(files) if offset + len(files) < job.total_files else None
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "total_files": job.total_files,
+        "processed_files": job.processed_files,
+        "failed_files": job.failed_files,
+        "progress": round(job.processed_files / job.total_files, 4) if job.total_files else 1.0,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+        "results": [_job_file_result(f) for f in files]
+    })
 
 # API to classify text
 @app.route('/api/classify', methods=['POST'])
 def classify():
     data = request.json
     text = data.get('text')
-    predicted_categories, predicted_detail_categories, predicted_pasals, predicted_informasi, _ = classify_texts([text])
+    prediction = _prediction_result(classify_cached(text))
     
     result = {
         "text": text,
-        "predicted_category": predicted_categories[0],
-        "predicted_detail_category": predicted_detail_categories[0],
-        "predicted_pasal": predicted_pasals[0],
-        "informasi": predicted_informasi[0]
+        "predicted_category": prediction["predicted_category"],
+        "predicted_detail_category": prediction["predicted_detail_category"],
+        "predicted_pasal": prediction["predicted_pasal"],
+        "informasi": prediction["informasi"]
     }
     
     return jsonify(result)
 
+# API to classify many texts at once
+@app.route('/api/classify/batch', methods=['POST'])
+def classify_batch():
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'error': 'Field "texts" must be a non-empty list!'}), 400
+    if len(texts) > CLASSIFY_BATCH_MAX_TEXTS:
+        return jsonify({'error': f'Too many texts (max {CLASSIFY_BATCH_MAX_TEXTS})!'}), 400
+    if not all(isinstance(t, str) and t.strip() for t in texts):
+        return jsonify({'error': 'Every item in "texts" must be a non-empty string!'}), 400
+
+    results = classify_texts_bucketed(texts)
+    return jsonify({"count": len(results), "results": results})
+
+# API klasifikasi dokumen panjang: {"text": ...} atau {"texts": [...]}, opsional "aggregation"
+@app.route('/api/classify/long', methods=['POST'])
+def classify_long():
+    data = request.get_json(silent=True) or {}
+    texts = data.get('texts', [data.get('text')] if 'text' in data else None)
+    aggregation = data.get('aggregation', LONGDOC_AGGREGATION)
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'error': 'Field "text" or "texts" is required!'}), 400
+    if len(texts) > LONGDOC_MAX_TEXTS:
+        return jsonify({'error': f'Too many texts (max {LONGDOC_MAX_TEXTS})!'}), 400
+    if not all(isinstance(t, str) and t.strip() for t in texts):
+        return jsonify({'error': 'Every text must be a non-empty string!'}), 400
+    if aggregation not in WINDOW_AGGREGATIONS:
+        return jsonify({'error': f'Field "aggregation" must be one of: {", ".join(WINDOW_AGGREGATIONS)}'}), 400
+
+    results = classify_long_documents(texts, aggregation)
+    if 'text' in data and 'texts' not in data:
+        return jsonify(results[0])
+    return jsonify({"count": len(results), "results": results})
+
+# Statistik antrean, ukuran batch & cache klasifikasi
+@app.route('/api/classify/stats', methods=['GET'])
+def classify_stats():
+    stats = dict(classify_batcher.stats(), cache=prediction_cache.stats())
+    if inference_pool.enabled:
+        stats["inference_pool"] = inference_pool.stats()
+    if FEEDBACK_WRITE_BEHIND_MS > 0:
+        stats["feedback_write_behind"] = feedback_buffer.stats()
+    return jsonify(stats)
+
+# ==== penulisan feedback (confirm / correct / validate) ====
+# Endpoint batch menulis semua baris dalam SATU transaksi (satu insert massal / satu UPDATE).
+# FEEDBACK_WRITE_BEHIND_MS > 0: /api/confirm & /api/correct tunggal tidak commit per request,
+# barisnya dikumpulkan dan ditulis massal tiap interval itu (lihat write_behind.py).
+FEEDBACK_BATCH_MAX = int(os.environ.get("FEEDBACK_BATCH_MAX", "5000"))
+FEEDBACK_WRITE_BEHIND_MS = float(os.environ.get("FEEDBACK_WRITE_BEHIND_MS", "0"))
+FEEDBACK_WRITE_BEHIND_MAX_ROWS = int(os.environ.get("FEEDBACK_WRITE_BEHIND_MAX_ROWS", "500"))
+FEEDBACK_WRITE_BEHIND_MAX_PENDING = int(os.environ.get("FEEDBACK_WRITE_BEHIND_MAX_PENDING", "10000"))
+FEEDBACK_WRITE_BEHIND_MAX_RETRIES = int(os.environ.get("FEEDBACK_WRITE_BEHIND_MAX_RETRIES", "5"))
+
+class FeedbackError(ValueError):
+    pass
+
+def _insert_feedback(rows):
+    with app.app_context():
+        try:
+            db.session.execute(insert(ClassificationResult), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+feedback_buffer = WriteBehindBuffer(_insert_feedback, interval_ms=FEEDBACK_WRITE_BEHIND_MS or 500,
+                                    max_rows=FEEDBACK_WRITE_BEHIND_MAX_ROWS,
+                                    max_pending=FEEDBACK_WRITE_BEHIND_MAX_PENDING,
+                                    max_retries=FEEDBACK_WRITE_BEHIND_MAX_RETRIES, name="feedback-write-behind")
+
+def _save_feedback(row):
+    if FEEDBACK_WRITE_BEHIND_MS > 0:
+        feedback_buffer.add(row)
+    else:
+        _insert_feedback([row])
+
+def _confirm_row(item):
+    text = item.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise FeedbackError('Field "text" must be a non-empty string!')
+    return {"text": text, "text_hash": text_hash(text), "predicted_category": item.get('predicted_category'),
+            "corrected_category": None, "validated_category": None}
+
+def _correct_row(item):
+    text = item.get('text')
+    if not isinstance(text, str) or not text.strip():
+        raise FeedbackError('Field "text" must be a non-empty string!')
+    try:
+        corrected_category = category_mapping[int(item.get('corrected_category'))]['category']
+    except (TypeError, ValueError, KeyError):
+        raise FeedbackError('Field "corrected_category" must be a category index (0-12)!')
+    return {"text": text, "text_hash": text_hash(text), "predicted_category": None,
+            "corrected_category": corrected_category, "validated_category": None}
+
+@app.errorhandler(FeedbackError)
+def feedback_error(e):
+    return jsonify({'error': str(e)}), 400
+
+def _batch_items():
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise FeedbackError('Field "items" must be a non-empty list!')
+    if len(items) > FEEDBACK_BATCH_MAX:
+        raise FeedbackError(f'Too many items (max {FEEDBACK_BATCH_MAX})!')
+    if not all(isinstance(item, dict) for item in items):
+        raise FeedbackError('Every item in "items" must be an object!')
+    return items
+
 # API to confirm classification
 @app.route('/api/confirm', methods=['POST'])
 def api_confirm():
-    data = request.json
-    text = data.get('text')
-    predicted_category = data.get('predicted_category')
-
-    classification_result = ClassificationResult(
-        text=text,
-        predicted_category=predicted_category
-    )
-    db.session.add(classification_result)
-    db.session.commit()
-
+    _save_feedback(_confirm_row(request.json))
     return jsonify({"message": "Classification confirmed and saved successfully!"})
 
+# API untuk konfirmasi banyak klasifikasi sekaligus: {"items": [{"text", "predicted_category"}, ...]}
+@app.route('/api/confirm/batch', methods=['POST'])
+def api_confirm_batch():
+    rows = [_confirm_row(item) for item in _batch_items()]
+    _insert_feedback(rows)
+    return jsonify({"message": "Classifications confirmed and saved successfully!", "count": len(rows)})
+
 # API to correct classification
 @app.route('/api/correct', methods=['POST'])
 def api_correct():
-    data = request.json
-    text = data.get('text')
-    corrected_category_index = int(data.get('corrected_category'))
-    corrected_category = category_mapping[corrected_category_index]['category']
-
-    classification_result = ClassificationResult(
-        text=text,
-        corrected_category=corrected_category
-    )
-    db.session.add(classification_result)
-    db.session.commit()
-
+    _save_feedback(_correct_row(request.json))
     return jsonify({"message": "Correction saved successfully!"})
 
+# API untuk koreksi banyak klasifikasi sekaligus: {"items": [{"text", "corrected_category": <index>}, ...]}
+@app.route('/api/correct/batch', methods=['POST'])
+def api_correct_batch():
+    rows = [_correct_row(item) for item in _batch_items()]
+    _insert_feedback(rows)
+    return jsonify({"message": "Corrections saved successfully!", "count": len(rows)})
+
 # API to validate corrected data
+# Form {id: kategori} (validasi.html) atau JSON {"items": [{"id", "validated_category"}, ...]}.
+# Satu UPDATE ... SET validated_category = CASE id ... WHERE id IN (...) dalam satu transaksi:
+# semua tersimpan atau tidak sama sekali.
+# id yang tidak ada dilewati seperti sebelumnya.
 @app.route('/api/validate', methods=['POST'])
 def api_validate():
-    for item_id, validated_category in request.form.items():
-        result = ClassificationResult.query.get(item_id)
-        if result:
-            result.validated_category = validated_category
-            db.session.commit()
-    return jsonify({"message": "Validation successful!"})
+    if request.is_json:
+        pairs = [(item.get('id'), item.get('validated_category')) for item in _batch_items()]
+    else:
+        pairs = list(request.form.items())
+    if len(pairs) > FEEDBACK_BATCH_MAX:
+        raise FeedbackError(f'Too many items (max {FEEDBACK_BATCH_MAX})!')
+    try:
+        pairs = {int(item_id): validated_category for item_id, validated_category in pairs}
+    except (TypeError, ValueError):
+        raise FeedbackError('Every item id must be an integer!')
+    if not pairs:
+        return jsonify({"message": "Validation successful!", "updated": 0})
+
+    try:
+        updated = db.session.execute(
+            update(ClassificationResult)
+            .where(ClassificationResult.id.in_(list(pairs)))
+            .values(validated_category=case(pairs, value=ClassificationResult.id)),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return jsonify({"message": "Validation successful!", "updated": updated})
+
+# API: apakah teks ini sudah pernah dilabeli? {"text": ...} -> rekap + label terakhir (lookup index text_hash)
+@app.route('/api/feedback/lookup', methods=['POST'])
+def api_feedback_lookup():
+    data = request.get_json(silent=True) or {}
+    text = data.get('text')
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'Field "text" must be a non-empty string!'}), 400
+
+    key = text_hash(text)
+    counts = db.session.execute(feedback_counts.select().where(feedback_counts.c.text_hash == key)).mappings().first()
+    if not counts:
+        return jsonify({"text_hash": key, "labeled": False, "total": 0, "predicted": 0, "corrected": 0, "validated": 0})
+
+    def latest(col):
+        return (db.session.query(col).filter(ClassificationResult.text_hash == key, col.isnot(None))
+                .order_by(ClassificationResult.id.desc()).limit(1).scalar())
+
+    return jsonify(dict(
+        counts,
+        labeled=True,
+        latest_predicted_category=latest(ClassificationResult.predicted_category),
+        latest_corrected_category=latest(ClassificationResult.corrected_category),
+        latest_validated_category=latest(ClassificationResult.validated_category)
+    ))
+
+if not inference_pool.enabled:
+    start_slots(ner_slot, classification_slot)
+elif MODEL_LOADING != "lazy":
+    inference_pool.start()
 
 if __name__ == '__main__':
     app.run(debug=False, host='0.0.0.0', port=3001)
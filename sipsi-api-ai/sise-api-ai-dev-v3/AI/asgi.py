@@ -0,0 +1,509 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs
+
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+import app as service
+import jobs
+import metrics
+from ekstraksi import _extract_pdf_fields, EXTRACT_MAX_UPLOAD_MB
+from inference_pool import INFERENCE_RETRY_AFTER
+
+
+# ==== front end async (ASGI) untuk route app.py ====
+# Opsional, menggantikan gunicorn sync:
+#   uvicorn asgi:application --host 0.0.0.0 --port 3001 --workers 2
+#   (atau: gunicorn -k uvicorn.workers.UvicornWorker asgi:application)
+# - Body request dibaca async di event loop, jadi upload lambat tidak memegang thread. Setelah
+#   body lengkap, request diteruskan ke app Flask yang sama di "lajur" executor per jenis route:
+#     inference -> /api/classify, /api/classify/batch, /api/classify/long  (ASYNC_INFERENCE_THREADS)
+#     upload    -> /api/jobs/extract                                       (ASYNC_UPLOAD_THREADS)
+#     light     -> route lain                                              (ASYNC_LIGHT_THREADS)
+#   Tiap lajur punya thread & batas antrean sendiri (ASYNC_LANE_QUEUE, penuh -> 503 + Retry-After),
+#   jadi route ringan tidak pernah antre di belakang route berat.
+# - POST /api/extract native: multipart di-stream ke file sementara, parsing pdfplumber di
+#   process pool (ASYNC_PDF_WORKERS), polishing NER di lajur inference.
+# - GET /api/validasi-data native lewat engine SQLAlchemy async (asyncpg, pool koneksi
+#   ASYNC_DB_POOL_SIZE); koneksi dipinjam per potongan keyset, bukan selama stream.
+# - Batas waktu per request: header X-Request-Timeout (detik), paling lama ASYNC_REQUEST_TIMEOUT.
+#   Lewat batas -> 504; client putus / batas habis -> pekerjaan yang belum mulai di lajur dibatalkan
+#   dan pool inferensi hanya diberi sisa waktu request (app._deadline_remaining).
+#   Pengecualian: stream tanpa batas (GET /api/validasi-data tanpa limit) tidak dipotong batas
+#   request begitu status 200 terkirim; batasnya berlaku per potongan. Potongan yang gagal/lewat
+#   batas memutus koneksi (body tidak diakhiri), bukan array JSON yang terpotong diam-diam.
+ASYNC_LIGHT_THREADS = int(os.environ.get("ASYNC_LIGHT_THREADS", "8"))
+ASYNC_INFERENCE_THREADS = int(os.environ.get("ASYNC_INFERENCE_THREADS", "2"))
+ASYNC_UPLOAD_THREADS = int(os.environ.get("ASYNC_UPLOAD_THREADS", "2"))
+ASYNC_PDF_WORKERS = int(os.environ.get("ASYNC_PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+ASYNC_LANE_QUEUE = int(os.environ.get("ASYNC_LANE_QUEUE", "64"))
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get("ASYNC_REQUEST_TIMEOUT", "60"))
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", "5"))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", "5"))
+ASYNC_BODY_MEMORY = 1 << 20  # body lebih besar dari ini di-spool ke disk
+
+LANE_ROUTES = {
+    "/api/classify": "inference",
+    "/api/classify/batch": "inference",
+    "/api/classify/long": "inference",
+    "/api/jobs/extract": "upload",
+}
+
+class LaneFull(RuntimeError):
+    pass
+
+class ClientDisconnected(Exception):
+    pass
+
+
+# --- lajur: executor + batas antrean; counter hanya disentuh dari thread event loop ---
+class Lane:
+    def __init__(self, name: str, workers: int, queue_size: int = ASYNC_LANE_QUEUE, processes: bool = False):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.processes = processes
+        self._executor = None
+        self.pending = 0
+        self._stats = {"submitted": 0, "rejected": 0, "cancelled": 0, "crashed": 0}
+
+    def executor(self):
+        if self._executor is None:
+            if self.processes:
+                # spawn: proses anak hanya mengimpor ekstraksi.py, tidak ikut memuat app/model
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"lane-{self.name}")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.workers + self.queue_size:
+            self._stats["rejected"] += 1
+            raise LaneFull(f"Too many pending {self.name} requests, try again later")
+        loop = asyncio.get_running_loop()
+        # lajur proses: fn dikirim apa adanya (membungkusnya dengan fungsi modul ini akan membuat
+        # proses anak ikut mengimpor app.py beserta modelnya)
+        call = (fn, *args) if self.processes else (_timed, fn, args, time.perf_counter())
+        executor = self.executor()
+        try:
+            fut = executor.submit(*call)
+        except BrokenProcessPool:
+            self.reset(executor)
+            executor = self.executor()
+            fut = executor.submit(*call)
+        self.pending += 1
+        self._stats["submitted"] += 1
+        fut.add_done_callback(lambda _: loop.call_soon_threadsafe(self._done))
+        try:
+            value = await asyncio.wrap_future(fut)
+        except asyncio.CancelledError:
+            self._stats["cancelled"] += 1
+            raise
+        except BrokenProcessPool:
+            self._stats["crashed"] += 1
+            self.reset(executor)
+            raise LaneFull(f"{self.name} worker crashed, try again later")
+        if self.processes:
+            return value
+        value, queue_seconds = value
+        metrics.observe("stage_seconds", queue_seconds, stage="lane_queue", lane=self.name)
+        return value
+
+    def _done(self):
+        self.pending -= 1
+
+    def reset(self, broken=None):
+        # Python 3.8 (image Docker) belum punya shutdown(cancel_futures=True). Lajur proses hanya
+        # di-reset setelah BrokenProcessPool (anak sudah mati), jadi shutdown_pool cepat selesai.
+        # broken = executor yang gagal; request lain yang gagal belakangan tidak ikut mematikan
+        # pool pengganti yang sudah dibuat
+        if broken is not None and broken is not self._executor:
+            return
+        if self._executor is not None:
+            if self.processes:
+                jobs.shutdown_pool(self._executor)
+            else:
+                self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def stats(self) -> dict:
+        return dict(self._stats, pending=self.pending, workers=self.workers, queue_size=self.queue_size)
+
+def _timed(fn, args, submitted):
+    queue_seconds = time.perf_counter() - submitted
+    return fn(*args), queue_seconds
+
+
+# --- pertukaran respons: hanya diubah di thread event loop, jadi timeout vs thread lajur tidak balapan ---
+class _Exchange:
+    def __init__(self, send, scope):
+        self._send = send
+        self.started = False
+        self.closed = False
+        self.streaming = False  # body tanpa batas: batas waktu request dicek per potongan oleh handler
+        self.status = None
+        self.cors = any(name == b"origin" for name, _ in scope["headers"])
+
+    async def forward(self, message) -> bool:
+        if self.closed:
+            return False
+        if message["type"] == "http.response.start":
+            self.started = True
+            self.status = message["status"]
+        await self._send(message)
+        return True
+
+    async def start(self, status: int, headers):
+        headers = list(headers)
+        if self.cors:
+            headers.append((b"access-control-allow-origin", b"*"))
+        await self.forward({"type": "http.response.start", "status": status, "headers": headers})
+
+    async def body(self, data: bytes, more: bool = False):
+        await self.forward({"type": "http.response.body", "body": data, "more_body": more})
+
+    async def json(self, status: int, payload, headers=()):
+        await self.start(status, [(b"content-type", b"application/json")] + list(headers))
+        await self.body(json.dumps(payload).encode("utf-8"))
+
+
+# --- jembatan ASGI -> WSGI: app Flask dipanggil di thread lajur ---
+def _environ(scope, body, length: int, deadline: float) -> dict:
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "sipsi.deadline": deadline,
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ["CONTENT_LENGTH"] = str(length)
+    return environ
+
+def _call_wsgi(environ: dict, exchange: _Exchange, loop):
+    def forward(message) -> bool:
+        return asyncio.run_coroutine_threadsafe(exchange.forward(message), loop).result()
+
+    response = []
+    def start_response(status, headers, exc_info=None):
+        response[:] = [int(status.split(" ", 1)[0]),
+                       [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]]
+
+    iterable = service.app(environ, start_response)
+    try:
+        started = False
+        for chunk in iterable:
+            if not chunk:
+                continue
+            if not started:
+                started = True
+                if not forward({"type": "http.response.start", "status": response[0], "headers": response[1]}):
+                    return
+            if not forward({"type": "http.response.body", "body": chunk, "more_body": True}):
+                return  # timeout / client putus: berhenti menghasilkan body
+        if not started and not forward({"type": "http.response.start", "status": response[0], "headers": response[1]}):
+            return
+        forward({"type": "http.response.body", "body": b"", "more_body": False})
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+
+async def _read_body(receive):
+    body = tempfile.SpooledTemporaryFile(max_size=ASYNC_BODY_MEMORY)
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            raise ClientDisconnected()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        body.write(chunk)
+        if not message.get("more_body"):
+            break
+    body.seek(0)
+    return body, size
+
+async def _wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+def _request_timeout(scope) -> float:
+    try:
+        requested = float(_header(scope, b"x-request-timeout"))
+    except ValueError:
+        return ASYNC_REQUEST_TIMEOUT
+    return min(max(0.0, requested), ASYNC_REQUEST_TIMEOUT)
+
+def _int_arg(args: dict, name: str, default=None):
+    # seperti request.args.get(name, default, type=int)
+    try:
+        return int(args[name][0])
+    except (KeyError, ValueError):
+        return default
+
+
+class AsyncFrontEnd:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.lanes = {
+            "light": Lane("light", ASYNC_LIGHT_THREADS),
+            "inference": Lane("inference", ASYNC_INFERENCE_THREADS),
+            "upload": Lane("upload", ASYNC_UPLOAD_THREADS),
+            "pdf": Lane("pdf", ASYNC_PDF_WORKERS, processes=True),
+        }
+        self.native = {
+            ("POST", "/api/extract"): ("api_extract_text", self._extract),
+            ("GET", "/api/validasi-data"): ("api_validasi_data", self._validasi_data),
+        }
+        self._engine = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        t0 = time.perf_counter()
+        timeout = _request_timeout(scope)
+        deadline = time.monotonic() + timeout
+        exchange = _Exchange(send, scope)
+        endpoint, handler = self.native.get((scope["method"], scope["path"]), (None, self._wsgi))
+
+        body_done = asyncio.Event()
+        async def request_receive():
+            message = await receive()
+            if message["type"] == "http.disconnect" or not message.get("more_body"):
+                body_done.set()
+            return message
+
+        task = asyncio.ensure_future(handler(scope, request_receive, exchange, deadline))
+        waiter = asyncio.ensure_future(body_done.wait())
+        await asyncio.wait({task, waiter}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        disconnected = False
+        if not task.done() and body_done.is_set():
+            # body sudah habis dibaca: sisa receive() hanya untuk mendeteksi client putus
+            watcher = asyncio.ensure_future(_wait_disconnect(receive))
+            await asyncio.wait({task, watcher}, timeout=max(0.0, deadline - time.monotonic()),
+                               return_when=asyncio.FIRST_COMPLETED)
+            watcher.cancel()
+            disconnected = watcher.done() and not watcher.cancelled()
+        if not task.done() and exchange.streaming and not disconnected:
+            watcher = asyncio.ensure_future(_wait_disconnect(receive))
+            await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            watcher.cancel()
+            disconnected = watcher.done() and not watcher.cancelled()
+
+        aborted = None
+        if not task.done():
+            task.cancel()
+            exchange.closed = True
+            if not disconnected and not exchange.started:
+                exchange.closed = False
+                await exchange.json(504, {'error': f'Request did not finish within {timeout:g}s'})
+                exchange.closed = True
+        else:
+            try:
+                task.result()
+            except ClientDisconnected:
+                pass
+            except LaneFull as e:
+                if not exchange.started:
+                    await exchange.json(503, {'error': str(e)}, [(b"retry-after", INFERENCE_RETRY_AFTER.encode())])
+            except Exception as e:
+                traceback.print_exc()
+                if not exchange.started:
+                    await exchange.json(500, {'error': 'Internal server error'})
+                else:
+                    aborted = e  # body sudah mulai terkirim: putuskan koneksi, jangan diakhiri normal
+
+        if endpoint is not None or exchange.status == 504:
+            # route lewat Flask sudah dihitung oleh after_request di app.py
+            endpoint = endpoint or "timeout"
+            metrics.observe("http_request_seconds", time.perf_counter() - t0, endpoint=endpoint)
+            metrics.inc("http_requests_total", endpoint=endpoint, status=exchange.status or 499)
+        if aborted is not None:
+            # server ASGI menutup koneksi tanpa chunk penutup -> client melihat respons tidak lengkap
+            raise aborted
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for lane in self.lanes.values():
+                    lane.reset()
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- semua route lain: body dibaca async, lalu app Flask di lajurnya ---
+    async def _wsgi(self, scope, receive, exchange, deadline):
+        body, size = await _read_body(receive)
+        lane = self.lanes[LANE_ROUTES.get(scope["path"], "light")]
+        try:
+            await lane.run(_call_wsgi, _environ(scope, body, size, deadline), exchange, asyncio.get_running_loop())
+        finally:
+            body.close()
+
+    # --- POST /api/extract ---
+    async def _extract(self, scope, receive, exchange, deadline):
+        content_type, options = parse_options_header(_header(scope, b"content-type"))
+        if content_type != "multipart/form-data" or "boundary" not in options:
+            return await exchange.json(400, {'error': 'No file in request!'})
+
+        digest = hashlib.sha256()
+        with metrics.stage("upload_spool"):
+            path, error = await self._receive_pdf(receive, options["boundary"].encode("latin-1"), digest)
+        if error:
+            return await exchange.json(*error)
+        key = digest.hexdigest()
+        try:
+            cached = await self.lanes["light"].run(service._extract_cache_get, key)
+            fields = cached if cached is not None else await self.lanes["pdf"].run(_extract_pdf_fields, path)
+        finally:
+            os.unlink(path)
+
+        # hit cache lengkap / PDF tanpa teks tidak butuh NER -> jangan antre di lajur inferensi
+        lane = "inference" if fields["text"].strip() and "names" not in fields else "light"
+        await exchange.json(200, await self.lanes[lane].run(service._extract_response, key, fields, cached))
+
+    async def _receive_pdf(self, receive, boundary: bytes, digest=None):
+        # -> (path file sementara, None) atau (None, (status, body error)); hanya field pdf_file yang disimpan
+        max_bytes = int(EXTRACT_MAX_UPLOAD_MB * 1024 * 1024)
+        decoder = MultipartDecoder(boundary, max_form_memory_size=ASYNC_BODY_MEMORY)
+        tmp, writing, size, more = None, False, 0, True
+        try:
+            while True:
+                event = decoder.next_event()
+                if isinstance(event, NeedData):
+                    if not more:
+                        break
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        raise ClientDisconnected()
+                    more = message.get("more_body", False)
+                    decoder.receive_data(message.get("body", b""))
+                    if not more:
+                        decoder.receive_data(None)
+                elif isinstance(event, File) and event.name == "pdf_file" and tmp is None:
+                    if not event.filename:
+                        return None, (400, {'error': 'No file selected!'})
+                    if not event.filename.lower().endswith('.pdf'):
+                        return None, (400, {'error': 'File is not a PDF!'})
+                    tmp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False)
+                    writing = True
+                elif isinstance(event, (File, Field)):
+                    writing = False
+                elif isinstance(event, Data) and writing:
+                    size += len(event.data)
+                    if size > max_bytes:
+                        return None, (413, {'error': f'File is too large (max {EXTRACT_MAX_UPLOAD_MB:g} MB)!'})
+                    tmp.write(event.data)
+                    if digest is not None:
+                        digest.update(event.data)
+                elif isinstance(event, Epilogue):
+                    break
+            if tmp is None:
+                return None, (400, {'error': 'No file in request!'})
+            tmp.close()
+            path, tmp = tmp.name, None
+            return path, None
+        finally:
+            if tmp is not None:  # error / client putus: buang file setengah jadi
+                tmp.close()
+                os.unlink(tmp.name)
+
+    # --- GET /api/validasi-data (paginasi & format sama dengan versi Flask) ---
+    def engine(self):
+        if self._engine is None:
+            from sqlalchemy.engine import make_url
+            from sqlalchemy.ext.asyncio import create_async_engine
+            url = make_url(service.app.config['SQLALCHEMY_DATABASE_URI'])
+            backend = url.get_backend_name()
+            driver = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}.get(backend)
+            options = ({"pool_size": ASYNC_DB_POOL_SIZE, "max_overflow": ASYNC_DB_MAX_OVERFLOW, "pool_pre_ping": True}
+                       if backend == "postgresql" else {})
+            self._engine = create_async_engine(url.set(drivername=driver) if driver else url, **options)
+        return self._engine
+
+    async def _pending(self, after_id: int, limit: int):
+        async with self.engine().connect() as conn:
+            return (await conn.execute(service._pending_validation_query(after_id, limit))).all()
+
+    async def _validasi_data(self, scope, receive, exchange, deadline):
+        args = parse_qs(scope["query_string"].decode("latin-1"))
+        after_id = _int_arg(args, 'after_id', 0)
+        limit = _int_arg(args, 'limit')
+        headers = [(b"content-type", b"application/json")]
+
+        if limit is not None:
+            limit = min(max(1, limit), service.VALIDASI_MAX_LIMIT)
+            rows = await self._pending(after_id, limit + 1)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers.append((b"x-next-after-id", str(rows[-1][0]).encode()))
+            await exchange.start(200, headers)
+            return await exchange.body("".join(service._stream_json_array(rows)).encode("utf-8"))
+
+        # tanpa limit: seluruh tabel di-stream, jadi batas waktu request berlaku per potongan keyset
+        chunk_timeout = max(0.0, deadline - time.monotonic())
+        chunk = await self._pending(after_id, service.VALIDASI_CHUNK)
+        exchange.streaming = True
+        await exchange.start(200, headers)
+        await exchange.body(b"[", more=True)
+        first, last_id = True, after_id
+        while True:
+            if chunk is None:
+                chunk = await asyncio.wait_for(self._pending(last_id, service.VALIDASI_CHUNK), chunk_timeout)
+            if chunk:
+                await exchange.body(("" if first else ",").encode() + ",".join(
+                    service._validasi_json(row) for row in chunk).encode("utf-8"), more=True)
+                first = False
+            if len(chunk) < service.VALIDASI_CHUNK:
+                break
+            last_id, chunk = chunk[-1][0], None
+        await exchange.body(b"]")
+
+    def stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+application = AsyncFrontEnd(service.app)
@@ -0,0 +1,409 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional
+
+import jobs
+
+
+# ==== proses ulang arsip offline (PDF putusan & teks permohonan) ====
+# Dipakai tiap kali kode ekstraksi / bobot NER / bobot RoBERTa berganti, sebagai ganti mengirim
+# arsip satu per satu lewat HTTP. Alur per potongan --batch dokumen:
+#   PDF : parsing + regex di process pool jobs.py (semua core) -> polishing NER satu batch
+#         -> Termohon kanonik (gazetteer)
+#   teks: klasifikasi RoBERTa per batch (bucket panjang token; tersebar ke pool inferensi kalau
+#         INFERENCE_WORKERS>0 / --inference-workers)
+#   lalu semua baris potongan ditulis sekali ke tabel archive_result: Postgres lewat COPY ke tabel
+#   staging + INSERT ... ON CONFLICT (satu commit per potongan), database lain lewat bulk insert.
+# Setelah commit, kunci dokumen dicatat di file checkpoint; run yang terputus cukup dijalankan
+# ulang dengan argumen sama. Dokumen dilewati kalau file (ukuran+mtime) dan versi
+# ekstraktor/model sama dengan yang tercatat, jadi ganti bobot = otomatis diproses ulang semua.
+#   python backfill.py /data/arsip/putusan /data/arsip/permohonan
+#   python backfill.py --manifest daftar.txt --workers 16 --inference-workers 2
+# Input: folder (rekursif, *.pdf & *.txt), file .pdf/.txt, atau manifest: satu path per baris
+# (relatif ke folder manifest) atau JSON {"id": ..., "text": ...} untuk teks tanpa file.
+BACKFILL_CHECKPOINT = os.environ.get("BACKFILL_CHECKPOINT", "backfill-checkpoint.jsonl")
+
+ARCHIVE_COLUMNS = ("doc_key", "kind", "content_hash", "version", "nomor", "pemohon", "termohon", "termohon_id",
+                   "pages_read", "predicted_category", "predicted_detail_category", "confidence", "error",
+                   "processed_at")
+
+class Document(NamedTuple):
+    kind: str                   # pdf / text
+    key: str                    # doc_key di archive_result
+    path: Optional[str]         # None untuk teks langsung dari manifest
+    signature: str              # berubah kalau isi dokumen berubah
+    text: Optional[str] = None
+
+# ==== daftar dokumen ====
+def _file_document(path: str) -> Optional[Document]:
+    # doc_key = path absolut: file bernama sama di folder arsip berbeda tidak bertabrakan, dan kunci
+    # tetap sama dari folder mana pun backfill dijalankan
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".pdf", ".txt"):
+        return None
+    st = os.stat(path)
+    return Document("pdf" if ext == ".pdf" else "text", os.path.abspath(path), path, f"{st.st_size}:{st.st_mtime_ns}")
+
+def _manifest_documents(manifest: str) -> Iterator[Document]:
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                if "text" in item:
+                    text = item["text"] or ""
+                    key = str(item.get("id") or f"{os.path.basename(manifest)}:{lineno}")
+                    yield Document("text", key, None, hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], text)
+                    continue
+                line = item["path"]
+            path = line if os.path.isabs(line) else os.path.join(base, line)
+            doc = _file_document(path)
+            if doc is None:
+                print(f"{manifest}:{lineno}: skipped {line} (not .pdf/.txt)", file=sys.stderr)
+            else:
+                yield doc
+
+def iter_documents(inputs: List[str], manifests: List[str]) -> Iterator[Document]:
+    for root in inputs:
+        if os.path.isdir(root):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    doc = _file_document(path)
+                    if doc is not None:
+                        yield doc
+        else:
+            doc = _file_document(root)
+            if doc is None:
+                raise SystemExit(f"{root}: not a directory, .pdf or .txt (use --manifest for lists)")
+            yield doc
+    for manifest in manifests:
+        yield from _manifest_documents(manifest)
+
+# ==== checkpoint ====
+class Checkpoint:
+    # file JSON lines [kind, key, signature, version], hanya ditambah setelah potongan ter-commit ke DB
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self.done = set()
+        if fresh and os.path.exists(path):
+            os.unlink(path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.add(tuple(json.loads(line)))
+                    except ValueError:
+                        pass  # baris terakhir terpotong saat proses dimatikan
+        except FileNotFoundError:
+            pass
+        self._file = open(path, "a", encoding="utf-8")
+
+    def contains(self, doc: Document, version: str) -> bool:
+        return (doc.kind, doc.key, doc.signature, version) in self.done
+
+    def add(self, docs: List[Document], version: str):
+        for doc in docs:
+            self._file.write(json.dumps([doc.kind, doc.key, doc.signature, version], ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+# ==== penulisan massal ke archive_result ====
+class ArchiveWriter:
+    def __init__(self, db, model):
+        self.db = db
+        self.model = model
+        self.postgres = db.engine.dialect.name == "postgresql"
+        self._conn = None
+        if self.postgres:
+            # satu koneksi untuk seluruh run; tabel staging sementara dikosongkan tiap commit
+            self._conn = db.engine.raw_connection()
+            with self._conn.cursor() as cur:
+                cur.execute("CREATE TEMP TABLE IF NOT EXISTS archive_result_stage "
+                            "(LIKE archive_result INCLUDING DEFAULTS) ON COMMIT DELETE ROWS")
+            self._conn.commit()
+
+    def write(self, rows: List[dict]):
+        if not rows:
+            return
+        if self.postgres:
+            self._copy(rows)
+        else:
+            self._bulk_insert(rows)
+
+    def _copy(self, rows: List[dict]):
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        for row in rows:
+            # kolom kosong tanpa tanda kutip = NULL pada COPY ... (FORMAT csv)
+            writer.writerow(["" if row.get(c) is None else row[c] for c in ARCHIVE_COLUMNS])
+        buf.seek(0)
+        columns = ", ".join(ARCHIVE_COLUMNS)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in ARCHIVE_COLUMNS if c != "doc_key")
+        try:
+            with self._conn.cursor() as cur:
+                cur.copy_expert(f"COPY archive_result_stage ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+                cur.execute(f"INSERT INTO archive_result ({columns}) SELECT {columns} FROM archive_result_stage "
+                            f"ON CONFLICT (doc_key) DO UPDATE SET {updates}")
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def _bulk_insert(self, rows: List[dict]):
+        # SQLite dkk. (dev): hapus kunci lama lalu satu INSERT executemany, satu commit
+        from sqlalchemy import delete, insert
+        session = self.db.session
+        try:
+            session.execute(delete(self.model).where(self.model.doc_key.in_([r["doc_key"] for r in rows])))
+            session.execute(insert(self.model), [{c: r.get(c) for c in ARCHIVE_COLUMNS} for r in rows])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+# ==== laporan laju ====
+class Progress:
+    def __init__(self, total: int, every: float):
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self._last = self.started
+
+    def update(self, n: int, errors: int = 0, force: bool = False):
+        self.done += n
+        self.errors += errors
+        now = time.monotonic()
+        if not force and now - self._last < self.every:
+            return
+        self._last = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        print(f"[backfill] {self.done}/{self.total} docs, {self.errors} errors, {rate:.1f} docs/s, "
+              f"elapsed {_clock(elapsed)}, eta {_clock(eta)}", file=sys.stderr, flush=True)
+
+def _clock(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+# ==== PDF ====
+# Dijalankan di proses pool jobs.py (modul ini tidak mengimpor app.py di level atas)
+def extract_archive_pdf(path: str) -> dict:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    result = jobs.extract_file(path)
+    result["content_hash"] = digest.hexdigest()
+    return result
+
+def _polish(service, pairs):
+    # dengan pool inferensi, potongan dibagi rata supaya semua proses model ikut bekerja
+    parts = max(1, min(service.inference_pool.workers, -(-len(pairs) // jobs.JOBS_NER_BATCH)))
+    if parts == 1:
+        return service._polish_parties(pairs)
+    size = -(-len(pairs) // parts)
+    with ThreadPoolExecutor(max_workers=parts) as executor:
+        results = list(executor.map(service._polish_parties, [pairs[i:i + size] for i in range(0, len(pairs), size)]))
+    return [p for polished, _ in results for p in polished], all(ok for _, ok in results)
+
+def _pdf_rows(service, batch, version: str) -> List[dict]:
+    ok = [(doc, r) for doc, r in batch if not r.get("error")]
+    polished, ner_ok = _polish(service, [(r["pemohon"], r["termohon"]) for _, r in ok])
+    if not ner_ok:
+        # hasil fallback regex tidak boleh tercatat sebagai versi ini; run ulang melanjutkan dari sini
+        raise RuntimeError("NER model is not available (check MODEL_LOADING / model folders)")
+    names = dict(zip([doc.key for doc, _ in ok], polished))
+    now = datetime.utcnow()
+    rows = []
+    for doc, r in batch:
+        row = {"doc_key": doc.key, "kind": "pdf", "content_hash": r.get("content_hash"), "version": version,
+               "pages_read": r.get("pages_read"), "error": r.get("error"), "processed_at": now}
+        if not r.get("error"):
+            pemohon, termohon = names[doc.key]
+            termohon, termohon_id = service._canonical_termohon(termohon, r.get("termohon_id"))
+            row.update(nomor=r["nomor"] or None, pemohon=pemohon or None, termohon=termohon or None,
+                       termohon_id=termohon_id)
+        rows.append(row)
+    return rows
+
+def run_pdfs(service, writer: ArchiveWriter, checkpoint: Checkpoint, docs: List[Document], version: str,
+             batch_size: int, progress: Progress):
+    pool = jobs.get_pool()
+    # antrean pool dijaga penuh selama batch sebelumnya sedang di-NER / ditulis ke DB
+    window = max(batch_size, jobs.JOBS_POOL_SIZE * 4)
+    pending = iter(docs)
+    in_flight = {}
+    batch = []
+
+    def flush():
+        rows = _pdf_rows(service, batch, version)
+        writer.write(rows)
+        checkpoint.add([doc for doc, _ in batch], version)
+        progress.update(len(batch), errors=sum(1 for r in rows if r["error"]))
+        batch.clear()
+
+    while True:
+        while len(in_flight) < window:
+            doc = next(pending, None)
+            if doc is None:
+                break
+            in_flight[pool.submit(extract_archive_pdf, doc.path)] = doc
+        if not in_flight:
+            break
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for fut in finished:
+            doc = in_flight.pop(fut)
+            try:
+                result = fut.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            batch.append((doc, result))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+# ==== teks permohonan ====
+def _read_text(doc: Document) -> str:
+    if doc.text is not None:
+        return doc.text
+    with open(doc.path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def run_texts(service, writer: ArchiveWriter, checkpoint: Checkpoint, docs: List[Document], version: str,
+              batch_size: int, classify_batch: int, progress: Progress):
+    for start in range(0, len(docs), batch_size):
+        chunk = docs[start:start + batch_size]
+        texts, errors = [], {}
+        for i, doc in enumerate(chunk):
+            try:
+                texts.append(_read_text(doc))
+            except OSError as e:
+                texts.append("")
+                errors[i] = f"{type(e).__name__}: {e}"
+        todo = [i for i, t in enumerate(texts) if t.strip() and i not in errors]
+        for i, t in enumerate(texts):
+            if i not in errors and not t.strip():
+                errors[i] = "Empty text."
+        # cache prediksi sengaja dilewati: arsip sekali lewat hanya akan mendesak entri yang sering dipakai API
+        probabilities = service.predict_bucketed([texts[i] for i in todo], classify_batch) if todo else []
+        predictions = dict(zip(todo, probabilities))
+        now = datetime.utcnow()
+        rows = []
+        for i, doc in enumerate(chunk):
+            row = {"doc_key": doc.key, "kind": "text", "version": version, "processed_at": now,
+                   "content_hash": service.text_hash(texts[i]) if i not in errors else None,
+                   "error": errors.get(i)}
+            if i in predictions:
+                prediction = service._prediction_result(predictions[i])
+                row.update(predicted_category=prediction["predicted_category"],
+                           predicted_detail_category=prediction["predicted_detail_category"],
+                           confidence=prediction["confidence"])
+            rows.append(row)
+        writer.write(rows)
+        checkpoint.add(chunk, version)
+        progress.update(len(chunk), errors=len(errors))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Proses ulang arsip PDF putusan & teks permohonan ke tabel archive_result.")
+    parser.add_argument("inputs", nargs="*", help="folder arsip (rekursif, *.pdf & *.txt) atau file .pdf/.txt")
+    parser.add_argument("--manifest", action="append", default=[],
+                        help='daftar path per baris, atau JSON {"id": ..., "text": ...}; boleh diulang')
+    parser.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT, help="file checkpoint (default BACKFILL_CHECKPOINT)")
+    parser.add_argument("--fresh", action="store_true", help="abaikan checkpoint lama, proses semua dokumen")
+    parser.add_argument("--only", choices=("pdf", "text"), help="hanya satu jenis dokumen")
+    parser.add_argument("--workers", type=int, default=jobs.JOBS_POOL_SIZE,
+                        help="proses parsing PDF (default JOBS_POOL_SIZE = jumlah core)")
+    parser.add_argument("--inference-workers", type=int,
+                        help="proses model NER/klasifikasi (set INFERENCE_WORKERS); default ikut env")
+    parser.add_argument("--batch", type=int, default=256, help="dokumen per potongan (NER, klasifikasi, commit DB)")
+    parser.add_argument("--classify-batch", type=int, help="batch forward pass RoBERTa (default CLASSIFY_BATCH_SIZE)")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="detik antar laporan docs/s")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.manifest:
+        parser.error("give at least one archive folder/file or --manifest")
+
+    # harus diset sebelum app.py di-import (pool dibuat dari env saat import)
+    if args.inference_workers is not None:
+        os.environ["INFERENCE_WORKERS"] = str(args.inference_workers)
+    jobs.JOBS_POOL_SIZE = max(1, args.workers)
+
+    docs, seen = [], set()
+    for doc in iter_documents(args.inputs, args.manifest):
+        if args.only and doc.kind != args.only:
+            continue
+        if doc.key in seen:
+            # kunci ganda (file disebut dua kali, id manifest berulang) tidak boleh masuk satu COPY
+            print(f"skipped duplicate document {doc.key}", file=sys.stderr)
+            continue
+        seen.add(doc.key)
+        docs.append(doc)
+
+    import app as service
+    if service.inference_pool.enabled:
+        service.inference_pool.start()
+    versions = {"pdf": service.extract_cache.version, "text": service.prediction_cache.model_id}
+    checkpoint = Checkpoint(args.checkpoint, fresh=args.fresh)
+    todo = {kind: [d for d in docs if d.kind == kind and not checkpoint.contains(d, versions[kind])]
+            for kind in ("pdf", "text")}
+    total = len(todo["pdf"]) + len(todo["text"])
+    print(f"[backfill] {len(docs)} documents, {len(docs) - total} already done at current version, "
+          f"{len(todo['pdf'])} pdf + {len(todo['text'])} text to process "
+          f"({jobs.JOBS_POOL_SIZE} parse workers, {service.inference_pool.workers or 'in-process'} inference)",
+          file=sys.stderr)
+
+    progress = Progress(total, args.progress_every)
+    status = 0
+    with service.app.app_context():
+        writer = ArchiveWriter(service.db, service.ArchiveResult)
+        try:
+            if todo["pdf"]:
+                run_pdfs(service, writer, checkpoint, todo["pdf"], versions["pdf"], args.batch, progress)
+            if todo["text"]:
+                run_texts(service, writer, checkpoint, todo["text"], versions["text"], args.batch,
+                          args.classify_batch or service.CLASSIFY_BATCH_SIZE, progress)
+        except KeyboardInterrupt:
+            print("[backfill] interrupted; rerun the same command to continue from the checkpoint", file=sys.stderr)
+            status = 130
+        except Exception as e:
+            print(f"[backfill] stopped: {type(e).__name__}: {e}; rerun to continue from the checkpoint",
+                  file=sys.stderr)
+            status = 1
+        finally:
+            writer.close()
+            checkpoint.close()
+            jobs.reset_pool()
+    progress.update(0, force=True)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
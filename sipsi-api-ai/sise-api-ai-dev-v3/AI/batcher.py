@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+import metrics
+from fork_reset import ForkResettable
+
+
+# ==== micro-batching dinamis ====
+# Request yang datang bersamaan (beda thread gunicorn) dikumpulkan selama
+# `max_wait_ms` atau sampai `max_batch_size`, lalu diproses dalam SATU panggilan
+# `process_batch(items)` -> list hasil dengan urutan yang sama.
+class MicroBatcher(ForkResettable):
+    def __init__(self, process_batch: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0, name: str = "batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        # dipanggil ulang setelah fork (lihat fork_reset.py); _pid diisi paling akhir
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._size_hist = {}
+        self._last_batch_ms = 0.0
+        self._pid = os.getpid()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        fut = Future()
+        self._check_fork()
+        cond = self._cond
+        with cond:
+            self._ensure_worker()
+            self._queue.append((item, fut, time.monotonic()))
+            cond.notify()
+        return fut
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # tunggu sampai window item PERTAMA habis atau batch penuh
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            t0 = time.perf_counter()
+            items = [b[0] for b in batch]
+            futures = [b[1] for b in batch]
+            try:
+                results = self.process_batch(items)
+                for fut, res in zip(futures, results):
+                    fut.set_result(res)
+            except Exception:
+                # satu input rusak jangan menggagalkan request lain di batch yang sama
+                for item, fut in zip(items, futures):
+                    try:
+                        fut.set_result(self.process_batch([item])[0])
+                    except Exception as e:
+                        fut.set_exception(e)
+            self._record(len(batch), (time.perf_counter() - t0) * 1000.0)
+
+    def _record(self, size: int, elapsed_ms: float):
+        metrics.observe("batch_size", size, batcher=self.name)
+        with self._cond:
+            self._batches += 1
+            self._items += size
+            self._max_seen = max(self._max_seen, size)
+            self._size_hist[size] = self._size_hist.get(size, 0) + 1
+            self._last_batch_ms = elapsed_ms
+
+    def stats(self) -> dict:
+        self._check_fork()
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue) if self._pid == os.getpid() else 0,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch_size_seen": self._max_seen,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._size_hist.items())},
+                "last_batch_ms": round(self._last_batch_ms, 2),
+                "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000.0},
+            }
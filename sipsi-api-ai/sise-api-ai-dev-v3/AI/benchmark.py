@@ -0,0 +1,484 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+
+# ==== benchmark offline: ekstraksi & klasifikasi ====
+# Korpus sintetis (seed tetap -> isi sama tiap run): PDF bergaya putusan (blok PEMOHON/TERMOHON,
+# label "Nama Pemohon :", narasi TERHADAP/MELAWAN & "diajukan oleh", variasi "Nomor Registrasi")
+# dan teks permohonan pendek/sedang/panjang. Tiap skenario jalan di proses spawn sendiri supaya
+# peak RSS-nya tidak tercampur skenario lain; tiap tingkat konkurensi = N thread pemanggil.
+#   python benchmark.py                                   # semua skenario, konkurensi 1,4,8
+#   python benchmark.py --scenarios pdf,classify --output hasil.json
+#   python benchmark.py --output baru.json --compare lama.json --fail-on-regression 10
+#   INFERENCE_BACKEND=onnx ONNX_SHARED_WEIGHTS=1 python benchmark.py --memory 1,2,4
+# Model: checkpoint asli kalau ada (artifacts/ atau pretrainedModel/ + SavedWeight/), selain itu
+# model pengganti kecil berbobot acak dengan arsitektur sama (RoBERTa 13 kelas, BERT NER 39 label)
+# dan tokenizer yang dilatih dari korpus sintetis. Angka dari model pengganti hanya untuk
+# membandingkan run dengan run, bukan perkiraan latensi production.
+SCENARIOS = ("normalize", "extract", "pdf", "classify", "ner")
+MODEL_SCENARIOS = ("classify", "ner")
+
+STANDIN_LAYERS = 2
+STANDIN_HIDDEN = 128
+STANDIN_HEADS = 2
+STANDIN_VOCAB = 4000
+
+
+# ==== korpus sintetis ====
+PERSONS = ["Budi Santoso", "Siti Aminah", "Ahmad Fauzi", "Dewi Lestari", "Joko Widodo", "Rina Marlina",
+           "Agus Salim, S.H.", "Dr. Hendra Gunawan", "Ibu Sri Wahyuni", "Bapak Bambang Sutrisno",
+           "Hj. Nurhayati", "Ir. Teguh Prasetyo, M.Si."]
+GROUPS = ["Perkumpulan Warga Peduli Lingkungan", "Lembaga Bantuan Hukum Masyarakat", "Yayasan Transparansi Anggaran",
+          "Forum Pemantau Kebijakan Publik"]
+BODIES = ["Dinas Pendidikan Provinsi Jawa Barat", "Pemerintah Kota Bandung", "Kementerian Keuangan Republik Indonesia",
+          "PDAM Tirta Nadi", "Badan Pertanahan Nasional Kabupaten Bogor", "RSUD Dr. Soetomo",
+          "Sekretariat Daerah Kabupaten Sleman", "Kepolisian Daerah Jawa Timur", "Universitas Negeri Semarang",
+          "Dinas Lingkungan Hidup Kota Surabaya", "Kejaksaan Negeri Medan", "Pemerintah Desa Sukamaju"]
+COMMISSIONS = ["KOMISI INFORMASI PUSAT", "KOMISI INFORMASI PROVINSI JAWA BARAT", "KOMISI INFORMASI PROVINSI DKI JAKARTA",
+               "KOMISI INFORMASI PROVINSI JAWA TIMUR"]
+ADDRESSES = ["Jl. Merdeka No. 1, Jakarta", "Jl. Diponegoro No. 22, Bandung", "Jl. Pahlawan No. 5, Surabaya",
+             "Jl. Malioboro No. 10, Yogyakarta"]
+JOBS = ["Wiraswasta", "Karyawan Swasta", "Mahasiswa", "Pegawai Negeri Sipil", "Advokat"]
+ROMANS = ["I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX", "X", "XI", "XII"]
+INFORMATION = ["salinan dokumen anggaran", "laporan realisasi belanja", "daftar penerima bantuan sosial",
+               "dokumen analisis dampak lingkungan", "kontrak pengadaan barang dan jasa", "hasil audit keuangan",
+               "rencana tata ruang wilayah", "data jumlah pegawai honorer", "surat keputusan pengangkatan pejabat",
+               "rincian dana desa", "laporan penanganan perkara", "notulen rapat pembahasan tarif"]
+FILLER = ["Menimbang bahwa Pemohon telah mengajukan permohonan informasi kepada Termohon secara tertulis",
+          "bahwa Termohon tidak memberikan tanggapan dalam jangka waktu yang ditentukan undang-undang",
+          "bahwa Majelis Komisioner telah memeriksa kedudukan hukum para pihak dan kewenangan Komisi Informasi",
+          "bahwa informasi yang dimohon merupakan informasi yang wajib disediakan dan diumumkan secara berkala",
+          "bahwa Termohon berpendapat sebagian informasi termasuk informasi yang dikecualikan",
+          "bahwa uji konsekuensi telah dilakukan sesuai Pasal 17 Undang-Undang Nomor 14 Tahun 2008",
+          "bahwa mediasi antara para pihak tidak mencapai kesepakatan sehingga dilanjutkan ke ajudikasi",
+          "Mengingat Undang-Undang Nomor 14 Tahun 2008 tentang Keterbukaan Informasi Publik"]
+REQUEST_OPENERS = ["Saya meminta", "Mohon diberikan", "Kami mengajukan permohonan untuk memperoleh",
+                   "Dengan hormat, saya bermaksud meminta", "Tolong kirimkan"]
+REQUEST_REASONS = ["untuk keperluan penelitian", "sebagai bahan pengawasan anggaran", "untuk kepentingan advokasi warga",
+                   "karena menyangkut hak atas tanah keluarga kami", "untuk kelengkapan laporan kegiatan"]
+
+def _nomor(rng: random.Random) -> str:
+    n, roman, year = rng.randint(1, 999), rng.choice(ROMANS), rng.randint(2015, 2024)
+    return rng.choice([
+        f"Nomor : {n:03d}/{roman}/KIP-PS/{year}",
+        f"Nomor Registrasi : {n:03d} / {roman} / KIP-PS-A / {year}",
+        f"NOMOR REGISTRASI: {n}/{roman}/KI-DKI-PS-M-A/{year}",
+        f"Nomor; {n}/{roman}/KI-PS/{year}",
+        f"Nomor: {rng.randint(10 ** 8, 10 ** 9 - 1)}",
+    ])
+
+def _party_lines(rng: random.Random, pemohon: str, termohon: str) -> List[str]:
+    form = rng.choice(("block", "label", "terhadap", "diajukan"))
+    if form == "block":
+        return ["PEMOHON", f"Nama : {pemohon}", f"Alamat : {rng.choice(ADDRESSES)}", f"Pekerjaan : {rng.choice(JOBS)}",
+                "Selanjutnya disebut sebagai Pemohon;", "",
+                rng.choice(("TERHADAP", "MELAWAN")), "", "TERMOHON", f"Nama : {termohon}",
+                f"Alamat : {rng.choice(ADDRESSES)}", "Selanjutnya disebut sebagai Termohon;"]
+    if form == "label":
+        return [f"Nama Pemohon : {pemohon}", f"Alamat : {rng.choice(ADDRESSES)}",
+                f"Nama Termohon : {termohon}", f"Alamat : {rng.choice(ADDRESSES)}"]
+    if form == "terhadap":
+        return ["Sengketa Informasi Publik yang diajukan oleh:", pemohon, "Selanjutnya disebut sebagai Pemohon", "",
+                rng.choice(("TERHADAP", "MELAWAN")), termohon, "Selanjutnya disebut sebagai Termohon"]
+    return [f"Permohonan ini diajukan oleh {pemohon}, selanjutnya disebut sebagai Pemohon,",
+            f"MELAWAN: {termohon}", "Selanjutnya disebut sebagai Termohon"]
+
+def _filler(rng: random.Random, sentences: int) -> List[str]:
+    lines = []
+    for _ in range(sentences):
+        sentence = f"{rng.choice(FILLER)} terkait {rng.choice(INFORMATION)};"
+        # sesekali kata dipenggal di akhir baris seperti hasil layout PDF ("infor-\nmasi")
+        while len(sentence) > 90:
+            cut = sentence.rfind(" ", 0, 90)
+            if rng.random() < 0.2 and cut > 10:
+                word_end = sentence.find(" ", cut + 1)
+                if word_end > cut + 6:
+                    split = cut + 1 + (word_end - cut - 1) // 2
+                    lines.append(sentence[:split] + "-")
+                    sentence = sentence[split:]
+                    continue
+            lines.append(sentence[:cut])
+            sentence = sentence[cut + 1:]
+        lines.append(sentence)
+    return lines
+
+def synthetic_document(rng: random.Random) -> List[List[str]]:
+    # -> halaman -> baris; identitas para pihak kadang baru ada di halaman 2
+    pemohon = rng.choice(PERSONS + GROUPS)
+    termohon = rng.choice(BODIES)
+    header = ["PUTUSAN", _nomor(rng), rng.choice(COMMISSIONS), "",
+              "DEMI KEADILAN BERDASARKAN KETUHANAN YANG MAHA ESA", ""]
+    parties = [""] + _party_lines(rng, pemohon, termohon) + [""]
+    pages = [header + _filler(rng, rng.randint(2, 6))]
+    if rng.random() < 0.3:
+        pages.append(parties + _filler(rng, rng.randint(8, 14)))
+    else:
+        pages[0] += parties
+    for _ in range(rng.randint(1, 6)):
+        pages.append(_filler(rng, rng.randint(10, 16)) + ["", f"Halaman {len(pages) + 1}"])
+    return pages
+
+def synthetic_request(rng: random.Random) -> str:
+    # panjang bervariasi: pendek (permohonan satu kalimat) s.d. panjang (terpotong di 512 token)
+    sentences = rng.choice((1, 1, 2, 4, 8, 30))
+    parts = []
+    for _ in range(sentences):
+        parts.append(f"{rng.choice(REQUEST_OPENERS)} {rng.choice(INFORMATION)} dari {rng.choice(BODIES)} "
+                     f"tahun {rng.randint(2015, 2024)} {rng.choice(REQUEST_REASONS)}.")
+    return " ".join(parts)
+
+def synthetic_corpus(seed: int, documents: int, texts: int):
+    rng = random.Random(seed)
+    docs = [synthetic_document(rng) for _ in range(documents)]
+    requests = [synthetic_request(rng) for _ in range(texts)]
+    return docs, requests
+
+def document_text(pages: List[List[str]]) -> str:
+    return "\n".join("\n".join(lines) for lines in pages) + "\n"
+
+
+# ==== PDF minimal (tanpa dependensi): satu objek teks Helvetica per halaman ====
+def _pdf_string(line: str) -> str:
+    line = line.encode("latin-1", "replace").decode("latin-1")
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def write_pdf(path: str, pages: List[List[str]]):
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"{_pdf_string(l)} Tj T*" for l in lines) + " ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+# ==== model: checkpoint asli atau pengganti berbobot acak ====
+def has_checkpoint(name: str) -> bool:
+    import models
+    from model_loader import MODEL_ARTIFACT_DIRECTORY
+    model_path, weights_path = {
+        "ner": (models.ner_model_path, models.ner_weights_path),
+        "roberta": (models.classification_model_path, models.classification_weights_path),
+    }[name]
+    return (os.path.isdir(os.path.join(MODEL_ARTIFACT_DIRECTORY, name))
+            or (os.path.isdir(model_path) and os.path.exists(weights_path + ".index")))
+
+def standin_classification(texts: Sequence[str], directory: str, seed: int):
+    import tensorflow as tf
+    from tokenizers import ByteLevelBPETokenizer
+    from transformers import RobertaConfig, RobertaTokenizer, TFRobertaForSequenceClassification
+    from model_loader import LoadedModel
+
+    bpe = ByteLevelBPETokenizer()
+    bpe.train_from_iterator(texts, vocab_size=STANDIN_VOCAB, min_frequency=1, show_progress=False,
+                            special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"])
+    bpe.save_model(directory)
+    tokenizer = RobertaTokenizer(os.path.join(directory, "vocab.json"), os.path.join(directory, "merges.txt"),
+                                 model_max_length=512)
+    config = RobertaConfig(vocab_size=len(tokenizer), hidden_size=STANDIN_HIDDEN, num_hidden_layers=STANDIN_LAYERS,
+                           num_attention_heads=STANDIN_HEADS, intermediate_size=4 * STANDIN_HIDDEN,
+                           max_position_embeddings=514, num_labels=13, pad_token_id=tokenizer.pad_token_id,
+                           bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id)
+    tf.random.set_seed(seed)
+    model = TFRobertaForSequenceClassification(config)
+    model(model.dummy_inputs)
+    return LoadedModel(model, tokenizer, "standin")
+
+def standin_ner(texts: Sequence[str], directory: str, seed: int):
+    import tensorflow as tf
+    from tokenizers import BertWordPieceTokenizer
+    from transformers import BertConfig, BertTokenizerFast, TFBertForTokenClassification
+    import models
+    from model_loader import LoadedModel
+
+    wordpiece = BertWordPieceTokenizer(lowercase=True)
+    wordpiece.train_from_iterator(texts, vocab_size=STANDIN_VOCAB, min_frequency=1, show_progress=False)
+    wordpiece.save_model(directory)
+    tokenizer = BertTokenizerFast(os.path.join(directory, "vocab.txt"), do_lower_case=True, model_max_length=512)
+    config = BertConfig(vocab_size=len(tokenizer), hidden_size=STANDIN_HIDDEN, num_hidden_layers=STANDIN_LAYERS,
+                        num_attention_heads=STANDIN_HEADS, intermediate_size=4 * STANDIN_HIDDEN,
+                        num_labels=len(models.id2label), id2label=models.id2label, label2id=models.label2id)
+    tf.random.set_seed(seed)
+    model = TFBertForTokenClassification(config)
+    model(model.dummy_inputs)
+    return LoadedModel(model, tokenizer, "standin")
+
+
+# ==== pengukuran ====
+def peak_rss_mb() -> float:
+    # Linux: ru_maxrss dalam KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+def measure(fn: Callable, items: Sequence, concurrency: int, repeat: int = 1) -> dict:
+    work = list(items) * repeat
+    latencies = [0.0] * len(work)
+    errors = []
+
+    def call(i):
+        t0 = time.perf_counter()
+        try:
+            fn(work[i])
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        latencies[i] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(len(work))))
+    wall = time.perf_counter() - t0
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(work),
+        "seconds": round(wall, 4),
+        "throughput_per_s": round(len(work) / wall, 3) if wall else 0.0,
+        "latency_ms": {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3),
+                       "mean": round(float(ms.mean()), 3) if len(ms) else 0.0,
+                       "max": round(float(ms.max()), 3) if len(ms) else 0.0},
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+# Memori per jumlah worker: N proses spawn masing-masing memuat model asli (sesuai
+# INFERENCE_BACKEND / ONNX_SHARED_WEIGHTS) dan menjalankan satu inferensi, lalu PSS semua proses
+# dijumlah. PSS membagi halaman bersama (bobot di-mmap, library) rata ke proses yang memakainya,
+# jadi selisih total antar jumlah worker = biaya sebenarnya satu worker tambahan.
+def _smaps_mb(pid: int) -> dict:
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty", "Shared_Clean"):
+                    values[key.lower()] = int(rest.split()[0]) / 1024.0
+    except OSError:
+        pass
+    return values
+
+def _memory_worker(loaded, release):
+    import models
+    sources = {}
+    for name, load in (("roberta", models.load_classification), ("ner", models.load_ner)):
+        try:
+            model = load()
+            inputs = model.tokenizer(["informasi publik"], padding=True, return_tensors="np")
+            model.model(dict(inputs))
+            sources[name] = model.source
+        except Exception as e:
+            sources[name] = f"error: {type(e).__name__}: {e}"
+    loaded.put(sources)
+    release.wait()
+
+def measure_memory(workers: int) -> dict:
+    ctx = get_context("spawn")
+    loaded, release = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_memory_worker, args=(loaded, release)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    try:
+        sources = [loaded.get(timeout=600) for _ in procs]
+        usage = [_smaps_mb(p.pid) for p in procs]
+    finally:
+        release.set()
+        for p in procs:
+            p.join(30)
+    total = lambda key: round(sum(u.get(key, 0.0) for u in usage), 1)
+    return {
+        "workers": workers,
+        "models": sources[0],
+        "pss_mb": total("pss"),
+        "rss_mb": total("rss"),
+        "private_mb": round(total("private_clean") + total("private_dirty"), 1),
+        "pss_mb_per_worker": round(total("pss") / workers, 1),
+    }
+
+def _app_with_models(options: dict, docs, requests):
+    # app.py di-import dengan SQLite memori & model lazy; slot model diganti kalau checkpoint tidak ada
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ["MODEL_LOADING"] = "lazy"
+    os.environ["INFERENCE_WORKERS"] = "0"
+    import app
+    from model_loader import ModelSlot
+    sources = {}
+    for name, attr, build, corpus in (("roberta", "classification_slot", standin_classification, requests),
+                                      ("ner", "ner_slot", standin_ner, [document_text(d) for d in docs])):
+        if options["models"] == "standin" or (options["models"] == "auto" and not has_checkpoint(name)):
+            directory = tempfile.mkdtemp(prefix=f"bench-{name}-")
+            loaded = build(corpus, directory, options["seed"])
+            setattr(app, attr, ModelSlot(name, lambda loaded=loaded: loaded))
+        sources[name] = getattr(app, attr).get().source
+    return app, sources
+
+def run_scenario(scenario: str, options: dict) -> dict:
+    # dijalankan di proses spawn tersendiri (peak RSS per skenario)
+    docs, requests = synthetic_corpus(options["seed"], options["documents"], options["texts"])
+    rss_start = peak_rss_mb()
+    info = {}
+    if scenario in ("normalize", "extract", "pdf"):
+        from ekstraksi import _normalize_text, _extract_pemohon_termohon, _extract_pdf_fields
+        if scenario == "normalize":
+            fn, items = _normalize_text, [document_text(d) for d in docs]
+        elif scenario == "extract":
+            fn, items = _extract_pemohon_termohon, [_normalize_text(document_text(d)) for d in docs]
+        else:
+            fn, items = _extract_pdf_fields, options["pdf_paths"]
+    else:
+        app, info["models"] = _app_with_models(options, docs, requests)
+        if scenario == "classify":
+            fn, items = (lambda text: app.classify_texts([text])), requests
+        else:
+            from ekstraksi import _normalize_text, _extract_pemohon_termohon
+            items = [_extract_pemohon_termohon(_normalize_text(document_text(d))) for d in docs]
+            fn = lambda pair: app.polish_parties([pair])
+
+    for item in items[:options["warmup"]]:
+        fn(item)
+    levels = [measure(fn, items, c, options["repeat"]) for c in options["concurrency"]]
+    return dict(info, scenario=scenario, items=len(items), rss_start_mb=rss_start, levels=levels)
+
+
+# ==== laporan & perbandingan antar-run ====
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(current: dict, baseline: dict, max_regression: float = None) -> List[str]:
+    # -> daftar regresi (throughput turun / p95 naik lebih dari max_regression persen)
+    base = {(r["scenario"], l["concurrency"]): l for r in baseline["results"] for l in r["levels"]}
+    regressions = []
+    print(f"{'scenario':<10} {'conc':>4} {'req/s':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8}", file=sys.stderr)
+    for r in current["results"]:
+        for level in r["levels"]:
+            old = base.get((r["scenario"], level["concurrency"]))
+            if old is None:
+                continue
+            d_tput = 100.0 * (level["throughput_per_s"] / old["throughput_per_s"] - 1) if old["throughput_per_s"] else 0.0
+            d_p95 = 100.0 * (level["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1) if old["latency_ms"]["p95"] else 0.0
+            print(f"{r['scenario']:<10} {level['concurrency']:>4} {level['throughput_per_s']:>10.2f} {d_tput:>+7.1f}% "
+                  f"{level['latency_ms']['p95']:>10.2f} {d_p95:>+7.1f}%", file=sys.stderr)
+            if max_regression is not None and (d_tput < -max_regression or d_p95 > max_regression):
+                regressions.append(f"{r['scenario']}@{level['concurrency']}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline ekstraksi PDF & klasifikasi (korpus sintetis).")
+    parser.add_argument("--scenarios", help=f"daftar dipisah koma: {', '.join(SCENARIOS)} (default semua, "
+                                            "atau tidak ada kalau --memory dipakai)")
+    parser.add_argument("--concurrency", default="1,4,8", help="tingkat konkurensi (thread pemanggil), dipisah koma")
+    parser.add_argument("--documents", type=int, default=100, help="jumlah PDF sintetis")
+    parser.add_argument("--texts", type=int, default=200, help="jumlah teks permohonan sintetis")
+    parser.add_argument("--repeat", type=int, default=1, help="ulang seluruh korpus per tingkat konkurensi")
+    parser.add_argument("--warmup", type=int, default=5, help="jumlah item untuk pemanasan (tidak diukur)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--models", choices=("auto", "real", "standin"), default="auto",
+                        help="auto: checkpoint asli kalau ada, selain itu model pengganti berbobot acak")
+    parser.add_argument("--output", help="tulis hasil JSON ke file ini (default stdout)")
+    parser.add_argument("--compare", help="hasil JSON run sebelumnya untuk dibandingkan")
+    parser.add_argument("--fail-on-regression", type=float, metavar="PERSEN",
+                        help="exit 1 kalau throughput turun / p95 naik lebih dari PERSEN dibanding --compare")
+    parser.add_argument("--memory", metavar="N,N,...",
+                        help="ukur total PSS untuk sejumlah proses worker yang masing-masing memuat model asli")
+    args = parser.parse_args(argv)
+    if args.scenarios is None:
+        args.scenarios = "" if args.memory else ",".join(SCENARIOS)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    docs, _ = synthetic_corpus(args.seed, args.documents, args.texts)
+    options = {"seed": args.seed, "documents": args.documents, "texts": args.texts, "repeat": args.repeat,
+               "warmup": args.warmup, "models": args.models,
+               "concurrency": [int(c) for c in args.concurrency.split(",") if c]}
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-pdf-") as pdf_dir:
+        if "pdf" in scenarios:
+            options["pdf_paths"] = []
+            for i, pages in enumerate(docs):
+                path = os.path.join(pdf_dir, f"putusan-{i:04d}.pdf")
+                write_pdf(path, pages)
+                options["pdf_paths"].append(path)
+        for scenario in scenarios:
+            print(f"running {scenario}...", file=sys.stderr)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                results.append(executor.submit(run_scenario, scenario, options).result())
+
+    memory = []
+    for workers in [int(n) for n in (args.memory or "").split(",") if n]:
+        print(f"measuring memory with {workers} worker(s)...", file=sys.stderr)
+        memory.append(measure_memory(workers))
+        if len(memory) > 1:
+            # biaya tiap worker tambahan dibanding pengukuran sebelumnya
+            prev = memory[-2]
+            memory[-1]["marginal_pss_mb_per_worker"] = round(
+                (memory[-1]["pss_mb"] - prev["pss_mb"]) / (workers - prev["workers"]), 1) if workers != prev["workers"] else None
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "documents": args.documents,
+            "texts": args.texts,
+            "repeat": args.repeat,
+            "env": {k: v for k, v in sorted(os.environ.items())
+                    if k.startswith(("INFERENCE_", "ONNX_", "EXTRACT_", "CLASSIFY_", "METRICS_", "MODEL_"))},
+        },
+        "results": results,
+    }
+    if memory:
+        report["memory"] = memory
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.fail_on_regression)
+        if regressions:
+            print(f"regression: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
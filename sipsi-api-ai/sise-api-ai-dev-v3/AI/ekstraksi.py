@@ -0,0 +1,467 @@
+import hashlib
+import os
+import re
+import tempfile
+import pdfplumber
+import metrics
+from gazetteer import load_or_empty
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Ekstraksi Nomor / Pemohon / Termohon dari teks putusan (tanpa model).
+# Dipisah dari app.py supaya bisa dipakai proses pool job massal tanpa ikut memuat BERT/RoBERTa.
+
+# ==== regex dasar ====
+ROMAN = r"[IVXLCDM]+"
+
+NOMOR_REGEX = re.compile(
+    rf"(?:Nomor(?:\s+Registrasi)?\s*[:;]?\s*)"
+    rf"([0-9]{{2,4}}\s*/\s*{ROMAN}(?:\s*/\s*[A-Z-]+)*\s*/\s*\d{{4}}|[0-9A-Z/\-]{{6,}})",
+    flags=re.IGNORECASE
+)
+
+# === label tegas & generik (tanpa duplikasi) ===
+# Semua pola di bawah dicocokkan per BARIS (fullmatch/match), lihat _LineIndex.
+NAMA_PEMOHON_LABEL   = re.compile(r"\s*Nama\s+Pemohon\s*:\s*(\S.+)", re.I)
+NAMA_TERMOHON_STRICT = re.compile(r"\s*Nama\s+Termohon\s*:\s*(\S.+)", re.I)
+GENERIC_NAMA         = re.compile(r"\s*Nama\s*:\s*(\S.+)", re.I)  # dipakai HANYA saat scanning per-blok
+# "Nama" sendirian lalu "Pemohon: X" di baris berikutnya (label terpotong baris)
+NAMA_ONLY            = re.compile(r"\s*Nama\s*", re.I)
+PEMOHON_LABEL_CONT   = re.compile(r"\s*Pemohon\s*:\s*(\S.+)", re.I)
+TERMOHON_LABEL_CONT  = re.compile(r"\s*Termohon\s*:\s*(\S.+)", re.I)
+BARE_NAMA_LABEL      = re.compile(r"\s*Nama(?:\s+(Pemohon|Termohon))?\s*:?\s*", re.I)
+
+# === judul blok ===
+PEMOHON_MARK     = re.compile(r"\s*PEMOHON\s*", re.I)
+TERMOHON_MARK    = re.compile(r"\s*TERMOHON\s*", re.I)
+TERHADAP_MELAWAN = re.compile(r"\s*(TERHADAP|MELAWAN)\b", re.I)
+
+# --- stopwords tetap dipakai agar tidak menangkap kuasa/perwakilan ---
+PEMOHON_STOP = re.compile(
+    r"(?i)\b(Kuasa( Hukum)?|Advokat|Pengacara|Lawyer|Paralegal|Selaku|"
+    r"yang bertindak untuk dan atas nama|bertindak untuk dan atas nama|"
+    r"untuk dan atas nama|Perwakilan|Wali|Alamat|Berkedudukan di)\b"
+)
+
+# === narasi termohon ===
+NARASI_TERMOHON = re.compile(
+    r"(?is)(?:^|\n)\s*(?:Terhadap|Melawan)\s*:?\s*(.+?)"
+    r"(?:\n\s*Selanjutnya\s+disebut\s+sebagai\s+Termohon\b|\n\s*TERMOHON\b|\n\s*PEMOHON\b|\n\n|$)"
+)
+DIAJUKAN_OLEH = re.compile(r"(?is)diajukan\s+oleh\s*:?\s*(.+?)(?:\bSelanjutnya\b|\bPemohon\b|\n\n|$)")
+
+# === kamus badan publik & penanda nama orang ===
+ORG_HINT = re.compile(
+    r"\b("
+    r"PT\s+.*Persero|BUMN|BUMD|Perum|Perseroan|"
+    r"Kementerian|Kemen\w+|Direktorat\s+Jenderal|Ditjen|Sekretariat|"
+    r"Pemerintah|Pemprov|Pemkot|Pemkab|Provinsi|Kabupaten|Kota|Kecamatan|Kelurahan|"
+    r"Komisi|Komisi\s+Informasi|Badan|Dinas|Inspektorat|Bappeda|BPN|BPJS|BPK|BPKP|"
+    r"Kejaksaan|Kejari|Kejati|Kepolisian|Polri|TNI|Mahkamah|Pengadilan|"
+    r"Universitas|Institut|Politeknik|Sekolah\s+Tinggi|"
+    r"RSUD|Rumah\s+Sakit|Puskesmas|PDAM|PLN|Pertamina|Telkom"
+    r")\b", re.IGNORECASE
+)
+
+PERSON_HINT = re.compile(
+    r"\b(Dr\.?|Dra\.?|Ir\.?|H\.|Hj\.?|Bapak|Ibu|Sdr\.?|Sdri\.?)\b|"
+    r"\b(S\.E\.|S\.H\.|S\.Kom\.?|S\.Si\.?|M\.H\.?|M\.Si\.?)\b",
+    re.IGNORECASE
+)
+# Gazetteer badan publik (gazetteer.py + badan_publik.tsv): nama resmi & alias ribuan instansi
+# dalam satu automaton; baris yang memuat salah satunya dianggap baris instansi seperti ORG_HINT,
+# dan Termohon yang seluruhnya satu entri dinormalisasi ke nama kanonik + id (kunci dedup).
+GAZETTEER_PATH = os.environ.get(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "badan_publik.tsv"))
+GAZETTEER = load_or_empty(GAZETTEER_PATH)
+
+# header blok (kalau suatu saat ikut tercapture ke dalam blok)
+HEADER_MARK = re.compile(r"\s*(PEMOHON|TERMOHON)\s*:?\s*", re.I)
+
+# perluas daftar label yang harus dilewati jika sendirian
+LABEL_WORDS = {
+    "nama", "nama pemohon", "nama termohon",  # ← tambahkan ini
+    "alamat", "jabatan", "kuasa", "badan publik", "kedudukan hukum",
+    "pemohon", "termohon"                     # ← dan ini (jaga-jaga)
+}
+
+# ==== util ====
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+_MANY_NL      = re.compile(r"\n{3,}")
+
+def _normalize_text(s: str) -> str:
+    if not s: return ""
+    s = (s.replace("\xa0"," ").replace("\uf0b7"," ")
+           .replace("•"," ").replace("●"," ").replace("：",":").replace("–","-").replace("—","-"))
+    # langkah regex hanya dijalankan kalau polanya memang ada di teks
+    if "-\n" in s:
+        s = _HYPHEN_BREAK.sub(r"\1\2", s)  # gabung kata terpotong
+    s = s.replace("\r","").replace("\t"," ")
+    while "  " in s:  # setara re.sub(r"[ \t]+", " ", s), tanpa regex
+        s = s.replace("  ", " ")
+    if ":" in s:
+        # setara re.sub(r"\s*:\s*", ": ", s): spasi di kiri & kanan tiap ":" dibuang
+        parts = s.split(":")
+        s = ": ".join([parts[0].rstrip()] + [p.strip() for p in parts[1:-1]] + [parts[-1].lstrip()])
+    if "\n\n\n" in s:
+        s = _MANY_NL.sub("\n\n", s)
+    return s.strip()
+
+_NAMA_PREFIX = re.compile(r"(?i)^\s*Nama(?:\s+(Pemohon|Termohon))?\s*:?\s*")
+_SELANJUTNYA = re.compile(r"(?is)\bSelanjutnya\s+disebut\s+sebagai\s+.*$")
+_MULTI_WS    = re.compile(r"\s{2,}")
+
+def _clean_value(v: str) -> str:
+    if not v: return ""
+    v = v.strip(" .;,")
+    # buang label yang ikut tercapture
+    v = _NAMA_PREFIX.sub("", v, count=1).strip(" .;,")
+    # buang “Selanjutnya disebut …”
+    v = _SELANJUTNYA.sub("", v, count=1).strip(" .;,")
+    return _MULTI_WS.sub(" ", v)
+
+
+# ==== indeks baris (satu lintasan) ====
+# Teks hasil _normalize_text dipecah per "\n" SEKALI. Baris yang diawali kata kunci
+# (nama/pemohon/termohon/terhadap/melawan) diklasifikasi sekali; semua tier di
+# _extract_pemohon_termohon_sources membaca indeks ini, bukan memindai ulang teks.
+# Catatan: versi lama memakai splitlines() di beberapa tempat; di sini baris selalu
+# dipisah per "\n" (sama dengan ^/$ regex). Bedanya hanya pada pemisah eksotis seperti
+# \x0c atau \u2028, yang tidak dihasilkan pdfplumber.
+_LINE_KEYWORD = re.compile(r"\s*(nama|pemohon|termohon|terhadap|melawan)", re.I)
+
+F_PEMOHON_MARK  = 1   # "PEMOHON" sendirian
+F_TERMOHON_MARK = 2   # "TERMOHON" sendirian
+F_TERHADAP      = 4   # diawali TERHADAP/MELAWAN + batas kata (akhir blok)
+F_NARASI        = 8   # diawali Terhadap/Melawan (tanpa batas kata, awal narasi)
+F_NAMA_ONLY     = 16  # "Nama" sendirian
+
+class _LineIndex:
+    __slots__ = ("text", "lines", "flags", "label_p", "label_t", "generic", "cont_p", "cont_t")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = lines = text.split("\n")
+        # hanya baris berkata kunci yang disimpan; baris narasi biasa dilewati
+        self.flags, self.label_p, self.label_t, self.generic, self.cont_p, self.cont_t = {}, {}, {}, {}, {}, {}
+        for i, line in enumerate(lines):
+            m = _LINE_KEYWORD.match(line)
+            if not m:
+                continue
+            kw = m.group(1).lower()
+            f = 0
+            if kw == "nama":
+                for store, pat in ((self.label_p, NAMA_PEMOHON_LABEL), (self.label_t, NAMA_TERMOHON_STRICT),
+                                   (self.generic, GENERIC_NAMA)):
+                    g = pat.fullmatch(line)
+                    if g:
+                        store[i] = g.group(1)
+                if NAMA_ONLY.fullmatch(line):
+                    f |= F_NAMA_ONLY
+            elif kw == "pemohon":
+                if PEMOHON_MARK.fullmatch(line):
+                    f |= F_PEMOHON_MARK
+                g = PEMOHON_LABEL_CONT.fullmatch(line)
+                if g:
+                    self.cont_p[i] = g.group(1)
+            elif kw == "termohon":
+                if TERMOHON_MARK.fullmatch(line):
+                    f |= F_TERMOHON_MARK
+                g = TERMOHON_LABEL_CONT.fullmatch(line)
+                if g:
+                    self.cont_t[i] = g.group(1)
+            else:
+                f |= F_NARASI
+                if TERHADAP_MELAWAN.match(line):
+                    f |= F_TERHADAP
+            if f:
+                self.flags[i] = f
+
+    def first(self, flag: int, start: int = 0) -> Optional[int]:
+        for i in self.flags:  # urut naik: diisi sesuai urutan baris
+            if i >= start and self.flags[i] & flag:
+                return i
+        return None
+
+    def label(self, direct: dict, cont: dict) -> Optional[str]:
+        # tiruan regex lama ^\s*Nama\s+Pemohon\s*:\s*(\S.+)$ pada seluruh teks: match pertama
+        # berupa satu baris utuh, atau "Nama" lalu (baris kosong…) "Pemohon: X"
+        candidates = sorted(set(direct) | {i for i, f in self.flags.items() if f & F_NAMA_ONLY})
+        for i in candidates:
+            if i in direct:
+                return direct[i]
+            j = i + 1
+            while j < len(self.lines) and not self.lines[j].strip():
+                j += 1
+            if j in cont:
+                return cont[j]
+        return None
+
+    def block(self, mark: int, end_flags: int) -> List[str]:
+        # baris setelah judul blok sampai judul berikutnya, dengan efek .strip() pada blok utuh
+        start = self.first(mark)
+        if start is None:
+            return []
+        end = self.first(end_flags, start + 1)
+        blk = self.lines[start + 1:end if end is not None else len(self.lines)]
+        a, b = 0, len(blk)
+        while a < b and not blk[a].strip():
+            a += 1
+        while b > a and not blk[b - 1].strip():
+            b -= 1
+        if a == b:
+            return []
+        blk = blk[a:b]
+        blk[0] = blk[0].lstrip()
+        blk[-1] = blk[-1].rstrip()
+        return blk
+
+    def offset(self, i: int) -> int:
+        return sum(len(line) + 1 for line in self.lines[:i])
+
+# fakta per baris untuk memilih nilai; di-cache karena baris yang sama (judul, label,
+# nama instansi) berulang di banyak dokumen
+@lru_cache(maxsize=8192)
+def _line_facts(line: str) -> Tuple[str, bool, bool, bool, bool]:
+    clean = _clean_value(line)
+    if not clean:
+        return "", False, False, False, False
+    nonlabel = not (HEADER_MARK.fullmatch(line) or clean.lower() in LABEL_WORDS or BARE_NAMA_LABEL.fullmatch(line))
+    org = bool(ORG_HINT.search(clean)) or GAZETTEER.contains(clean)
+    return clean, nonlabel, bool(PEMOHON_STOP.search(clean)), org, bool(PERSON_HINT.search(clean))
+
+def _pick_pemohon(lines: List[str]) -> str:
+    # baris pertama yang bukan judul/label dan bukan kuasa/perwakilan (orang ATAU organisasi)
+    for line in lines:
+        clean, nonlabel, stop, _, _ = _line_facts(line)
+        if nonlabel and not stop:
+            return clean
+    return ""
+
+def _pick_public_body(lines: List[str]) -> str:
+    # prioritas: baris “instansi” (bukan nama orang) > baris pertama bukan nama orang
+    # > baris pertama bukan label — ketiganya dicari dalam satu putaran
+    first_nonperson, first_nonlabel = None, None
+    for line in lines:
+        clean, nonlabel, _, org, person = _line_facts(line)
+        if not clean:
+            continue
+        if not person:
+            if org:
+                return clean
+            if first_nonperson is None:
+                first_nonperson = clean
+        if first_nonlabel is None and nonlabel:
+            first_nonlabel = clean
+    if first_nonperson is not None:
+        return first_nonperson
+    return first_nonlabel or ""
+
+def _pick_public_body_line(snippet: str) -> str:
+    return _pick_public_body(snippet.split("\n"))
+
+# === scanner “Nama:” generik berbasis blok ===
+def _scan_generic_nama_by_block(idx: _LineIndex) -> Tuple[str, str]:
+    pemohon, termohon = "", ""
+    current = None
+    for i in sorted(set(idx.flags) | set(idx.generic)):
+        f = idx.flags.get(i, 0)
+        if f & F_PEMOHON_MARK:  current = 'PEMOHON';  continue
+        if f & F_TERMOHON_MARK: current = 'TERMOHON'; continue
+        if not current or i not in idx.generic: continue
+
+        val = _clean_value(idx.generic[i])
+        if not val: continue
+
+        if current == 'PEMOHON' and not pemohon:
+            pemohon = val  # ← TIDAK difilter org/person
+            continue
+        if current == 'TERMOHON' and not termohon:
+            # tetap wajib badan publik
+            termohon = _pick_public_body([val])
+        if pemohon and termohon:
+            break
+    return _clean_value(pemohon), _clean_value(termohon)
+
+
+# ==== ekstraksi field utama ====
+_WS_RUN = re.compile(r"\s+")
+_TRAILING_PUNCT = re.compile(r"[.;,]+$")
+
+def _extract_nomor(text: str) -> str:
+    m = NOMOR_REGEX.search(text)
+    if not m: return ""
+    nomor = _WS_RUN.sub("", m.group(1))
+    return _TRAILING_PUNCT.sub("", nomor)
+
+def resolve_termohon(termohon: str):
+    # -> gazetteer.Entry (id, nama kanonik) kalau Termohon persis satu badan publik di gazetteer
+    return GAZETTEER.resolve(termohon) if termohon else None
+
+def _extract_pemohon_termohon(text: str) -> Tuple[str, str]:
+    pemohon, termohon, _ = _extract_pemohon_termohon_sources(text)
+    return pemohon, termohon
+
+# Sama seperti _extract_pemohon_termohon, plus tier mana yang menghasilkan tiap field:
+# "label" (0), "generic" (1), "block" (2), "narasi" (3) atau "" (tidak ketemu).
+def _extract_pemohon_termohon_sources(text: str) -> Tuple[str, str, dict]:
+    sources = {"pemohon": "", "termohon": ""}
+    idx = _LineIndex(text)
+
+    # 0) label spesifik global
+    pemohon  = _clean_value(idx.label(idx.label_p, idx.cont_p) or "")
+    termohon = _clean_value(idx.label(idx.label_t, idx.cont_t) or "")
+    if pemohon:  sources["pemohon"] = "label"
+    if termohon: sources["termohon"] = "label"
+
+    # 1) “Nama:” generik tapi HANYA jika berada di dalam blok
+    if not pemohon or not termohon:
+        p2, t2 = _scan_generic_nama_by_block(idx)
+        if not pemohon and p2:   pemohon, sources["pemohon"] = p2, "generic"
+        if not termohon and t2:  termohon, sources["termohon"] = t2, "generic"
+
+    # 2) blok PEMOHON / TERMOHON (tanpa label)
+    if not pemohon:
+        pb = idx.block(F_PEMOHON_MARK, F_TERHADAP | F_TERMOHON_MARK)
+        if pb:
+            pemohon = _pick_pemohon(pb)  # ← menerima orang ATAU organisasi
+            if pemohon: sources["pemohon"] = "block"
+    if not termohon:
+        tb = idx.block(F_TERMOHON_MARK, F_PEMOHON_MARK | F_TERHADAP)
+        if tb:
+            termohon = _pick_public_body(tb)
+            if termohon: sources["termohon"] = "block"
+
+    # 3) narasi TERHADAP/MELAWAN … (Termohon) & “diajukan oleh …” (Pemohon)
+    if not termohon:
+        i = idx.first(F_NARASI)
+        if i is not None:
+            # regex narasi cukup dicocokkan mulai baris Terhadap/Melawan pertama
+            m = NARASI_TERMOHON.match(text, max(0, idx.offset(i) - 1))
+            if m:
+                termohon = _pick_public_body_line(m.group(1))
+                if termohon: sources["termohon"] = "narasi"
+    if not pemohon:
+        m = DIAJUKAN_OLEH.search(text)
+        if m:
+            pemohon = _clean_value(m.group(1).splitlines()[0])
+            if pemohon: sources["pemohon"] = "narasi"
+
+    # 4) kebersihan akhir & aturan KIP
+    pemohon  = _clean_value(pemohon)
+    termohon = _clean_value(termohon)
+
+    # Termohon tak boleh nama orang
+    if termohon and PERSON_HINT.search(termohon):
+        termohon = ""
+    # Anti-dobel
+    if pemohon and termohon and pemohon.lower() == termohon.lower():
+        termohon = ""
+
+    if not pemohon:  sources["pemohon"] = ""
+    if not termohon: sources["termohon"] = ""
+    return pemohon, termohon, sources
+
+# ==== ekstraksi PDF per halaman dengan early-exit ====
+# Halaman dibaca satu per satu; setelah tiap halaman field dicari ulang dan pembacaan
+# berhenti begitu Nomor, Pemohon & Termohon sudah ketemu lewat label spesifik (tier 0).
+# Hanya label yang final: hasil generic/blok/narasi masih bisa tergeser oleh label di
+# halaman berikutnya, jadi berhenti lebih awal di situ membuat hasil beda dengan baca penuh
+# (dicek golden/cek_ekstraksi.py).
+EXTRACT_MAX_PAGES = int(os.environ.get("EXTRACT_MAX_PAGES", "6"))  # banyak putusan: identitas di 1–3
+EXTRACT_EARLY_EXIT = os.environ.get("EXTRACT_EARLY_EXIT", "1") == "1"
+EXTRACT_MAX_UPLOAD_MB = float(os.environ.get("EXTRACT_MAX_UPLOAD_MB", "50"))
+CONFIDENT_SOURCES = {"label"}
+
+def _extractor_version() -> str:
+    # versi logika ekstraksi = isi kode ekstraksi + ekstraktor + gazetteer + setelan halaman; dipakai cache hasil
+    h = hashlib.sha256(f"{EXTRACT_MAX_PAGES}:{EXTRACT_EARLY_EXIT}".encode("utf-8"))
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ("ekstraksi.py", "ekstraktor.py", "gazetteer.py", GAZETTEER_PATH):
+        try:
+            with open(os.path.join(here, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(name.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+EXTRACTOR_VERSION = _extractor_version()
+
+class UploadTooLarge(Exception):
+    pass
+
+def _spool_upload(file_storage, max_bytes: int, digest=None) -> str:
+    # salin upload ke file sementara per 1 MB, bukan ditampung sebagai bytes di memori;
+    # digest (hashlib) opsional ikut di-update per potongan untuk kunci cache hasil ekstraksi
+    tmp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", delete=False)
+    size = 0
+    try:
+        with tmp, metrics.stage("upload_spool"):
+            while True:
+                chunk = file_storage.stream.read(1 << 20)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                tmp.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return tmp.name
+
+def _fields_confident(nomor: str, sources: dict) -> bool:
+    return bool(nomor) and sources["pemohon"] in CONFIDENT_SOURCES and sources["termohon"] in CONFIDENT_SOURCES
+
+def _extract_fields_timed(raw_text: str):
+    with metrics.stage("normalize"):
+        text = _normalize_text(raw_text)
+    with metrics.stage("extract_fields"):
+        nomor = _extract_nomor(text)
+        pemohon, termohon, sources = _extract_pemohon_termohon_sources(text)
+    return text, nomor, pemohon, termohon, sources
+
+def _extract_pdf_fields(pdf_source, max_pages: int = EXTRACT_MAX_PAGES, early_exit: bool = EXTRACT_EARLY_EXIT) -> dict:
+    raw_text, text = "", ""
+    nomor, pemohon, termohon = "", "", ""
+    sources = {"pemohon": "", "termohon": ""}
+    pages_read = 0
+    resolved = False
+    try:
+        with pdfplumber.open(pdf_source) as pdf:
+            pages = min(max_pages, len(pdf.pages))
+            for i in range(pages):
+                with metrics.stage("pdf_page"):
+                    page = pdf.pages[i]
+                    raw_text += (page.extract_text() or "") + "\n"
+                    page.close()  # lepas cache objek halaman supaya memori tidak menumpuk
+                pages_read += 1
+                if not early_exit or not raw_text.strip():
+                    continue
+                text, nomor, pemohon, termohon, sources = _extract_fields_timed(raw_text)
+                if _fields_confident(nomor, sources):
+                    resolved = True
+                    break
+    except Exception:
+        raw_text = ""
+    metrics.inc("pages_parsed_total", pages_read)
+
+    if not resolved and raw_text.strip():
+        text, nomor, pemohon, termohon, sources = _extract_fields_timed(raw_text)
+    if raw_text.strip():
+        for field in ("pemohon", "termohon"):
+            metrics.inc("extraction_tier_total", field=field, tier=sources[field] or "none")
+
+    ref = resolve_termohon(termohon)
+    return {
+        "raw_text": raw_text,
+        "text": text if raw_text.strip() else "",
+        "nomor": nomor,
+        "pemohon": pemohon,
+        "termohon": termohon,
+        "termohon_id": ref.id if ref else "",
+        "pages_read": pages_read,
+        "early_exit": resolved,
+    }
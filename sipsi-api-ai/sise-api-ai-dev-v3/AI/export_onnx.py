@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from typing import List
+
+import numpy as np
+
+import models
+import onnx_backend
+from model_loader import ARTIFACT_STAMP
+from prediction_cache import weights_fingerprint
+
+
+# ==== export model TF -> ONNX (+ int8) dan uji paritas ====
+# Dijalankan offline (butuh tensorflow, tf2onnx, onnxruntime):
+#   python export_onnx.py                      # export ner + roberta, uji paritas ke korpus golden
+#   python export_onnx.py roberta --held-out data.jsonl --min-agreement 0.995
+# Hasil ditulis ke artifacts/<nama>-onnx/ (lihat onnx_backend.py), lalu jalankan service
+# dengan INFERENCE_BACKEND=onnx. Varian yang tidak lolos paritas tidak akan dimuat.
+ONNX_OPSET = 13
+GOLDEN_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "ekstraksi.jsonl")
+
+MODELS = {
+    "ner": {
+        "load": models.load_ner,
+        "sources": (models.ner_model_path, models.ner_tokenizer_path, models.ner_weights_path),
+        "max_length": 128,
+    },
+    "roberta": {
+        "load": models.load_classification,
+        "sources": (models.classification_model_path, models.classification_tokenizer_path,
+                    models.classification_weights_path),
+        "max_length": 512,
+    },
+}
+
+def held_out_texts(name: str, path: str = None) -> List[str]:
+    texts = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    texts.append(json.loads(line)["text"] if path.endswith(".jsonl") else line.rstrip("\n"))
+    else:
+        # default: korpus golden ekstraksi -> string pihak untuk NER, teks putusan untuk klasifikasi
+        with open(GOLDEN_CORPUS, encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if name == "ner":
+                    texts.extend(v for v in (row["pemohon"], row["termohon"]) if v)
+                elif row["normalized"]:
+                    texts.append(row["normalized"])
+    return list(dict.fromkeys(texts))
+
+def convert(loaded, out_dir: str, quantize: bool = True):
+    import tensorflow as tf
+    import tf2onnx
+
+    names = list(loaded.tokenizer.model_input_names)
+    spec = tuple(tf.TensorSpec((None, None), tf.int32, name=n) for n in names)
+
+    @tf.function(input_signature=spec)
+    def serving(*args):
+        return {"logits": loaded.model(dict(zip(names, args)), training=False).logits}
+
+    fp32 = os.path.join(out_dir, onnx_backend.ONNX_FILES["fp32"])
+    tf2onnx.convert.from_function(serving, input_signature=spec, opset=ONNX_OPSET, output_path=fp32)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32, os.path.join(out_dir, onnx_backend.ONNX_FILES["int8"]), weight_type=QuantType.QInt8)
+    loaded.tokenizer.save_pretrained(out_dir)
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+def _run(model, batches) -> (List[np.ndarray], float):
+    t0 = time.perf_counter()
+    logits = [np.asarray(model(dict(enc), training=False).logits) for enc in batches]
+    return logits, time.perf_counter() - t0
+
+def parity(loaded, candidate, texts: List[str], max_length: int, batch_size: int = 16) -> dict:
+    # bandingkan argmax & probabilitas per posisi: baris (klasifikasi) atau token valid (NER)
+    batches = [loaded.tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                                max_length=max_length, return_tensors="np")
+               for i in range(0, len(texts), batch_size)]
+    reference, tf_seconds = _run(loaded.model, batches)
+    output, onnx_seconds = _run(candidate, batches)
+
+    same, total, diffs = 0, 0, []
+    for enc, a, b in zip(batches, reference, output):
+        mask = enc["attention_mask"].astype(bool) if a.ndim == 3 else np.ones(a.shape[0], dtype=bool)
+        same += int((a.argmax(-1) == b.argmax(-1))[mask].sum())
+        total += int(mask.sum())
+        diffs.append(np.abs(_softmax(a) - _softmax(b))[mask].max(axis=-1))
+    diffs = np.concatenate(diffs) if diffs else np.zeros(0)
+    return {
+        "texts": len(texts),
+        "positions": total,
+        "agreement": round(same / total, 6) if total else 1.0,
+        "max_abs_prob_diff": float(diffs.max()) if diffs.size else 0.0,
+        "mean_abs_prob_diff": float(diffs.mean()) if diffs.size else 0.0,
+        "tf_seconds": round(tf_seconds, 3),
+        "onnx_seconds": round(onnx_seconds, 3),
+    }
+
+def export_model(name: str, held_out: str = None, min_agreement: float = 0.99, quantize: bool = True) -> dict:
+    spec = MODELS[name]
+    loaded = spec["load"](backend="tf")
+    target = onnx_backend.export_dir(name)
+    tmp = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    try:
+        convert(loaded, tmp, quantize)
+        texts = held_out_texts(name, held_out)
+        report = {}
+        for variant, filename in onnx_backend.ONNX_FILES.items():
+            path = os.path.join(tmp, filename)
+            if not os.path.isfile(path):
+                continue
+            result = parity(loaded, onnx_backend.OnnxModel(path), texts, spec["max_length"])
+            result["passed"] = result["agreement"] >= min_agreement
+            report[variant] = result
+        with open(os.path.join(tmp, onnx_backend.PARITY_FILE), "w") as f:
+            json.dump(dict(report, min_agreement=min_agreement), f, indent=2)
+        with open(os.path.join(tmp, ARTIFACT_STAMP), "w") as f:
+            f.write(weights_fingerprint(*spec["sources"]))
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export model NER/RoBERTa ke ONNX (+int8) dan uji paritas terhadap TensorFlow.")
+    parser.add_argument("models", nargs="*", help=f"{' / '.join(MODELS)} (default: semua)")
+    parser.add_argument("--held-out", help="file teks uji (.jsonl dengan field \"text\", atau satu teks per baris); default korpus golden")
+    parser.add_argument("--min-agreement", type=float, default=0.99, help="minimal kecocokan argmax agar varian boleh dipakai")
+    parser.add_argument("--no-quantize", action="store_true", help="hanya export fp32")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODELS)
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    failed = False
+    for name in args.models or list(MODELS):
+        report = export_model(name, args.held_out, args.min_agreement, not args.no_quantize)
+        print(name, json.dumps(report, indent=2))
+        failed |= not any(r["passed"] for r in report.values())
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from sqlite_cache import SQLiteLRUCache
+
+
+# ==== cache hasil ekstraksi PDF berbasis isi file ====
+# Kunci = sha256 byte PDF yang di-upload (dihitung sambil spooling, tanpa baca ulang file).
+# Nilai = teks ternormalisasi + Nomor/Pemohon/Termohon; setiap entri ditandai versi ekstraktor,
+# jadi begitu kode ekstraksi/bobot NER berubah entri lama tidak dipakai dan dibuang saat start.
+# Tier 1: LRU kecil di memori (per worker). Tier 2: SQLite di disk, dipakai bersama semua worker,
+# dibatasi max_entries dengan eviction LRU (lihat sqlite_cache.py).
+
+class ExtractCache(SQLiteLRUCache):
+    table = "extraction"
+    version_column = "version"
+    label = "Extract cache"
+
+    def __init__(self, version: str, max_entries: int = 5000, memory_entries: int = 256, disk_path: Optional[str] = None):
+        # max_entries = 0 mematikan tier disk
+        max_entries = max(0, int(max_entries))
+        super().__init__(version, memory_entries, disk_entries=max_entries,
+                         disk_path=disk_path if max_entries else None)
+        self.max_entries = max_entries
@@ -0,0 +1,34 @@
+import os
+import threading
+
+
+# ==== reset state per proses setelah fork ====
+# Dasar MicroBatcher (batcher.py) dan WriteBehindBuffer (write_behind.py): thread & lock tidak ikut
+# terwariskan ke proses anak (gunicorn), jadi objek yang dibuat sebelum fork harus membangun ulang
+# state-nya di anak. Subclass mengisi _reset() (Condition, antrean, thread) dan menulis _pid PALING
+# AKHIR: thread lain yang melihat pid cocok pasti melihat state baru.
+
+# melindungi _reset() setelah fork: Condition lama tidak boleh dipakai lagi di proses anak
+_fork_lock = threading.Lock()
+
+def _reinit_fork_lock():
+    # lock yang sedang dipegang thread lain saat fork akan terkunci selamanya di proses anak
+    global _fork_lock
+    _fork_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_fork_lock)
+
+class ForkResettable:
+    _pid = None
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _check_fork(self):
+        # harus SEBELUM mengambil _cond: _reset() mengganti _cond, jadi pemanggil yang sudah
+        # memegang Condition lama akan notify() Condition baru yang tidak dipegangnya
+        if self._pid != os.getpid():
+            with _fork_lock:
+                if self._pid != os.getpid():
+                    self._reset()
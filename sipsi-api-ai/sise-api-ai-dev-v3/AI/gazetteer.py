@@ -0,0 +1,185 @@
+import re
+import unicodedata
+from collections import deque, namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ==== gazetteer badan publik (nama resmi + alias) ====
+# Daftar badan publik dibaca sekali dari file TSV lalu dikompilasi jadi automaton Aho–Corasick
+# per KATA (bukan per huruf): satu lintasan atas token teks menemukan semua nama/alias yang
+# muncul, jadi biaya pencocokan linear terhadap panjang teks berapa pun jumlah entri gazetteer.
+# Kecocokan yang tumpang tindih dipilih leftmost-longest ("Kementerian Keuangan" tidak dipecah
+# jadi "Kementerian" + "Keuangan"; "Universitas Indonesia" menang atas "Indonesia").
+#
+# Format file (UTF-8, "#" = komentar):   id <TAB> nama kanonik <TAB> alias1|alias2|...
+# Nama kanonik otomatis ikut jadi alias. Pencocokan tidak peka huruf besar, tanda baca, dan
+# aksen ("PT. Pertamina (Persero)" == "pt pertamina persero").
+
+Entry = namedtuple("Entry", ["id", "canonical"])
+Match = namedtuple("Match", ["start", "end", "id", "canonical"])  # start/end = offset karakter di teks
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+# kata yang boleh tersisa di luar kecocokan saat resolve(): "Kementerian Keuangan Republik Indonesia",
+# "PT Pertamina (Persero) Tbk", "c.q. ..." tetap dinormalisasi ke nama kanonik yang sama
+FILLER_TOKENS = frozenset({
+    "republik", "indonesia", "ri", "negara", "nkri",
+    "pt", "persero", "tbk", "perum",
+    "c", "q", "cq", "qq", "u", "p", "up",
+})
+
+def _fold(text: str) -> str:
+    # huruf kecil + buang aksen; panjang string dijaga sama supaya offset token tetap berlaku di teks asli
+    if text.isascii():
+        return text.lower()
+    folded = "".join(unicodedata.normalize("NFKD", ch)[:1] for ch in text)
+    return folded.lower() if len(folded) == len(text) else text.lower()
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    # -> [(token, start, end)], offset di teks asli
+    return [(m.group(), m.start(), m.end()) for m in _TOKEN.finditer(_fold(text))]
+
+def normalize_name(text: str) -> str:
+    # kunci pembanding nama: token huruf kecil dipisah satu spasi
+    return " ".join(_TOKEN.findall(_fold(text or "")))
+
+class Gazetteer:
+    def __init__(self, entries: Iterable[Tuple[str, str, Iterable[str]]] = ()):
+        self.entries: Dict[str, Entry] = {}
+        # automaton: node 0 = akar; goto[node][token] -> node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Optional[Tuple[int, str]]] = [None]   # (panjang alias dalam token, id) yang berakhir di node
+        self._dict_link: List[int] = [-1]                      # node terdekat di rantai fail yang punya output
+        self.aliases = 0
+        for entry_id, canonical, aliases in entries:
+            self.add(entry_id, canonical, aliases)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # --- kompilasi ---
+    def add(self, entry_id: str, canonical: str, aliases: Iterable[str] = ()):
+        self.entries[entry_id] = Entry(entry_id, canonical)
+        for alias in [canonical, *aliases]:
+            tokens = _TOKEN.findall(_fold(alias))
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                nxt = self._goto[node].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._dict_link.append(-1)
+                node = nxt
+            # alias sama untuk dua id: entri pertama di file yang dipakai
+            if self._out[node] is None:
+                self._out[node] = (len(tokens), entry_id)
+                self.aliases += 1
+
+    def _build(self):
+        # BFS dari akar: fail link = sufiks terpanjang yang juga prefiks alias lain
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and token not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                fc = self._fail[child]
+                self._dict_link[child] = fc if self._out[fc] is not None else self._dict_link[fc]
+
+    @classmethod
+    def load(cls, path: str) -> "Gazetteer":
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, 1):
+                line = line.rstrip("\n")
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                parts = line.split("\t")
+                if len(parts) < 2 or not parts[0].strip() or not parts[1].strip():
+                    raise ValueError(f"{path}:{lineno}: expected 'id<TAB>canonical name<TAB>aliases'")
+                aliases = parts[2].split("|") if len(parts) > 2 else []
+                entries.append((parts[0].strip(), parts[1].strip(), [a.strip() for a in aliases if a.strip()]))
+        return cls(entries)
+
+    # --- pencocokan ---
+    def _scan(self, tokens: List[Tuple[str, int, int]]) -> List[Tuple[int, int, str]]:
+        # satu lintasan token -> semua kecocokan (indeks token awal, indeks token akhir eksklusif, id)
+        found = []
+        node = 0
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        for i, (token, _, _) in enumerate(tokens):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            hit = node if out[node] is not None else dict_link[node]
+            while hit > 0:
+                length, entry_id = out[hit]
+                found.append((i + 1 - length, i + 1, entry_id))
+                hit = dict_link[hit]
+        return found
+
+    @staticmethod
+    def _leftmost_longest(found: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        chosen, covered = [], 0
+        for start, end, entry_id in sorted(found, key=lambda m: (m[0], -m[1])):
+            if start >= covered:
+                chosen.append((start, end, entry_id))
+                covered = end
+        return chosen
+
+    def find(self, text: str) -> List[Match]:
+        # semua badan publik di teks (tidak tumpang tindih, urut posisi)
+        if not text or not self.entries:
+            return []
+        tokens = tokenize(text)
+        return [Match(tokens[s][1], tokens[e - 1][2], entry_id, self.entries[entry_id].canonical)
+                for s, e, entry_id in self._leftmost_longest(self._scan(tokens))]
+
+    def contains(self, text: str) -> bool:
+        if not text or not self.entries:
+            return False
+        return bool(self._scan(tokenize(text)))
+
+    def resolve(self, value: str) -> Optional[Entry]:
+        # nilai Termohon -> entri kanonik, HANYA kalau seluruh nilai adalah satu badan publik
+        # (sisa kata cuma FILLER_TOKENS). "Dinas Pendidikan Kota Bandung" tidak di-resolve ke
+        # Pemerintah Kota Bandung; nilai seperti itu dibiarkan apa adanya.
+        if not value or not self.entries:
+            return None
+        tokens = tokenize(value)
+        matches = self._leftmost_longest(self._scan(tokens))
+        if not matches or len({entry_id for _, _, entry_id in matches}) != 1:
+            return None
+        covered = set()
+        for start, end, _ in matches:
+            covered.update(range(start, end))
+        if any(tokens[i][0] not in FILLER_TOKENS for i in range(len(tokens)) if i not in covered):
+            return None
+        return self.entries[matches[0][2]]
+
+    def get(self, entry_id: str) -> Optional[Entry]:
+        return self.entries.get(entry_id)
+
+def load_or_empty(path: str) -> Gazetteer:
+    # gazetteer tidak wajib: file hilang/rusak -> ekstraksi tetap jalan dengan ORG_HINT saja
+    if not path:
+        return Gazetteer()
+    try:
+        return Gazetteer.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Gazetteer not loaded from {path} ({e}), using ORG_HINT only")
+        return Gazetteer()
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ekstraksi import _normalize_text, _extract_nomor, _extract_pemohon_termohon_sources, _fields_confident
+
+# Cek kesetaraan mesin ekstraksi terhadap korpus golden.
+# ekstraksi.jsonl direkam dari implementasi regex bertingkat SEBELUM diganti mesin satu-lintasan;
+# tiap baris: teks mentah + hasil normalisasi, nomor, pemohon, termohon, dan tier sumbernya.
+# Kedua: early exit per halaman (_extract_pdf_fields) harus memberi hasil yang sama dengan baca
+# penuh. Teks tiap kasus dipecah jadi 2/3/5 "halaman" per baris, juga dengan halaman pertama
+# dipindah ke belakang (label muncul belakangan).
+# Jalankan: python golden/cek_ekstraksi.py   (exit code 1 kalau ada yang berbeda)
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ekstraksi.jsonl")
+
+def _fields(raw: str):
+    text = _normalize_text(raw)
+    nomor = _extract_nomor(text)
+    pemohon, termohon, sources = _extract_pemohon_termohon_sources(text)
+    return (nomor, pemohon, termohon), sources
+
+def _read_pages(pages, early_exit: bool):
+    # meniru loop halaman di _extract_pdf_fields
+    raw = ""
+    for page in pages:
+        raw += page + "\n"
+        if early_exit:
+            fields, sources = _fields(raw)
+            if _fields_confident(fields[0], sources):
+                return fields
+    return _fields(raw)[0]
+
+def _page_splits(text: str):
+    lines = text.split("\n")
+    for parts in (2, 3, 5):
+        step = max(1, len(lines) // parts)
+        pages = ["\n".join(lines[i:i + step]) for i in range(0, len(lines), step)]
+        yield pages
+        yield pages[1:] + pages[:1]
+
+def main() -> int:
+    total, failed, early_failed = 0, 0, 0
+    with open(CORPUS, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            case = json.loads(line)
+            total += 1
+            for pages in _page_splits(case["text"]):
+                early, full = _read_pages(pages, True), _read_pages(pages, False)
+                if early != full:
+                    early_failed += 1
+                    print(f"#{lineno} early exit: {json.dumps([early, full], ensure_ascii=False)}")
+                    break
+            text = _normalize_text(case["text"])
+            pemohon, termohon, sources = _extract_pemohon_termohon_sources(text)
+            got = {"normalized": text, "nomor": _extract_nomor(text),
+                   "pemohon": pemohon, "termohon": termohon, "sources": sources}
+            diff = {k: (case[k], v) for k, v in got.items() if case[k] != v}
+            if diff:
+                failed += 1
+                print(f"#{lineno}: {json.dumps(diff, ensure_ascii=False)}")
+    print(f"{total - failed}/{total} kasus sama")
+    print(f"{total - early_failed}/{total} kasus early exit = baca penuh")
+    return 1 if failed or early_failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Sequence
+
+import metrics
+from model_loader import ModelUnavailable
+
+
+# ==== pool proses inferensi multi-core ====
+# INFERENCE_WORKERS=N (>0): N proses anak, masing-masing memuat model NER + klasifikasi sendiri,
+# dipin ke INFERENCE_THREADS core miliknya sendiri dan menjalankan TF/ONNX dengan
+# INFERENCE_THREADS thread. Front-end Flask hanya menaruh tugas di antrean berbatas:
+# maksimal INFERENCE_QUEUE_SIZE tugas menunggu/diproses per proses front-end; lebih dari itu
+# -> InferenceBusy -> 503 + Retry-After saat itu juga, bukan menggantung sampai timeout gunicorn.
+# Tugas sejenis yang sudah antre diambil sekaligus oleh satu proses anak (satu forward pass,
+# maks INFERENCE_MAX_BATCH teks, opsi sama), menggantikan micro-batcher di front-end.
+# Opsi tugas (mis. batch_size) harus hashable/bisa dibandingkan karena jadi kunci penggabungan.
+# INFERENCE_WORKERS=0 (default): model dimuat di proses gunicorn seperti biasa.
+# Pool dimiliki satu proses front-end; pakai gunicorn --workers 1 (thread boleh banyak) supaya
+# core tidak dipin dua kali oleh dua pool.
+# Seperti jobs.py, modul ini TIDAK mengimpor app.py; model baru di-import di proses anak.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS = max(1, int(os.environ.get("INFERENCE_THREADS", "1")))
+INFERENCE_QUEUE_SIZE = max(1, int(os.environ.get("INFERENCE_QUEUE_SIZE", "64")))
+INFERENCE_MAX_BATCH = max(1, int(os.environ.get("INFERENCE_MAX_BATCH", "16")))
+INFERENCE_TIMEOUT = float(os.environ.get("INFERENCE_TIMEOUT", "60"))
+INFERENCE_RETRY_AFTER = os.environ.get("INFERENCE_RETRY_AFTER", "1")
+INFERENCE_PIN_CORES = os.environ.get("INFERENCE_PIN_CORES", "1") == "1"
+INFERENCE_MP_CONTEXT = os.environ.get("INFERENCE_MP_CONTEXT", "spawn")
+# proses anak yang mati berulang kali (mis. OOM tiap memuat model) dijalankan ulang dengan jeda
+# 1, 2, 4, ... detik sampai INFERENCE_RESTART_MAX_DELAY; hitungan direset kalau proses sempat
+# hidup lebih lama dari INFERENCE_RESTART_RESET detik
+INFERENCE_RESTART_DELAY = float(os.environ.get("INFERENCE_RESTART_DELAY", "1"))
+INFERENCE_RESTART_MAX_DELAY = float(os.environ.get("INFERENCE_RESTART_MAX_DELAY", "60"))
+INFERENCE_RESTART_RESET = float(os.environ.get("INFERENCE_RESTART_RESET", "60"))
+
+MODEL_KINDS = ("classification", "ner")
+
+# hasil satu tugas + waktu tunggu di antrean dan waktu proses di worker (ms)
+PoolResult = namedtuple("PoolResult", ["value", "queue_wait_ms", "service_ms", "worker"])
+
+class InferenceBusy(RuntimeError):
+    pass
+
+
+# ---- sisi proses anak ----
+def _core_sets(workers: int, threads: int) -> List[List[int]]:
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # bukan Linux: tanpa pinning
+        return [[] for _ in range(workers)]
+    return [[cores[(i * threads + k) % len(cores)] for k in range(threads)] for i in range(workers)]
+
+def _load_models(index: int, results):
+    # -> ({model: LoadedModel atau pesan error}, {jenis tugas: (model, fungsi)})
+    import models
+    from ner_decoder import ner_entities
+
+    loaders = {"classification": models.load_classification, "ner": models.load_ner}
+    tasks = {
+        "classification": ("classification", lambda m, texts, bs: models.predict_probabilities(m, texts, bs)),
+        # opsi = (batch_size, max_length, stride, max_windows), lihat models.predict_windows
+        "classification_windows": ("classification", lambda m, texts, opt: models.predict_windows(
+            m, texts, batch_size=opt[0], max_length=opt[1], stride=opt[2], max_windows=opt[3])),
+        "ner": ("ner", lambda m, texts, bs: ner_entities(texts, m.model, m.tokenizer, models.id2label, batch_size=bs)),
+    }
+    loaded = {}
+    for name in MODEL_KINDS:
+        t0 = time.perf_counter()
+        try:
+            model = loaders[name]()
+            load_seconds = round(time.perf_counter() - t0, 3)
+            tasks[name][1](model, ["informasi publik"], 1)  # warmup graph
+            loaded[name] = model
+            status = {"state": "ready", "source": model.source, "load_seconds": load_seconds, "error": None}
+        except Exception as e:
+            loaded[name] = f"{type(e).__name__}: {e}"
+            status = {"state": "failed", "source": None, "load_seconds": None, "error": loaded[name]}
+        results.put(("model", index, name, status))
+    return loaded, tasks
+
+def _take_batch(tasks, taken_conn, held: deque, parent: int):
+    # tugas pertama (blocking), lalu tugas sejenis yang SUDAH antre sampai INFERENCE_MAX_BATCH teks;
+    # tugas jenis lain yang terambil disimpan untuk putaran berikutnya. Semua id yang keluar dari
+    # antrean dilaporkan lewat pipe milik proses ini, termasuk yang disimpan di `held`: kalau
+    # proses ini mati, front-end langsung menggagalkan semuanya. Pipe, bukan antrean hasil:
+    # Connection.send() menulis saat itu juga, sedangkan Queue.put() lewat thread feeder yang
+    # ikut hilang kalau proses mati tepat sesudahnya.
+    taken = []
+    while not held:
+        try:
+            task = tasks.get(timeout=1.0)
+        except queue.Empty:
+            if os.getppid() != parent:  # front-end mati -> ikut berhenti
+                return None
+            continue
+        held.append(task)
+        taken.append(task[0])
+    first = held.popleft()
+    batch, texts = [first], len(first[2])
+    while texts < INFERENCE_MAX_BATCH:
+        try:
+            task = tasks.get_nowait()
+        except queue.Empty:
+            break
+        taken.append(task[0])
+        if task[1] == first[1] and task[3] == first[3]:
+            batch.append(task)
+            texts += len(task[2])
+        else:
+            held.append(task)
+    if taken:
+        taken_conn.send(taken)
+    return batch
+
+def _worker_main(index: int, cores: List[int], threads: int, tasks, results, taken_conn):
+    if cores:
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            print(f"inference worker {index}: cannot pin to cores {cores} ({e})")
+    # harus sebelum tensorflow/onnx_backend di-import
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
+    os.environ["ONNX_THREADS"] = str(threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    parent = os.getppid()
+    loaded, handlers = _load_models(index, results)
+    held = deque()
+    while True:
+        batch = _take_batch(tasks, taken_conn, held, parent)
+        if batch is None:
+            return
+        # pemanggil sudah menyerah (timeout) sebelum tugas ini terambil: jangan dijalankan
+        now = time.time()
+        expired = [t[0] for t in batch if t[5] < now]
+        if expired:
+            results.put(("expired", index, expired))
+            batch = [t for t in batch if t[5] >= now]
+            if not batch:
+                continue
+        kind, options = batch[0][1], batch[0][3]
+        started = time.time()
+        try:
+            name, run = handlers[kind]
+            model = loaded[name]
+            if isinstance(model, str):
+                raise ModelUnavailable(f"{name} model failed to load: {model}")
+            values = run(model, [text for t in batch for text in t[2]], options)
+            error = None
+        except Exception as e:
+            values, error = None, f"{type(e).__name__}: {e}"
+        finished = time.time()
+        offset = 0
+        for task_id, _, texts, _, enqueued, _ in batch:
+            value = None if error else values[offset:offset + len(texts)]
+            offset += len(texts)
+            results.put(("done", index, task_id, value, error, enqueued, started, finished))
+
+
+# ---- sisi front-end ----
+class InferencePool:
+    def __init__(self, workers: int = INFERENCE_WORKERS, threads: int = INFERENCE_THREADS,
+                 queue_size: int = INFERENCE_QUEUE_SIZE, timeout: float = INFERENCE_TIMEOUT):
+        self.workers = max(0, int(workers))
+        self.threads = threads
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _reset(self):
+        # dipanggil ulang setelah fork: proses anak, queue & thread collector milik proses induk
+        self._pid = os.getpid()
+        self._ctx = multiprocessing.get_context(INFERENCE_MP_CONTEXT)
+        self._tasks = None
+        self._results = None
+        self._procs = []
+        self._collector = None
+        self._ids = itertools.count()
+        self._pending = {}   # task_id -> Future; tugas yang ditinggal pemanggil tetap dihitung sampai
+                             # worker menyelesaikan/membuangnya, supaya kapasitas tidak melebihi queue_size
+        self._taken = {}     # worker -> {task_id} yang sudah keluar dari antrean tapi belum selesai
+        self._models = {}    # worker -> {kind: status}
+        self._crashes = {}   # worker -> jumlah crash beruntun (untuk jeda restart)
+        self._restart_at = {}  # worker mati -> waktu (monotonic) boleh dijalankan ulang
+        self._stats = {"tasks": 0, "texts": 0, "rejected": 0, "timeouts": 0, "expired": 0, "lost": 0,
+                       "crashed_tasks": 0, "worker_restarts": 0, "queue_wait_ms_total": 0.0,
+                       "queue_wait_ms_max": 0.0, "service_ms_total": 0.0, "service_ms_max": 0.0, "completed": 0}
+
+    def start(self):
+        # proses anak multiprocessing (mis. `python app.py` + spawn mengimpor ulang app.py) tidak
+        # boleh ikut membuat pool sendiri
+        if not self.enabled or multiprocessing.parent_process() is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if self._procs:
+                return
+            self._tasks = self._ctx.Queue()
+            self._results = self._ctx.Queue()
+            cores = _core_sets(self.workers, self.threads) if INFERENCE_PIN_CORES else [[]] * self.workers
+            self._procs = [None] * self.workers
+            for i in range(self.workers):
+                self._spawn(i, cores[i])
+            self._collector = threading.Thread(target=self._collect, name="inference-collector", daemon=True)
+            self._collector.start()
+
+    def _spawn(self, index: int, cores: List[int]):
+        taken_reader, taken_writer = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(target=_worker_main, name=f"inference-{index}", daemon=True,
+                                 args=(index, cores, self.threads, self._tasks, self._results, taken_writer))
+        proc.start()
+        taken_writer.close()
+        proc.cores = cores
+        proc.taken_conn = taken_reader
+        proc.started = time.monotonic()
+        self._procs[index] = proc
+        self._models[index] = {kind: {"state": "loading"} for kind in MODEL_KINDS}
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                msg = self._results.get(timeout=1.0)
+            except queue.Empty:
+                msg = None
+            if msg is None or time.monotonic() - last_check >= 1.0:
+                self._check_workers()
+                last_check = time.monotonic()
+            if msg is None:
+                continue
+            if msg[0] == "done":
+                self._finish(*msg[1:])
+                continue
+            if msg[0] == "expired":
+                self._expire(*msg[1:])
+                continue
+            with self._lock:
+                _, index, kind, status = msg  # "model"
+                self._models[index][kind] = status
+                metrics.set_gauge("model_load_seconds", status.get("load_seconds"), model=kind,
+                                  source=status.get("source"), worker=index)
+
+    def _drain_taken(self, index: int):
+        # dipanggil dengan _lock dipegang. Id di pipe selalu dikirim SEBELUM hasilnya masuk antrean
+        # hasil, jadi menguras pipe dulu menjamin "done"/"expired" tidak mendahului id-nya.
+        conn = self._procs[index].taken_conn
+        try:
+            while conn.poll():
+                self._taken.setdefault(index, set()).update(conn.recv())
+        except (EOFError, OSError):
+            pass
+
+    def _finish(self, index, task_id, value, error, enqueued, started, finished):
+        wait_ms = max(0.0, (started - enqueued) * 1000.0)
+        service_ms = (finished - started) * 1000.0
+        with self._lock:
+            self._drain_taken(index)
+            self._taken.get(index, set()).discard(task_id)
+            fut = self._pending.pop(task_id, None)
+            s = self._stats
+            s["completed"] += 1
+            s["queue_wait_ms_total"] += wait_ms
+            s["queue_wait_ms_max"] = max(s["queue_wait_ms_max"], wait_ms)
+            s["service_ms_total"] += service_ms
+            s["service_ms_max"] = max(s["service_ms_max"], service_ms)
+        metrics.observe("stage_seconds", wait_ms / 1000.0, stage="inference_queue")
+        metrics.observe("stage_seconds", service_ms / 1000.0, stage="inference_service")
+        if fut is None or fut.done():  # sudah timeout (dibatalkan) di sisi pemanggil
+            return
+        if error:
+            name, _, message = error.partition(": ")
+            fut.set_exception(ModelUnavailable(message) if name == "ModelUnavailable" else RuntimeError(error))
+        else:
+            fut.set_result(PoolResult(value, round(wait_ms, 2), round(service_ms, 2), index))
+
+    def _expire(self, index, task_ids):
+        with self._lock:
+            self._drain_taken(index)
+            taken = self._taken.get(index, set())
+            futures = []
+            for task_id in task_ids:
+                taken.discard(task_id)
+                futures.append(self._pending.pop(task_id, None))
+            self._stats["expired"] += len(task_ids)
+        for fut in futures:
+            if fut is not None and not fut.done():
+                fut.set_exception(InferenceBusy("Inference deadline passed before a worker was free, try again later"))
+
+    def _check_workers(self):
+        # proses anak mati (OOM, segfault): gagalkan SEKARANG semua tugas yang sudah diambilnya
+        # (termasuk yang masih disimpan di antrean lokalnya), lalu jalankan ulang dengan jeda
+        now = time.monotonic()
+        lost = []
+        with self._lock:
+            for index, proc in enumerate(self._procs):
+                self._drain_taken(index)
+                if proc.is_alive():
+                    continue
+                if index not in self._restart_at:
+                    proc.taken_conn.close()
+                    held = [self._pending.pop(i, None) for i in self._taken.pop(index, ())]
+                    lost.extend((index, fut) for fut in held)
+                    self._stats["crashed_tasks"] += len(held)
+                    if now - proc.started > INFERENCE_RESTART_RESET:
+                        self._crashes[index] = 0
+                    self._crashes[index] = self._crashes.get(index, 0) + 1
+                    delay = min(INFERENCE_RESTART_MAX_DELAY, INFERENCE_RESTART_DELAY * 2 ** (self._crashes[index] - 1))
+                    self._restart_at[index] = now + delay
+                    self._models[index] = {kind: {"state": "crashed"} for kind in MODEL_KINDS}
+                    print(f"inference worker {index} exited ({proc.exitcode}), restarting in {delay:g}s")
+                if now >= self._restart_at[index]:
+                    del self._restart_at[index]
+                    self._taken.pop(index, None)
+                    self._stats["worker_restarts"] += 1
+                    self._spawn(index, proc.cores)
+            # jaring pengaman: "take" dari proses yang mati tepat setelah mengambil tugas bisa tidak
+            # pernah sampai; tugas yang jauh lewat tenggat tidak boleh memakan kapasitas selamanya
+            cutoff = time.time() - self.timeout
+            stale = [task_id for task_id, fut in self._pending.items() if fut.deadline < cutoff]
+            for task_id in stale:
+                lost.append((None, self._pending.pop(task_id)))
+                for taken in self._taken.values():
+                    taken.discard(task_id)
+            self._stats["lost"] += len(stale)
+        for index, fut in lost:
+            if fut is not None and not fut.done():
+                fut.set_exception(RuntimeError(f"inference worker {index} crashed" if index is not None
+                                               else "inference task was lost"))
+
+    def submit(self, kind: str, texts: Sequence[str], options: Any, deadline: float = None) -> Future:
+        # deadline = time.time() batas pemanggil menunggu; worker membuang tugas yang sudah lewat
+        self.start()
+        fut = Future()
+        fut.deadline = time.time() + self.timeout if deadline is None else deadline
+        with self._lock:
+            if len(self._pending) >= self.queue_size:
+                self._stats["rejected"] += 1
+                raise InferenceBusy(f"Inference queue is full ({self.queue_size} requests), try again later")
+            task_id = next(self._ids)
+            self._pending[task_id] = fut
+            self._stats["tasks"] += 1
+            self._stats["texts"] += len(texts)
+        self._tasks.put((task_id, kind, list(texts), options, time.time(), fut.deadline))
+        fut.task_id = task_id
+        return fut
+
+    def map(self, kind: str, chunks: Sequence[Sequence[str]], options: Any, timeout: float = None) -> List[PoolResult]:
+        # beberapa potongan sekaligus (tersebar ke beberapa proses), hasil sesuai urutan potongan
+        futures = []
+        limit = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + limit
+        try:
+            for chunk in chunks:
+                futures.append(self.submit(kind, chunk, options, time.time() + limit))
+        except InferenceBusy:
+            self._forget(futures)
+            raise
+        try:
+            return [fut.result(max(0.0, deadline - time.monotonic())) for fut in futures]
+        except FutureTimeout:
+            self._forget(futures)
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise InferenceBusy(f"Inference did not finish within {limit:g}s, try again later")
+
+    def call(self, kind: str, texts: Sequence[str], options: Any, timeout: float = None) -> PoolResult:
+        return self.map(kind, [texts], options, timeout)[0]
+
+    def _forget(self, futures: List[Future]):
+        # hasil yang datang belakangan dibuang. Slot antrean TIDAK langsung dibebaskan: tugasnya
+        # masih di antrean multiprocessing dan tetap memakan worker sampai dibuang (lewat tenggat)
+        # atau selesai, jadi tetap dihitung di _pending sampai worker melaporkannya
+        for fut in futures:
+            fut.cancel()
+
+    def ready(self) -> bool:
+        with self._lock:
+            return bool(self._procs) and self._pid == os.getpid() and all(
+                s.get("state") == "ready" for m in self._models.values() for s in m.values())
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                str(i): {"pid": p.pid, "alive": p.is_alive(), "cores": p.cores, "models": self._models.get(i, {})}
+                for i, p in enumerate(self._procs)
+            } if self._pid == os.getpid() else {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s["in_flight"] = len(self._pending) if self._pid == os.getpid() else 0
+        done = s["completed"]
+        s["avg_queue_wait_ms"] = s["queue_wait_ms_total"] / done if done else 0.0
+        s["avg_service_ms"] = s["service_ms_total"] / done if done else 0.0
+        s = {k: round(v, 2) if isinstance(v, float) else v for k, v in s.items()}
+        s["config"] = {"workers": self.workers, "threads": self.threads, "queue_size": self.queue_size,
+                       "max_batch": INFERENCE_MAX_BATCH, "timeout": self.timeout, "pin_cores": INFERENCE_PIN_CORES}
+        return s
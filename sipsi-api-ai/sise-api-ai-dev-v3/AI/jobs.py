@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from ekstraksi import _extract_pdf_fields, _spool_upload, UploadTooLarge
+
+
+# ==== job ekstraksi PDF massal ====
+# Parsing pdfplumber + regex berjalan di process pool (CPU-bound, tidak kena GIL).
+# Modul ini sengaja TIDAK mengimpor app.py, jadi proses anak tidak ikut memuat model.
+# Catatan: konteks "spawn" mengimpor ulang modul __main__; di bawah gunicorn itu aman,
+# tapi saat `python app.py` langsung, tiap proses anak akan ikut memuat app.py.
+JOBS_DIRECTORY = os.environ.get("JOBS_DIRECTORY", "jobs")
+JOBS_POOL_SIZE = int(os.environ.get("JOBS_POOL_SIZE", "0")) or (os.cpu_count() or 1)
+JOBS_MP_CONTEXT = os.environ.get("JOBS_MP_CONTEXT", "spawn")
+JOBS_MAX_FILES = int(os.environ.get("JOBS_MAX_FILES", "1000"))
+JOBS_NER_BATCH = int(os.environ.get("JOBS_NER_BATCH", "16"))
+# batas satu ZIP: ukuran file ZIP yang di-spool ke disk DAN total isi PDF setelah diekstrak
+JOBS_MAX_ZIP_MB = float(os.environ.get("JOBS_MAX_ZIP_MB", "500"))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=JOBS_POOL_SIZE,
+                                        mp_context=multiprocessing.get_context(JOBS_MP_CONTEXT))
+            _pool_pid = os.getpid()
+        return _pool
+
+def reset_pool():
+    # dipanggil kalau pool rusak (BrokenProcessPool), misalnya anak mati karena OOM
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            shutdown_pool(_pool)
+        _pool = None
+
+def shutdown_pool(pool: ProcessPoolExecutor):
+    # image Docker masih Python 3.8: shutdown(cancel_futures=True) baru ada di 3.9, dan
+    # shutdown(wait=False) dengan antrean berisi membuat thread pengelola pool 3.8 crash sehingga
+    # future yang sudah diambil anak tidak pernah selesai. Jadi proses anak dimatikan dulu; thread
+    # pengelola lalu menandai SEMUA future yang tersisa BrokenProcessPool dan selesai sendiri.
+    # (future tidak di-cancel() manual: di 3.8 itu balapan dengan thread pengelola)
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=True)
+
+# Dijalankan di proses anak: satu PDF -> field hasil regex (tanpa NER)
+def extract_file(path: str) -> dict:
+    try:
+        fields = _extract_pdf_fields(path)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    if not fields["text"].strip():
+        return {"error": "PDF contains no extractable text (probably image-only).",
+                "pages_read": fields["pages_read"]}
+    return {
+        "nomor": fields["nomor"],
+        "pemohon": fields["pemohon"],
+        "termohon": fields["termohon"],
+        "termohon_id": fields["termohon_id"],
+        "pages_read": fields["pages_read"],
+        "error": None,
+    }
+
+
+# ==== penyimpanan upload job ====
+def job_dir(job_id: str) -> str:
+    return os.path.join(JOBS_DIRECTORY, job_id)
+
+def remove_job_files(job_id: str):
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+def _move_into(tmp_path: str, job_id: str, position: int) -> str:
+    dest = os.path.join(job_dir(job_id), f"{position:05d}.pdf")
+    shutil.move(tmp_path, dest)
+    return dest
+
+def _copy_limited(src, out, max_bytes: int) -> bool:
+    # hitung byte yang BENAR-BENAR disalin: file_size di header ZIP bisa dipalsukan (zip bomb)
+    copied = 0
+    while True:
+        chunk = src.read(1 << 20)
+        if not chunk:
+            return True
+        copied += len(chunk)
+        if copied > max_bytes:
+            return False
+        out.write(chunk)
+
+def _is_pdf_member(info: zipfile.ZipInfo) -> bool:
+    name = info.filename
+    return not info.is_dir() and name.lower().endswith(".pdf") and not os.path.basename(name).startswith(".")
+
+def _save_zip_members(zip_path: str, job_id: str, start: int, max_bytes: int, rejected: List[Tuple[str, str]],
+                      zip_name: str) -> List[Tuple[str, str]]:
+    saved = []
+    zip_budget = int(JOBS_MAX_ZIP_MB * 1024 * 1024)
+    with zipfile.ZipFile(zip_path) as zf:
+        # cek central directory dulu: terlalu banyak PDF / total terlalu besar -> tolak tanpa mengekstrak apa pun
+        members = [info for info in zf.infolist() if _is_pdf_member(info)]
+        if start + len(members) > JOBS_MAX_FILES:
+            rejected.append((zip_name, f"ZIP contains too many PDF files (max {JOBS_MAX_FILES})!"))
+            return saved
+        if sum(info.file_size for info in members) > zip_budget:
+            rejected.append((zip_name, f"ZIP content is too large (max {JOBS_MAX_ZIP_MB:g} MB)!"))
+            return saved
+        for info in members:
+            name = info.filename
+            if info.file_size > max_bytes:
+                rejected.append((name, "File is too large!"))
+                continue
+            # file_size bisa dipalsukan: sisa anggaran ZIP juga ditegakkan saat menyalin
+            limit = min(max_bytes, zip_budget)
+            dest = os.path.join(job_dir(job_id), f"{start + len(saved):05d}.pdf")
+            with zf.open(info) as src, open(dest, "wb") as out:
+                complete = _copy_limited(src, out, limit)
+                zip_budget -= out.tell()
+            if not complete:
+                os.unlink(dest)
+                if limit < max_bytes:
+                    # header ZIP berbohong: tolak seluruh ZIP, termasuk anggota yang sudah tersalin
+                    for _, path in saved:
+                        os.unlink(path)
+                    rejected.append((zip_name, f"ZIP content is too large (max {JOBS_MAX_ZIP_MB:g} MB)!"))
+                    return []
+                rejected.append((name, "File is too large!"))
+                continue
+            saved.append((name, dest))
+    return saved
+
+def save_uploads(files, job_id: str, max_bytes: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    # -> ([(nama_asli, path_di_disk)], [(nama_asli, alasan_ditolak)])
+    os.makedirs(job_dir(job_id), exist_ok=True)
+    saved, rejected = [], []
+    for f in files:
+        if len(saved) > JOBS_MAX_FILES:
+            break
+        name = f.filename or ""
+        lower = name.lower()
+        if not (lower.endswith(".pdf") or lower.endswith(".zip")):
+            rejected.append((name, "File is not a PDF or ZIP!"))
+            continue
+        try:
+            tmp = _spool_upload(f, max_bytes if lower.endswith(".pdf") else int(JOBS_MAX_ZIP_MB * 1024 * 1024))
+        except UploadTooLarge:
+            rejected.append((name, "File is too large!"))
+            continue
+        if lower.endswith(".pdf"):
+            saved.append((name, _move_into(tmp, job_id, len(saved))))
+            continue
+        try:
+            saved.extend(_save_zip_members(tmp, job_id, len(saved), max_bytes, rejected, name))
+        except zipfile.BadZipFile:
+            rejected.append((name, "Invalid ZIP archive!"))
+        finally:
+            os.unlink(tmp)
+    return saved, rejected
@@ -0,0 +1,245 @@
+import bisect
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Optional, Tuple
+
+
+# ==== metrik latensi per tahap + endpoint /metrics (format teks Prometheus) ====
+# METRICS_ENABLED=0 -> semua fungsi di sini langsung return (stage() = context manager kosong),
+# jadi jalur panas tidak membayar apa-apa.
+# Tahap yang diukur: parsing halaman pdfplumber, _normalize_text, ekstraksi field, tokenisasi,
+# forward pass, NER, query & commit Postgres, antrean/proses pool inferensi, request HTTP.
+# Tiap tahap: histogram kumulatif (untuk histogram_quantile) + p50/p95/p99 dari METRICS_RECENT
+# sampel terakhir (summary). Metrik per proses: di belakang gunicorn multi-worker tiap scrape
+# melihat satu worker; proses anak (jobs.py, inference_pool.py) tidak ikut diekspor.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_PREFIX = os.environ.get("METRICS_PREFIX", "sipsi")
+METRICS_RECENT = int(os.environ.get("METRICS_RECENT", "1024"))
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# nama metrik -> (tipe, help, buckets)
+FAMILIES = {
+    "stage_seconds": ("histogram", "Latency per processing stage", SECONDS_BUCKETS),
+    "http_request_seconds": ("histogram", "HTTP request latency per endpoint", SECONDS_BUCKETS),
+    "http_requests_total": ("counter", "HTTP requests per endpoint and status", None),
+    "pages_parsed_total": ("counter", "PDF pages parsed by pdfplumber", None),
+    "tokens_processed_total": ("counter", "Tokens sent through a model forward pass", None),
+    "batch_size": ("histogram", "Items per batch", SIZE_BUCKETS),
+    "extraction_tier_total": ("counter", "Extraction tier that resolved each pemohon/termohon field", None),
+    "extract_cache_total": ("counter", "PDF extraction cache lookups by result", None),
+    "model_load_seconds": ("gauge", "Model load time", None),
+    "slow_requests_profiled_total": ("counter", "Slow requests written by the sampling profiler", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "recent")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=METRICS_RECENT)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], object] = {}
+
+    def _key(self, name: str, labels: dict) -> Tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = _Histogram(FAMILIES[name][2])
+            hist.observe(value)
+
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda kv: kv[0])
+            snapshot = [(key, v if not isinstance(v, _Histogram) else
+                         (list(v.counts), v.sum, v.count, sorted(v.recent), v.buckets)) for key, v in items]
+        out, seen, recent_lines = [], set(), {}
+        for (name, labels), value in snapshot:
+            kind, help_text, _ = FAMILIES[name]
+            full = f"{METRICS_PREFIX}_{name}"
+            if name not in seen:
+                seen.add(name)
+                out.append(f"# HELP {full} {help_text}")
+                out.append(f"# TYPE {full} {kind}")
+            if kind != "histogram":
+                out.append(f"{full}{_labels(labels)} {_num(value)}")
+                continue
+            counts, total, count, recent, buckets = value
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"),), counts):
+                cumulative += n
+                out.append(f"{full}_bucket{_labels(labels + (('le', _num(bound)),))} {cumulative}")
+            out.append(f"{full}_sum{_labels(labels)} {_num(total)}")
+            out.append(f"{full}_count{_labels(labels)} {count}")
+            for q in QUANTILES if recent else ():
+                v = recent[min(len(recent) - 1, int(q * len(recent)))]
+                recent_lines.setdefault(name, []).append(
+                    f"{full}_recent{_labels(labels + (('quantile', str(q)),))} {_num(v)}")
+        # p50/p95/p99 dari sampel terbaru: family terpisah (<nama>_recent) supaya tidak bentrok
+        # dengan tipe histogram
+        for name, lines in recent_lines.items():
+            full = f"{METRICS_PREFIX}_{name}_recent"
+            out.append(f"# HELP {full} {FAMILIES[name][1]} (last {METRICS_RECENT} samples)")
+            out.append(f"# TYPE {full} summary")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+registry = Registry()
+
+def inc(name: str, value: float = 1.0, **labels):
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+def set_gauge(name: str, value: float, **labels):
+    if METRICS_ENABLED and value is not None:
+        registry.set(name, value, **labels)
+
+def observe(name: str, value: float, **labels):
+    if METRICS_ENABLED:
+        registry.observe(name, value, **labels)
+
+class _Stage:
+    __slots__ = ("labels", "t0")
+
+    def __init__(self, labels: dict):
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe("stage_seconds", time.perf_counter() - self.t0, **self.labels)
+        return False
+
+_NOOP = contextlib.nullcontext()
+
+def stage(name: str, **labels):
+    # with metrics.stage("forward", model="roberta"): ...
+    return _Stage(dict(labels, stage=name)) if METRICS_ENABLED else _NOOP
+
+def render() -> str:
+    return registry.render()
+
+
+# ==== profiler sampling untuk request lambat (opt-in) ====
+# PROFILE_SLOW_MS > 0: selama request berjalan, thread sampler mengambil stack thread request
+# tiap PROFILE_INTERVAL_MS. Request yang lebih lama dari PROFILE_SLOW_MS (atau yang mengirim
+# header X-Profile: 1) ditulis ke PROFILE_DIRECTORY dalam format "folded stacks"
+# (bisa langsung dibuka dengan flamegraph.pl / speedscope). Tanpa PROFILE_SLOW_MS tidak ada
+# thread sampler sama sekali.
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIRECTORY = os.environ.get("PROFILE_DIRECTORY", "profiles")
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, directory: str = PROFILE_DIRECTORY):
+        self.interval = max(0.001, interval_ms / 1000.0)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # dipanggil ulang setelah fork (gunicorn): thread sampler tidak ikut terwariskan
+        self._pid = os.getpid()
+        self._active: Dict[int, Counter] = {}
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def begin(self) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            self._ensure_thread()
+            self._active[ident] = Counter()
+        return ident
+
+    def end(self, ident: int) -> Optional[Counter]:
+        with self._lock:
+            return self._active.pop(ident, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+
+    def dump(self, samples: Counter, name: str, elapsed_ms: float) -> Optional[str]:
+        if not samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{safe}-{int(elapsed_ms)}ms.folded")
+        with open(path, "w") as f:
+            for stack, n in samples.most_common():
+                f.write(f"{stack} {n}\n")
+        inc("slow_requests_profiled_total", endpoint=name)
+        return path
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+profiler = SamplingProfiler() if PROFILE_SLOW_MS > 0 else None
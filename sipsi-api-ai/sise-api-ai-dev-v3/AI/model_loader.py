@@ -0,0 +1,200 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from typing import Any, Callable, Optional
+
+import metrics
+from prediction_cache import weights_fingerprint
+
+
+# ==== startup model: paralel, lazy, artefak siap-muat ====
+# SERVICE_MODE=production -> TIDAK pernah download dari HuggingFace Hub; model lokal
+#   tidak ada = slot gagal dan /readyz 503 (bukan diam-diam download saat start).
+# MODEL_LOADING:
+#   background (default) -> semua model mulai dimuat bersamaan di thread saat import,
+#                           worker langsung bisa melayani /healthz
+#   blocking             -> sama, tapi import menunggu sampai semua siap (untuk --preload)
+#   lazy                 -> tiap model baru dimuat saat endpoint-nya pertama kali dipakai
+# MODEL_RETRY_SECONDS: slot yang gagal dimuat dicoba lagi (oleh start()/get() berikutnya)
+#   paling cepat setelah sekian detik; kegagalan sementara (disk/jaringan) tidak permanen.
+# INFERENCE_BACKEND: tf (default) atau onnx (hasil export_onnx.py, lihat onnx_backend.py)
+SERVICE_MODE = os.environ.get("SERVICE_MODE", "development")
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "background")
+MODEL_ARTIFACT_DIRECTORY = os.environ.get("MODEL_ARTIFACT_DIRECTORY", "artifacts")
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "1") == "1"
+MODEL_WAIT_SECONDS = float(os.environ.get("MODEL_WAIT_SECONDS", "300"))
+MODEL_RETRY_SECONDS = float(os.environ.get("MODEL_RETRY_SECONDS", "60"))
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "tf")
+
+ARTIFACT_STAMP = "SOURCE_FINGERPRINT"
+
+LoadedModel = namedtuple("LoadedModel", ["model", "tokenizer", "source"])
+
+class ModelUnavailable(RuntimeError):
+    pass
+
+
+# --- artefak: checkpoint dasar + load_weights digabung jadi satu save_pretrained ---
+# Start berikutnya cukup satu from_pretrained dari folder artefak. Artefak dibangun ulang
+# otomatis kalau file sumber (config, tokenizer, bobot) berubah.
+def _artifact_fingerprint(artifact_dir: str) -> Optional[str]:
+    try:
+        with open(os.path.join(artifact_dir, ARTIFACT_STAMP)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _write_artifact(artifact_dir: str, loaded: LoadedModel, fingerprint: str):
+    tmp = f"{artifact_dir}.tmp-{uuid.uuid4().hex[:8]}"
+    try:
+        loaded.model.save_pretrained(tmp)
+        loaded.tokenizer.save_pretrained(tmp)
+        with open(os.path.join(tmp, ARTIFACT_STAMP), "w") as f:
+            f.write(fingerprint)
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+        os.replace(tmp, artifact_dir)
+    except Exception as e:
+        # volume read-only / worker lain sedang menulis: cukup lewati, model tetap terpakai
+        print(f"Model artifact {artifact_dir} not written ({e})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def load_pretrained(name: str, model_cls, tokenizer_cls, model_path: str, tokenizer_path: str,
+                    weights_path: str, hub_id: str, download_kwargs: dict = None, backend: str = None,
+                    **model_kwargs) -> LoadedModel:
+    fingerprint = weights_fingerprint(model_path, tokenizer_path, weights_path)
+    if (backend or INFERENCE_BACKEND) == "onnx":
+        import onnx_backend
+        loaded = onnx_backend.load_export(name, tokenizer_cls, fingerprint)
+        if loaded is not None:
+            return loaded
+        # export belum ada / basi / gagal uji paritas -> tetap jalan dengan TensorFlow
+
+    artifact_dir = os.path.join(MODEL_ARTIFACT_DIRECTORY, name)
+    if _artifact_fingerprint(artifact_dir) == fingerprint:
+        try:
+            return LoadedModel(model_cls.from_pretrained(artifact_dir, local_files_only=True),
+                               tokenizer_cls.from_pretrained(artifact_dir, local_files_only=True), "artifact")
+        except Exception as e:
+            print(f"{name}: artifact {artifact_dir} unusable ({e}), rebuilding from checkpoint")
+
+    try:
+        model = model_cls.from_pretrained(model_path, local_files_only=True, **model_kwargs)
+        tokenizer = tokenizer_cls.from_pretrained(tokenizer_path, local_files_only=True)
+        source = "checkpoint"
+    except Exception as e:
+        if SERVICE_MODE == "production":
+            raise ModelUnavailable(f"{name}: no local model in {model_path} and downloads are disabled in production ({e})")
+        print(f"{name}: local model not found, downloading {hub_id}...")
+        model = model_cls.from_pretrained(hub_id, **dict(model_kwargs, **(download_kwargs or {})))
+        tokenizer = tokenizer_cls.from_pretrained(hub_id)
+        model.save_pretrained(model_path)
+        tokenizer.save_pretrained(tokenizer_path)
+        source = "download"
+
+    model.load_weights(weights_path)
+    loaded = LoadedModel(model, tokenizer, source)
+    _write_artifact(artifact_dir, loaded, weights_fingerprint(model_path, tokenizer_path, weights_path))
+    return loaded
+
+
+# --- slot: satu model yang dimuat sekali per proses, dengan status untuk /readyz ---
+class ModelSlot:
+    def __init__(self, name: str, load: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self._load = load
+        self._warmup = warmup
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._done = threading.Event()
+        self._thread = None
+        self.value = None
+        self.state = "idle"  # idle / loading / ready / failed
+        self.error = None
+        self.failed_at = None
+        self.source = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    def start(self):
+        with self._lock:
+            # setelah fork (gunicorn --preload) thread loader tidak ikut; model yang sudah siap tetap dipakai
+            if self._pid != os.getpid() and self.state != "ready":
+                self._reset()
+            # gagal -> kembali idle setelah backoff, supaya kegagalan sementara bisa pulih
+            if self.state == "failed" and time.monotonic() - self.failed_at >= MODEL_RETRY_SECONDS:
+                print(f"{self.name} model: retrying load after failure ({self.error})")
+                self.state = "idle"
+            if self.state == "idle":
+                self.state = "loading"
+                self._done = threading.Event()
+                self._thread = threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        done = self._done
+        t0 = time.perf_counter()
+        try:
+            value = self._load()
+            self.load_seconds = round(time.perf_counter() - t0, 3)
+            self.source = getattr(value, "source", None)
+            metrics.set_gauge("model_load_seconds", self.load_seconds, model=self.name, source=self.source)
+            if self._warmup and MODEL_WARMUP:
+                t1 = time.perf_counter()
+                self._warmup(value)
+                self.warmup_seconds = round(time.perf_counter() - t1, 3)
+            self.value = value
+            self.error = None
+            self.state = "ready"
+            print(f"{self.name} model ready ({self.source}, load {self.load_seconds}s, warmup {self.warmup_seconds}s)")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.failed_at = time.monotonic()
+            self.state = "failed"
+            print(f"{self.name} model failed to load: {self.error}")
+        finally:
+            done.set()
+
+    def get(self, timeout: float = None) -> Any:
+        if self.state != "ready":
+            self.start()
+            if not self._done.wait(MODEL_WAIT_SECONDS if timeout is None else timeout):
+                raise ModelUnavailable(f"{self.name} model is still loading")
+            if self.state != "ready":
+                raise ModelUnavailable(f"{self.name} model failed to load: {self.error}")
+        return self.value
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "source": self.source,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+def start_slots(*slots: ModelSlot):
+    if MODEL_LOADING == "lazy":
+        return
+    for slot in slots:
+        slot.start()
+    if MODEL_LOADING == "blocking":
+        for slot in slots:
+            slot._done.wait()
+
+def ready(*slots: ModelSlot) -> bool:
+    # probe /readyz ikut memicu percobaan ulang slot yang gagal (setelah MODEL_RETRY_SECONDS)
+    for s in slots:
+        if s.state == "failed":
+            s.start()
+    # mode lazy: siap selama belum ada yang gagal (model dimuat saat request pertama)
+    if MODEL_LOADING == "lazy":
+        return all(s.state != "failed" for s in slots)
+    return all(s.state == "ready" for s in slots)
@@ -0,0 +1,123 @@
+import numpy as np
+import tensorflow as tf
+from transformers import TFAutoModelForTokenClassification, AutoTokenizer, TFRobertaForSequenceClassification, RobertaTokenizer
+
+import metrics
+from model_loader import LoadedModel, load_pretrained
+
+# Spesifikasi, loader & fungsi prediksi kedua model. Dipisah dari app.py supaya skrip offline
+# (export_onnx.py) dan proses inferensi (inference_pool.py) bisa memuat model tanpa ikut
+# membuka koneksi database/Flask.
+
+# Define the paths for saving/loading
+ner_model_path = "pretrainedModel/BERT"
+ner_tokenizer_path = "pretrainedModel/BERT"
+ner_weights_path = "NER-INDO/INDO-NER-weights"
+classification_model_path = "pretrainedModel/ROBERTA"
+classification_tokenizer_path = "pretrainedModel/ROBERTA"
+classification_weights_path = 'SavedWeight/Roberta Weight Run 4.1'
+
+# NER labels
+id2label = {0: 'B-CRD', 1: 'B-DAT', 2: 'B-EVT', 3: 'B-FAC', 4: 'B-GPE', 5: 'B-LAN', 6: 'B-LAW', 7: 'B-LOC', 8: 'B-MON', 9: 'B-NOR', 10: 'B-ORD', 11: 'B-ORG', 12: 'B-PER', 13: 'B-PRC', 14: 'B-PRD', 15: 'B-QTY', 16: 'B-REG', 17: 'B-TIM', 18: 'B-WOA', 19: 'I-CRD', 20: 'I-DAT', 21: 'I-EVT', 22: 'I-FAC', 23: 'I-GPE', 24: 'I-LAN', 25: 'I-LAW', 26: 'I-LOC', 27: 'I-MON', 28: 'I-NOR', 29: 'I-ORD', 30: 'I-ORG', 31: 'I-PER', 32: 'I-PRC', 33: 'I-PRD', 34: 'I-QTY', 35: 'I-REG', 36: 'I-TIM', 37: 'I-WOA', 38: 'O'}
+label2id = {v: k for k, v in id2label.items()}
+
+def load_ner(backend: str = None) -> LoadedModel:
+    return load_pretrained("ner", TFAutoModelForTokenClassification, AutoTokenizer,
+                           ner_model_path, ner_tokenizer_path, ner_weights_path,
+                           'indolem/indobert-base-uncased', download_kwargs={"from_pt": True}, backend=backend,
+                           num_labels=39, id2label=id2label, label2id=label2id)
+
+def load_classification(backend: str = None) -> LoadedModel:
+    return load_pretrained("roberta", TFRobertaForSequenceClassification, RobertaTokenizer,
+                           classification_model_path, classification_tokenizer_path, classification_weights_path,
+                           'cahya/roberta-base-indonesian-522M', backend=backend, num_labels=13)
+
+# Klasifikasi massal (bucket per panjang token): teks diurutkan berdasarkan panjang token lalu
+# dipotong per batch, sehingga padding hanya sampai teks terpanjang DI DALAM batch itu.
+def predict_probabilities(classifier: LoadedModel, texts, batch_size: int = 32):
+    # tokenisasi sekali tanpa padding; padding dilakukan per batch lewat tokenizer.pad
+    with metrics.stage("tokenize", model="roberta"):
+        encoded = classifier.tokenizer(texts, truncation=True)
+    input_ids, attention_mask = encoded["input_ids"], encoded["attention_mask"]
+    metrics.inc("tokens_processed_total", sum(len(ids) for ids in input_ids), model="roberta")
+    order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+
+    probabilities = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        inputs = classifier.tokenizer.pad(
+            {"input_ids": [input_ids[i] for i in idx], "attention_mask": [attention_mask[i] for i in idx]},
+            padding=True, return_tensors="tf"
+        )
+        metrics.observe("batch_size", len(idx), batcher="roberta-forward")
+        with metrics.stage("forward", model="roberta"):
+            outputs = classifier.model(inputs.data)
+            predictions = tf.nn.softmax(outputs.logits, axis=-1).numpy()
+        for row, i in zip(predictions, idx):
+            probabilities[i] = [float(p) for p in row]
+    return probabilities
+
+# Dokumen panjang: tidak dipotong di 512 token, tapi dipecah jadi jendela token yang saling
+# tumpang-tindih `stride` token. Jendela dari SEMUA dokumen diurutkan per panjang dan dijalankan
+# bersama per batch. Hasil per dokumen: {"tokens": jumlah token, "windows": [posisi token,
+# cuplikan, probabilitas]}; dokumen yang lebih dari `max_windows` jendela hanya dinilai di awalnya.
+def predict_windows(classifier: LoadedModel, texts, max_length: int = 512, stride: int = 128,
+                    batch_size: int = 32, max_windows: int = 64):
+    tokenizer = classifier.tokenizer
+    body = max_length - tokenizer.num_special_tokens_to_add()
+    step = max(1, body - stride)
+    windows = []  # (dokumen, token_start, token_end, ids tanpa token spesial)
+    lengths = []
+    with metrics.stage("tokenize", model="roberta"):
+        encoded = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+    for d, ids in enumerate(encoded):
+        lengths.append(len(ids))
+        starts = range(0, max(1, len(ids) - stride), step) if len(ids) > body else [0]
+        for start in list(starts)[:max_windows]:
+            windows.append((d, start, min(start + body, len(ids)), ids[start:start + body]))
+
+    order = sorted(range(len(windows)), key=lambda w: len(windows[w][3]))
+    probabilities = [None] * len(windows)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        input_ids = [tokenizer.build_inputs_with_special_tokens(windows[w][3]) for w in idx]
+        inputs = tokenizer.pad(
+            {"input_ids": input_ids, "attention_mask": [[1] * len(ids) for ids in input_ids]},
+            padding=True, return_tensors="tf"
+        )
+        metrics.observe("batch_size", len(idx), batcher="roberta-forward")
+        metrics.inc("tokens_processed_total", sum(len(ids) for ids in input_ids), model="roberta")
+        with metrics.stage("forward", model="roberta"):
+            predictions = tf.nn.softmax(classifier.model(inputs.data).logits, axis=-1).numpy()
+        for row, w in zip(predictions, idx):
+            probabilities[w] = [float(p) for p in row]
+
+    results = [{"tokens": n, "windows": []} for n in lengths]
+    for (d, start, end, ids), p in zip(windows, probabilities):
+        results[d]["windows"].append({"token_start": start, "token_end": end, "probabilities": p,
+                           "excerpt": tokenizer.decode(ids[:48]).strip()})
+    return results
+
+# Gabungan probabilitas jendela jadi satu prediksi dokumen:
+#   mean      -> rata-rata probabilitas semua jendela
+#   max       -> per kategori ambil probabilitas tertinggi di jendela mana pun, lalu dinormalisasi
+#   attention -> rata-rata berbobot softmax(keyakinan jendela / temperature); jendela yang
+#                yakin (probabilitas puncak tinggi) lebih menentukan
+WINDOW_AGGREGATIONS = ("mean", "max", "attention")
+
+def aggregate_windows(window_probabilities, method: str = "mean", temperature: float = 0.1):
+    # -> (probabilitas dokumen, bobot tiap jendela)
+    p = np.asarray(window_probabilities, dtype=np.float64)
+    if method == "max":
+        best = p.max(axis=0)
+        # bobot = porsi kategori yang puncaknya berasal dari jendela ini
+        weights = (p == best).sum(axis=1).astype(np.float64)
+        weights /= weights.sum()
+        return (best / best.sum()).tolist(), weights.tolist()
+    if method == "attention":
+        scores = p.max(axis=1) / max(temperature, 1e-6)
+        weights = np.exp(scores - scores.max())
+        weights /= weights.sum()
+    else:
+        weights = np.full(len(p), 1.0 / len(p))
+    return (weights @ p).tolist(), weights.tolist()
@@ -0,0 +1,63 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+import metrics
+
+
+# ==== NER langsung tanpa HF pipeline ====
+# Semua string (bisa dari banyak dokumen) ditokenisasi per batch dan dijalankan ke
+# model token-classification SEKALI per batch; tag BIO didekode dengan NumPy.
+# Output per string: list token entitas dengan kunci yang dibaca ekstraktor.py:
+#   {"entity": "B-PER", "word": "Budi"}, {"entity": "I-PER", "word": "##anto"}, ...
+# "word" diambil dari teks asli (huruf besar/kecil tetap), "##" menandai lanjutan kata
+# yang sama seperti token WordPiece.
+ENTITY_TYPES = ("PER", "ORG", "NOR")  # yang dipakai ekstraktor.extract_names/extract_organization
+
+def _entity_mask(id2label: Dict[int, str]) -> np.ndarray:
+    mask = np.zeros(max(id2label) + 1, dtype=bool)
+    for i, label in id2label.items():
+        if label[2:] in ENTITY_TYPES and label[:2] in ("B-", "I-"):
+            mask[i] = True
+    return mask
+
+def decode_batch(texts: Sequence[str], label_ids: np.ndarray, valid: np.ndarray,
+                 word_ids: np.ndarray, offsets: np.ndarray, id2label: Dict[int, str]) -> List[List[dict]]:
+    # label_ids/valid/word_ids: (batch, seq); offsets: (batch, seq, 2)
+    labels = np.array([id2label[i] for i in range(max(id2label) + 1)], dtype=object)
+    keep = _entity_mask(id2label)[label_ids] & valid
+    # lanjutan kata: token sebelumnya juga entitas dan berasal dari kata yang sama
+    cont = np.zeros_like(keep)
+    cont[:, 1:] = keep[:, 1:] & keep[:, :-1] & (word_ids[:, 1:] == word_ids[:, :-1]) & (word_ids[:, 1:] >= 0)
+
+    entities = [[] for _ in texts]
+    for b, t in zip(*np.nonzero(keep)):
+        start, end = offsets[b, t]
+        word = texts[b][start:end]
+        entities[b].append({"entity": labels[label_ids[b, t]], "word": ("##" + word) if cont[b, t] else word})
+    return entities
+
+def ner_entities(texts: Sequence[str], model, tokenizer, id2label: Dict[int, str],
+                 batch_size: int = 16, max_length: int = 128) -> List[List[dict]]:
+    # butuh tokenizer "fast" (offset mapping & word_ids)
+    results = [None] * len(texts)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))  # batch berisi string sepanjang mirip
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        chunk = [texts[i] for i in idx]
+        with metrics.stage("tokenize", model="ner"):
+            enc = tokenizer(chunk, padding=True, truncation=True, max_length=max_length,
+                            return_offsets_mapping=True, return_special_tokens_mask=True, return_tensors="np")
+        offsets = enc.pop("offset_mapping")
+        special = enc.pop("special_tokens_mask")
+        word_ids = np.array([[-1 if w is None else w for w in enc.word_ids(b)] for b in range(len(chunk))])
+
+        metrics.observe("batch_size", len(chunk), batcher="ner-forward")
+        metrics.inc("tokens_processed_total", int(enc["attention_mask"].sum()), model="ner")
+        with metrics.stage("forward", model="ner"):
+            logits = model(dict(enc), training=False).logits
+            label_ids = np.asarray(logits).argmax(axis=-1)
+        valid = (enc["attention_mask"] == 1) & (special == 0)
+        for i, ents in zip(idx, decode_batch(chunk, label_ids, valid, word_ids, offsets, id2label)):
+            results[i] = ents
+    return results
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import uuid
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from model_loader import ARTIFACT_STAMP, MODEL_ARTIFACT_DIRECTORY, LoadedModel
+
+
+# ==== backend inferensi ONNX Runtime (opsional) ====
+# Aktif dengan INFERENCE_BACKEND=onnx. File model dibuat offline oleh export_onnx.py ke
+# artifacts/<nama>-onnx/: model.onnx (fp32), model.int8.onnx (kuantisasi dinamis int8),
+# tokenizer, SOURCE_FINGERPRINT (identitas bobot sumber) dan parity.json (hasil uji paritas
+# terhadap TensorFlow). Export yang basi atau gagal uji paritas tidak dipakai.
+# onnxruntime hanya di-import saat backend ini benar-benar dipakai.
+#
+# ONNX_SHARED_WEIGHTS=1: bobot dibagi semua proses (worker gunicorn, pool inferensi) lewat page
+# cache, bukan disalin per proses. Sekali per export dibuat salinan di
+# artifacts/<nama>-onnx/shared-<varian>-<kunci>/: graph yang sudah dioptimasi (fusi attention,
+# LayerNorm, GELU) + weights.bin berisi semua initializer besar dengan offset rata 64 KB.
+# Session lalu dibuka tanpa optimasi graph dan tanpa prepacking, jadi ONNX Runtime memakai
+# initializer langsung dari file yang di-mmap read-only dan tidak pernah menulis ke halamannya.
+# Tambahan memori per worker tinggal runtime, tokenizer & buffer aktivasi.
+ONNX_VARIANT = os.environ.get("ONNX_VARIANT", "int8")  # int8 / fp32
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", "1"))
+ONNX_SHARED_WEIGHTS = os.environ.get("ONNX_SHARED_WEIGHTS", "0") == "1"
+SHARED_ALIGN = 65536        # offset tiap initializer di weights.bin (kelipatan halaman mmap)
+SHARED_MIN_BYTES = 1024     # initializer lebih kecil tetap di dalam graph
+
+ONNX_FILES = {"fp32": "model.onnx", "int8": "model.int8.onnx"}
+PARITY_FILE = "parity.json"
+
+_NUMPY_TYPES = {"tensor(int32)": np.int32, "tensor(int64)": np.int64, "tensor(float)": np.float32}
+
+OnnxOutput = namedtuple("OnnxOutput", ["logits"])
+
+def export_dir(name: str) -> str:
+    return os.path.join(MODEL_ARTIFACT_DIRECTORY, f"{name}-onnx")
+
+# Pengganti model TF Keras: dipanggil dengan dict input tokenizer (numpy atau tf.Tensor),
+# mengembalikan objek dengan .logits (numpy) seperti output model HF.
+class OnnxModel:
+    def __init__(self, path: str, threads: int = ONNX_THREADS, shared: bool = False):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        if shared:
+            # graph sudah dioptimasi saat build_shared; optimasi/prepacking di sini akan menyalin bobot
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            options.add_session_config_entry("session.disable_prepacking", "1")
+        else:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.shared = shared
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        # nama input di graph bisa "input_ids" atau "input_ids:0" tergantung versi tf2onnx
+        self.inputs = [(i.name, i.name.split(":")[0], _NUMPY_TYPES[i.type]) for i in self.session.get_inputs()]
+        self.output_name = self.session.get_outputs()[0].name
+
+    def __call__(self, inputs, training=False) -> OnnxOutput:
+        inputs = getattr(inputs, "data", inputs)  # BatchEncoding -> dict
+        feed = {}
+        for name, key, dtype in self.inputs:
+            if key in inputs:
+                feed[name] = np.asarray(inputs[key]).astype(dtype, copy=False)
+            else:  # mis. token_type_ids tidak dikirim -> semua segmen 0
+                feed[name] = np.zeros_like(np.asarray(inputs["input_ids"]), dtype=dtype)
+        logits, = self.session.run([self.output_name], feed)
+        return OnnxOutput(logits)
+
+def read_parity(name: str) -> dict:
+    try:
+        with open(os.path.join(export_dir(name), PARITY_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# --- salinan bobot bersama (ONNX_SHARED_WEIGHTS) ---
+def _shared_key(path: str) -> str:
+    # salinan dibangun ulang kalau file export berganti atau versi onnxruntime berubah
+    import onnxruntime as ort
+    st = os.stat(path)
+    return hashlib.sha256(f"{st.st_size}:{st.st_mtime_ns}:{ort.__version__}".encode("utf-8")).hexdigest()[:12]
+
+def shared_model(path: str, variant: str) -> str:
+    # -> path graph bersama; kalau belum ada dibangun di proses spawn sekali pakai, supaya memori
+    # puncak build (graph + salinan bobot) tidak tertinggal di heap worker yang kebetulan pertama
+    target = os.path.join(os.path.dirname(path), f"shared-{variant}-{_shared_key(path)}")
+    if os.path.isfile(os.path.join(target, "model.onnx")):
+        return os.path.join(target, "model.onnx")
+    if multiprocessing.current_process().daemon:  # proses pool inferensi tidak boleh punya anak
+        return build_shared(path, variant)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(build_shared, path, variant).result()
+
+def build_shared(path: str, variant: str) -> str:
+    # aman dipanggil beberapa worker bersamaan: tiap build di folder tmp sendiri, yang kalah pakai punya pemenang
+    directory = os.path.dirname(path)
+    prefix = f"shared-{variant}-"
+    target = os.path.join(directory, prefix + _shared_key(path))
+    model_path = os.path.join(target, "model.onnx")
+    if os.path.isfile(model_path):
+        return model_path
+
+    import onnx
+    import onnxruntime as ort
+    from onnx.external_data_helper import set_external_data
+
+    tmp = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    try:
+        # 1) optimasi graph sekali di sini (level extended: fusi transformer, tanpa layout khusus CPU)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+        options.optimized_model_filepath = os.path.join(tmp, "optimized.onnx")
+        ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        # 2) initializer besar dipindah ke weights.bin, offset rata SHARED_ALIGN
+        model = onnx.load(options.optimized_model_filepath)
+        offset = 0
+        with open(os.path.join(tmp, "weights.bin"), "wb") as f:
+            for tensor in model.graph.initializer:
+                if not tensor.HasField("raw_data") or len(tensor.raw_data) < SHARED_MIN_BYTES:
+                    continue
+                offset = -(-offset // SHARED_ALIGN) * SHARED_ALIGN
+                f.seek(offset)
+                f.write(tensor.raw_data)
+                set_external_data(tensor, "weights.bin", offset, len(tensor.raw_data))
+                tensor.ClearField("raw_data")
+                offset = f.tell()
+        onnx.save(model, os.path.join(tmp, "model.onnx"))
+        os.unlink(options.optimized_model_filepath)
+        try:
+            os.replace(tmp, target)
+        except OSError:
+            if not os.path.isfile(model_path):  # worker lain sudah selesai duluan -> pakai punyanya
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # salinan untuk export/onnxruntime lama tidak akan dipakai lagi (proses yang masih me-mmap aman)
+    for entry in os.listdir(directory):
+        if entry.startswith(prefix) and os.path.join(directory, entry) != target and ".tmp-" not in entry:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return model_path
+
+def load_export(name: str, tokenizer_cls, fingerprint: str, variant: str = ONNX_VARIANT,
+                shared: bool = ONNX_SHARED_WEIGHTS) -> Optional[LoadedModel]:
+    directory = export_dir(name)
+    path = os.path.join(directory, ONNX_FILES.get(variant, ""))
+    if not os.path.isfile(path):
+        print(f"{name}: no ONNX export at {path}, using TensorFlow (run export_onnx.py)")
+        return None
+    try:
+        with open(os.path.join(directory, ARTIFACT_STAMP)) as f:
+            stale = f.read().strip() != fingerprint
+    except OSError:
+        stale = True
+    if stale:
+        print(f"{name}: ONNX export in {directory} was made from other weights, using TensorFlow")
+        return None
+    if not read_parity(name).get(variant, {}).get("passed"):
+        print(f"{name}: ONNX {variant} export did not pass the parity check, using TensorFlow")
+        return None
+    source = f"onnx-{variant}"
+    if shared:
+        try:
+            path = shared_model(path, variant)
+            source += "-shared"
+        except Exception as e:
+            print(f"{name}: shared-weights copy of {path} not built ({e}), loading a private copy")
+            shared = False
+    return LoadedModel(OnnxModel(path, shared=shared), tokenizer_cls.from_pretrained(directory, local_files_only=True), source)
@@ -0,0 +1,599 @@
+import argparse
+import csv
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+# ==== analitik audit transaksi Polygon (export CSV Polygonscan) ====
+# Export "Raw Transaction Data/export-<kontrak>.csv" di-parse streaming ke store kolumnar di disk:
+#   <store>/manifest.json             daftar segmen & file export yang sudah masuk (sha256)
+#   <store>/dict/<nama>.txt           kamus append-only (alamat, method, status, errcode) -> id = nomor baris
+#   <store>/seg-<id>/<kolom>.npy      satu file per kolom, baris urut blok (jadi timestamp juga urut)
+#   <store>/seg-<id>/index/...        posting list per method & pengirim + kunci tx_hash terurut
+# Segmen tidak pernah diubah: ingest export baru = segmen baru; export lama tidak dibaca ulang
+# (transaksi yang sudah ada dikenali lewat index tx_hash segmen lama, jadi export ulang yang
+# tumpang-tindih aman). `compact` menggabungkan segmen kecil jadi satu.
+#   python polygon_audit.py ingest "../../../Raw Transaction Data"/export-*.csv
+#   python polygon_audit.py fees --by method --period month
+#   python polygon_audit.py merkle-gaps --min-gap 1d
+#   python polygon_audit.py failed --by errcode,method
+POLYGON_AUDIT_STORE = os.environ.get("POLYGON_AUDIT_STORE", "polygon-audit")
+SEGMENT_ROWS = int(os.environ.get("POLYGON_AUDIT_SEGMENT_ROWS", "1000000"))
+
+DICTIONARIES = ("address", "method", "status", "errcode")
+COLUMNS = {
+    "tx_hash": "S32",
+    "block": np.uint32,
+    "timestamp": np.int64,
+    "contract": np.uint32,   # id kamus address
+    "sender": np.uint32,     # kolom From
+    "recipient": np.uint32,  # kolom To (kosong untuk pembuatan kontrak)
+    "method": np.uint16,
+    "status": np.uint16,
+    "errcode": np.uint16,
+    "value_in": np.float64,
+    "value_out": np.float64,
+    "fee": np.float64,       # TxnFee dalam POL/MATIC
+    "fee_usd": np.float64,
+    "price_usd": np.float64,
+}
+POSTING_COLUMNS = ("method", "sender")
+MERKLE_METHODS = ("Update Merkle Root With Identities", "Update Merkle Root")
+PERIODS = {"day": "D", "week": "W", "month": "M", "year": "Y"}
+
+_CONTRACT_IN_NAME = re.compile(r"export-(0x[0-9a-fA-F]{40})")
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhdw]?)$")
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+class AuditError(ValueError):
+    pass
+
+
+# ==== parsing export ====
+def _header_map(header: Sequence[str]) -> Dict[str, int]:
+    # nama kolom Polygonscan berubah-ubah (POL/MATIC, "CurrentValue @ $x/POL"), jadi dicocokkan per awalan
+    found = {}
+    for i, name in enumerate(h.strip() for h in header):
+        key = None
+        if name in ("Transaction Hash", "Txhash"):
+            key = "tx_hash"
+        elif name == "Blockno":
+            key = "block"
+        elif name == "UnixTimestamp":
+            key = "timestamp"
+        elif name.startswith("DateTime"):
+            key = "datetime"
+        elif name in ("From", "To", "Status", "ErrCode", "Method"):
+            key = {"From": "sender", "To": "recipient"}.get(name, name.lower())
+        elif name.startswith("Value_IN("):
+            key = "value_in"
+        elif name.startswith("Value_OUT("):
+            key = "value_out"
+        elif name == "TxnFee(USD)":
+            key = "fee_usd"
+        elif name.startswith("TxnFee("):
+            key = "fee"
+        elif name.startswith("Historical $Price/"):
+            key = "price_usd"
+        if key is not None and key not in found:
+            found[key] = i
+    missing = {"tx_hash", "block", "sender", "method", "fee"} - set(found)
+    if missing or not ({"timestamp", "datetime"} & set(found)):
+        raise AuditError(f"not a Polygonscan transaction export (missing columns: {', '.join(sorted(missing)) or 'timestamp'})")
+    return found
+
+def _number(value: str) -> float:
+    value = value.replace(",", "").strip()
+    return float(value) if value else 0.0
+
+def _timestamp(row: List[str], cols: Dict[str, int]) -> int:
+    if "timestamp" in cols and row[cols["timestamp"]].strip():
+        return int(row[cols["timestamp"]])
+    parsed = datetime.strptime(row[cols["datetime"]].strip(), "%Y-%m-%d %H:%M:%S")
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+def _contract_of(path: str) -> str:
+    match = _CONTRACT_IN_NAME.search(os.path.basename(path))
+    return match.group(1).lower() if match else ""
+
+def iter_export_chunks(path: str, dictionaries: "Dictionaries", chunk_rows: int = 65536) -> Iterable[Dict[str, np.ndarray]]:
+    # baca CSV baris demi baris, keluarkan potongan kolom numpy (memori tidak tergantung ukuran file)
+    contract = _contract_of(path)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        cols = _header_map(next(reader))
+        get = lambda row, key: row[cols[key]].strip() if key in cols else ""
+        buffer = {name: [] for name in COLUMNS}
+        for row in reader:
+            if not row or not row[cols["tx_hash"]].strip():
+                continue
+            buffer["tx_hash"].append(bytes.fromhex(get(row, "tx_hash")[2:]))
+            buffer["block"].append(int(get(row, "block")))
+            buffer["timestamp"].append(_timestamp(row, cols))
+            # kontrak: dari nama file; pembuatan kontrak (To kosong) -> kolom ContractAddress
+            buffer["contract"].append(dictionaries.id("address", contract or get(row, "recipient").lower()))
+            buffer["sender"].append(dictionaries.id("address", get(row, "sender").lower()))
+            buffer["recipient"].append(dictionaries.id("address", get(row, "recipient").lower()))
+            buffer["method"].append(dictionaries.id("method", get(row, "method")))
+            buffer["status"].append(dictionaries.id("status", get(row, "status")))
+            buffer["errcode"].append(dictionaries.id("errcode", get(row, "errcode")))
+            for name in ("value_in", "value_out", "fee", "fee_usd", "price_usd"):
+                buffer[name].append(_number(get(row, name)))
+            if len(buffer["tx_hash"]) >= chunk_rows:
+                yield {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in buffer.items()}
+                buffer = {name: [] for name in COLUMNS}
+        if buffer["tx_hash"]:
+            yield {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in buffer.items()}
+
+
+# ==== kamus append-only ====
+class Dictionaries:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.values = {}
+        self.ids = {}
+        self._saved = {}
+        for name in DICTIONARIES:
+            path = os.path.join(directory, f"{name}.txt")
+            values = []
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    values = [line.rstrip("\n") for line in f]
+            if not values or values[0] != "":
+                values.insert(0, "")  # id 0 = kosong (status sukses, errcode kosong, To kosong)
+            self.values[name] = values
+            self.ids[name] = {v: i for i, v in enumerate(values)}
+            self._saved[name] = len(values) if os.path.exists(path) else 0
+
+    def id(self, name: str, value: str) -> int:
+        value = value.replace("\n", " ")
+        ids = self.ids[name]
+        if value not in ids:
+            ids[value] = len(self.values[name])
+            self.values[name].append(value)
+        return ids[value]
+
+    def lookup(self, name: str, value: str) -> Optional[int]:
+        return self.ids[name].get(value)
+
+    def save(self):
+        # hanya menambah baris baru; id lama tidak pernah bergeser
+        os.makedirs(self.directory, exist_ok=True)
+        for name, values in self.values.items():
+            with open(os.path.join(self.directory, f"{name}.txt"), "a", encoding="utf-8") as f:
+                f.writelines(f"{v}\n" for v in values[self._saved[name]:])
+            self._saved[name] = len(values)
+
+
+# ==== segmen ====
+def _tx_keys(hashes: np.ndarray) -> np.ndarray:
+    # 8 byte pertama hash sebagai uint64 (kunci index; kecocokan dicek ulang ke hash penuh)
+    return np.frombuffer(np.ascontiguousarray(hashes, dtype="S32").tobytes(), dtype=">u8")[::4].astype(np.uint64)
+
+class Segment:
+    def __init__(self, path: str, meta: dict):
+        self.path = path
+        self.meta = meta
+        self.rows = meta["rows"]
+        self._columns = {}
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    def _index(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, "index", f"{name}.npy"), mmap_mode="r")
+
+    def postings(self, column: str, ids: Sequence[int]) -> np.ndarray:
+        # baris (urut) dengan nilai kolom di `ids`
+        keys, offsets, rows = (self._index(f"{column}.{part}") for part in ("keys", "offsets", "rows"))
+        pos = np.searchsorted(keys, ids)
+        parts = [rows[offsets[p]:offsets[p + 1]] for p, i in zip(pos, ids) if p < len(keys) and keys[p] == i]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        keys, rows = self._index("tx_key.keys"), self._index("tx_key.rows")
+        wanted = _tx_keys(hashes)
+        pos = np.minimum(np.searchsorted(keys, wanted), max(len(keys) - 1, 0))
+        hit = (keys[pos] == wanted) if len(keys) else np.zeros(len(wanted), dtype=bool)
+        if hit.any():
+            hit[hit] = self.column("tx_hash")[rows[pos[hit]]] == hashes[hit]
+        return hit
+
+def write_segment(store: str, columns: Dict[str, np.ndarray], source: str) -> dict:
+    order = np.argsort(columns["block"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    segment_id = f"seg-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    tmp = os.path.join(store, f".{segment_id}.tmp")
+    os.makedirs(os.path.join(tmp, "index"))
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), values)
+        for name in POSTING_COLUMNS:
+            rows = np.argsort(columns[name], kind="stable")
+            keys, counts = np.unique(columns[name][rows], return_counts=True)
+            np.save(os.path.join(tmp, "index", f"{name}.keys.npy"), keys)
+            np.save(os.path.join(tmp, "index", f"{name}.offsets.npy"), np.concatenate(([0], np.cumsum(counts))))
+            np.save(os.path.join(tmp, "index", f"{name}.rows.npy"), rows)
+        tx_keys = _tx_keys(columns["tx_hash"])
+        rows = np.argsort(tx_keys, kind="stable")
+        np.save(os.path.join(tmp, "index", "tx_key.keys.npy"), tx_keys[rows])
+        np.save(os.path.join(tmp, "index", "tx_key.rows.npy"), rows)
+        os.replace(tmp, os.path.join(store, segment_id))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # zone map: dipakai untuk melewati segmen di luar rentang blok/waktu/kontrak query
+    return {
+        "id": segment_id,
+        "rows": int(len(order)),
+        "source": source,
+        "block_min": int(columns["block"][0]),
+        "block_max": int(columns["block"][-1]),
+        "time_min": int(columns["timestamp"].min()),
+        "time_max": int(columns["timestamp"].max()),
+        "contracts": sorted(int(c) for c in np.unique(columns["contract"])),
+    }
+
+
+# ==== store ====
+class Store:
+    def __init__(self, path: str = POLYGON_AUDIT_STORE):
+        self.path = path
+        self._load()
+
+    def _load(self):
+        # dipanggil ulang di dalam lock sebelum menulis: proses lain bisa saja sudah menambah
+        # segmen / entri kamus sejak store ini dibuka (id kamus & manifest harus yang terbaru)
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"version": 1, "segments": [], "files": {}}
+        self.dictionaries = Dictionaries(os.path.join(self.path, "dict"))
+        self.segments = [Segment(os.path.join(self.path, m["id"]), m) for m in self.manifest["segments"]]
+
+    def _ingested(self, sha256: str) -> bool:
+        return any(info["sha256"] == sha256 for info in self.manifest["files"].values())
+
+    def _save_manifest(self):
+        tmp = os.path.join(self.path, f".manifest.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def _lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        lock = open(os.path.join(self.path, ".lock"), "w")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    def ingest(self, path: str, force: bool = False) -> dict:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256()
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        skipped = {"file": path, "skipped": "already ingested", "rows": 0, "new_rows": 0}
+        if not force and self._ingested(sha256):
+            return skipped
+
+        with self._lock():
+            # cek ulang setelah lock didapat: ingest paralel file yang sama harus tetap sekali masuk
+            self._load()
+            if not force and self._ingested(sha256):
+                return skipped
+            rows, new_rows, seen, pending, created = 0, 0, set(), [], []
+            for chunk in iter_export_chunks(path, self.dictionaries):
+                rows += len(chunk["tx_hash"])
+                # buang transaksi yang sudah ada di segmen lama / di potongan sebelumnya dari file ini
+                keep = np.ones(len(chunk["tx_hash"]), dtype=bool)
+                for segment in self.segments:
+                    keep &= ~segment.contains(chunk["tx_hash"])
+                _, first = np.unique(chunk["tx_hash"], return_index=True)
+                unique = np.zeros(len(keep), dtype=bool)
+                unique[first] = True
+                keep &= unique & np.array([h not in seen for h in chunk["tx_hash"].tolist()], dtype=bool)
+                seen.update(chunk["tx_hash"][keep].tolist())
+                pending.append({name: values[keep] for name, values in chunk.items()})
+                if sum(len(p["tx_hash"]) for p in pending) >= SEGMENT_ROWS:
+                    created.append(self._flush(pending, path))
+                    pending = []
+            if pending and sum(len(p["tx_hash"]) for p in pending):
+                created.append(self._flush(pending, path))
+            new_rows = sum(meta["rows"] for meta in created)
+            self.manifest["files"][os.path.basename(path)] = {
+                "sha256": sha256, "rows": rows, "new_rows": new_rows, "segments": [m["id"] for m in created],
+                "ingested_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+            self._save_manifest()
+        return {"file": path, "rows": rows, "new_rows": new_rows, "segments": [m["id"] for m in created]}
+
+    def _flush(self, pending: List[Dict[str, np.ndarray]], source: str) -> dict:
+        # kamus ditulis lebih dulu: kalau proses mati setelahnya, yang tersisa hanya entri kamus tak terpakai
+        self.dictionaries.save()
+        columns = {name: np.concatenate([p[name] for p in pending]) for name in COLUMNS}
+        meta = write_segment(self.path, columns, os.path.basename(source))
+        self.manifest["segments"].append(meta)
+        self.segments.append(Segment(os.path.join(self.path, meta["id"]), meta))
+        self._save_manifest()
+        return meta
+
+    def compact(self) -> dict:
+        with self._lock():
+            self._load()
+            old = list(self.segments)
+            if len(old) < 2:
+                return {"segments": len(old), "rows": sum(s.rows for s in old)}
+            columns = {name: np.concatenate([np.asarray(s.column(name)) for s in old]) for name in COLUMNS}
+            meta = write_segment(self.path, columns, "compact")
+            self.manifest["segments"] = [meta]
+            self.segments = [Segment(os.path.join(self.path, meta["id"]), meta)]
+            self._save_manifest()
+            for segment in old:
+                shutil.rmtree(segment.path, ignore_errors=True)
+            for info in self.manifest["files"].values():
+                info["segments"] = [meta["id"]]
+            self._save_manifest()
+            return {"segments": 1, "rows": meta["rows"], "merged": len(old)}
+
+    # --- seleksi: zone map -> rentang biner blok/waktu -> posting list method/pengirim ---
+    def select(self, columns: Sequence[str], contract: str = None, methods: Sequence[str] = None,
+               sender: str = None, blocks=(None, None), times=(None, None)) -> Dict[str, np.ndarray]:
+        d = self.dictionaries
+        contract_id = None if contract is None else d.lookup("address", contract.lower())
+        method_ids = None if methods is None else [i for i in (d.lookup("method", m) for m in methods) if i is not None]
+        sender_id = None if sender is None else d.lookup("address", sender.lower())
+        if (contract is not None and contract_id is None) or method_ids == [] or (sender is not None and sender_id is None):
+            return {name: np.zeros(0, dtype=COLUMNS[name]) for name in columns}
+
+        parts = {name: [] for name in columns}
+        for segment in self.segments:
+            m = segment.meta
+            if ((blocks[0] is not None and m["block_max"] < blocks[0]) or (blocks[1] is not None and m["block_min"] > blocks[1])
+                    or (times[0] is not None and m["time_max"] < times[0]) or (times[1] is not None and m["time_min"] > times[1])
+                    or (contract_id is not None and contract_id not in m["contracts"])):
+                continue
+            lo, hi = 0, segment.rows
+            for column, (start, end) in (("block", blocks), ("timestamp", times)):
+                values = segment.column(column)
+                if start is not None:
+                    lo = max(lo, int(np.searchsorted(values, start, "left")))
+                if end is not None:
+                    hi = min(hi, int(np.searchsorted(values, end, "right")))
+            if lo >= hi:
+                continue
+            rows = None
+            for column, ids in (("method", method_ids), ("sender", None if sender_id is None else [sender_id])):
+                if ids is None:
+                    continue
+                hits = segment.postings(column, ids)
+                hits = hits[np.searchsorted(hits, lo):np.searchsorted(hits, hi)]
+                rows = hits if rows is None else np.intersect1d(rows, hits, assume_unique=True)
+            rows = np.arange(lo, hi) if rows is None else rows
+            if contract_id is not None and len(m["contracts"]) > 1:
+                rows = rows[segment.column("contract")[rows] == contract_id]
+            for name in columns:
+                parts[name].append(np.asarray(segment.column(name)[rows]))
+        return {name: np.concatenate(values) if values else np.zeros(0, dtype=COLUMNS[name])
+                for name, values in parts.items()}
+
+    def info(self) -> dict:
+        return {
+            "store": self.path,
+            "rows": sum(s.rows for s in self.segments),
+            "segments": len(self.segments),
+            "files": len(self.manifest["files"]),
+            "contracts": len({c for s in self.segments for c in s.meta["contracts"]}),
+            "methods": len(self.dictionaries.values["method"]) - 1,
+            "block_range": [min((s.meta["block_min"] for s in self.segments), default=None),
+                            max((s.meta["block_max"] for s in self.segments), default=None)],
+            "time_range": [_iso(min((s.meta["time_min"] for s in self.segments), default=None)),
+                           _iso(max((s.meta["time_max"] for s in self.segments), default=None))],
+        }
+
+
+# ==== query audit (agregasi vektor numpy) ====
+def _iso(ts) -> Optional[str]:
+    return None if ts is None else datetime.fromtimestamp(int(ts), timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def _period_labels(timestamps: np.ndarray, period: str) -> np.ndarray:
+    if period == "all":
+        return np.full(len(timestamps), "all", dtype=object)
+    return timestamps.astype("datetime64[s]").astype(f"datetime64[{PERIODS[period]}]").astype(str)
+
+def _group(keys: List[np.ndarray], sums: Dict[str, np.ndarray]) -> List[dict]:
+    # group-by beberapa kolom kunci sekaligus: np.unique(return_inverse) per kunci -> satu kode gabungan
+    if not len(keys[0]):
+        return []
+    codes = np.zeros(len(keys[0]), dtype=np.int64)
+    uniques = []
+    for key in keys:
+        values, inverse = np.unique(key, return_inverse=True)
+        codes = codes * len(values) + inverse
+        uniques.append(values)
+    groups, inverse = np.unique(codes, return_inverse=True)
+    counts = np.bincount(inverse)
+    totals = {name: np.bincount(inverse, weights=values) for name, values in sums.items()}
+    out = []
+    for g, code in enumerate(groups):
+        labels = []
+        for values in reversed(uniques):
+            code, i = divmod(int(code), len(values))
+            labels.append(values[i])
+        out.append({"key": list(reversed(labels)), "count": int(counts[g]),
+                    **{name: float(total[g]) for name, total in totals.items()}})
+    return out
+
+def _failed_mask(status: np.ndarray, errcode: np.ndarray) -> np.ndarray:
+    # Polygonscan: Status kosong = sukses; gagal -> "Error(0)"/"Error(1)" dan/atau ErrCode terisi
+    return (status != 0) | (errcode != 0)
+
+def fee_totals(store: Store, by: Sequence[str] = ("method",), period: str = "month", **filters) -> List[dict]:
+    data = store.select(("timestamp", "method", "sender", "contract", "fee", "fee_usd", "status", "errcode"), **filters)
+    keys, d = [], store.dictionaries
+    for name in by:
+        if name == "period":
+            continue
+        dictionary = "address" if name in ("sender", "contract") else name
+        keys.append(np.asarray(d.values[dictionary], dtype=object)[data[name]])
+    keys.insert(0, _period_labels(data["timestamp"], period))
+    failed = _failed_mask(data["status"], data["errcode"]).astype(np.float64)
+    rows = _group(keys, {"fee": data["fee"], "fee_usd": data["fee_usd"], "failed": failed})
+    for row in rows:
+        row["failed"] = int(row["failed"])
+    return rows
+
+def merkle_gaps(store: Store, min_gap: float = 0, methods: Sequence[str] = MERKLE_METHODS, **filters) -> List[dict]:
+    # jeda antar update Merkle root yang BERHASIL, per kontrak
+    filters["methods"] = methods
+    data = store.select(("tx_hash", "block", "timestamp", "contract", "status", "errcode"), **filters)
+    ok = ~_failed_mask(data["status"], data["errcode"])
+    addresses = store.dictionaries.values["address"]
+    report = []
+    for contract in np.unique(data["contract"][ok]):
+        mine = ok & (data["contract"] == contract)
+        order = np.argsort(data["block"][mine], kind="stable")
+        ts, block, tx = data["timestamp"][mine][order], data["block"][mine][order], data["tx_hash"][mine][order]
+        gaps = np.diff(ts)
+        entry = {"contract": addresses[contract], "updates": int(len(ts)),
+                 "first": _iso(ts[0]), "last": _iso(ts[-1]), "gaps": []}
+        if len(gaps):
+            entry.update(median_gap_s=float(np.median(gaps)), p95_gap_s=float(np.percentile(gaps, 95)),
+                         max_gap_s=int(gaps.max()))
+        for i in np.flatnonzero(gaps >= min_gap)[np.argsort(-gaps[gaps >= min_gap], kind="stable")]:
+            entry["gaps"].append({"gap_s": int(gaps[i]), "from": _iso(ts[i]), "to": _iso(ts[i + 1]),
+                                  "from_block": int(block[i]), "to_block": int(block[i + 1]),
+                                  "from_tx": "0x" + tx[i].ljust(32, b"\0").hex(),
+                                  "to_tx": "0x" + tx[i + 1].ljust(32, b"\0").hex()})
+        report.append(entry)
+    return report
+
+def failed_transactions(store: Store, by: Sequence[str] = ("errcode",), **filters) -> List[dict]:
+    data = store.select(("status", "errcode", "method", "sender", "contract", "fee", "fee_usd", "timestamp"), **filters)
+    failed = _failed_mask(data["status"], data["errcode"])
+    d = store.dictionaries
+    keys = []
+    for name in by:
+        if name == "period":
+            keys.append(_period_labels(data["timestamp"][failed], "month"))
+            continue
+        dictionary = "address" if name in ("sender", "contract") else name
+        labels = np.asarray(d.values[dictionary], dtype=object)[data[name][failed]]
+        if name == "errcode":
+            # gagal tanpa ErrCode: pakai teks Status (mis. "Error(0)")
+            status = np.asarray(d.values["status"], dtype=object)[data["status"][failed]]
+            labels = np.where(labels == "", status, labels)
+        keys.append(labels)
+    return _group(keys, {"fee": data["fee"][failed], "fee_usd": data["fee_usd"][failed]}) if keys else []
+
+
+# ==== CLI ====
+def _duration(value: str) -> float:
+    match = _DURATION.match(value.strip().lower())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration {value!r} (e.g. 3600, 90m, 12h, 1d, 2w)")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+def _date(value: str) -> int:
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y-%m"):
+        try:
+            return int(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid date {value!r} (YYYY-MM-DD [HH:MM:SS])")
+
+def _filters(args) -> dict:
+    return {"contract": args.contract, "sender": args.sender,
+            "methods": args.method or None,
+            "blocks": (args.from_block, args.to_block), "times": (args.since, args.until)}
+
+def _print_groups(rows: List[dict], headers: Sequence[str], values: Sequence[str]):
+    table = [list(headers) + list(values)]
+    for row in rows:
+        table.append([str(k) for k in row["key"]] + [str(row["count"]) if v == "count" else
+                                                     (f"{row[v]:.6f}" if isinstance(row[v], float) else str(row[v]))
+                                                     for v in values])
+    widths = [max(len(r[i]) for r in table) for i in range(len(table[0]))]
+    for r in table:
+        print("  ".join(c.ljust(w) if i < len(headers) else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths))))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Store kolumnar & query audit untuk export CSV transaksi Polygonscan.")
+    parser.add_argument("--store", default=POLYGON_AUDIT_STORE, help="folder store (default POLYGON_AUDIT_STORE)")
+    parser.add_argument("--json", action="store_true", help="keluaran JSON")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="tambahkan export CSV (yang sudah pernah masuk dilewati)")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--force", action="store_true", help="proses ulang walau sha256 file sudah tercatat")
+    sub.add_parser("info", help="ringkasan store")
+    sub.add_parser("compact", help="gabungkan semua segmen jadi satu")
+
+    queries = []
+    p = sub.add_parser("fees", help="total fee per method/pengirim/kontrak per periode")
+    p.add_argument("--by", default="method", help="kombinasi method,sender,contract,period (dipisah koma; period selalu ikut)")
+    p.add_argument("--period", choices=sorted(PERIODS) + ["all"], default="month")
+    queries.append(p)
+    p = sub.add_parser("merkle-gaps", help="jeda antar update Merkle root yang berhasil")
+    p.add_argument("--min-gap", type=_duration, default=_duration("1d"), help="tampilkan jeda >= ini (mis. 12h, 1d)")
+    queries.append(p)
+    p = sub.add_parser("failed", help="transaksi gagal per ErrCode")
+    p.add_argument("--by", default="errcode", help="kombinasi errcode,method,sender,contract,period")
+    queries.append(p)
+    for p in queries:
+        p.add_argument("--contract")
+        p.add_argument("--sender")
+        p.add_argument("--method", action="append", help="boleh diulang")
+        p.add_argument("--since", type=_date)
+        p.add_argument("--until", type=_date)
+        p.add_argument("--from-block", type=int)
+        p.add_argument("--to-block", type=int)
+    args = parser.parse_args(argv)
+
+    store = Store(args.store)
+    try:
+        if args.command == "ingest":
+            result = [store.ingest(path, args.force) for path in args.files]
+        elif args.command == "info":
+            result = store.info()
+        elif args.command == "compact":
+            result = store.compact()
+        elif args.command == "fees":
+            by = [b for b in args.by.split(",") if b]
+            if set(by) - {"method", "sender", "contract", "period"}:
+                parser.error("--by accepts method, sender, contract, period")
+            result = fee_totals(store, by, args.period, **_filters(args))
+            if not args.json:
+                _print_groups(result, ["period"] + [b for b in by if b != "period"], ["count", "fee", "fee_usd", "failed"])
+                return 0
+        elif args.command == "merkle-gaps":
+            filters = _filters(args)
+            result = merkle_gaps(store, args.min_gap, filters.pop("methods") or MERKLE_METHODS, **filters)
+        else:
+            by = [b for b in args.by.split(",") if b]
+            if set(by) - {"errcode", "method", "sender", "contract", "period"}:
+                parser.error("--by accepts errcode, method, sender, contract, period")
+            result = failed_transactions(store, by, **_filters(args))
+            if not args.json:
+                _print_groups(result, by, ["count", "fee", "fee_usd"])
+                return 0
+    except (AuditError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import glob
+import hashlib
+import os
+import re
+from typing import Any, Optional
+
+from sqlite_cache import SQLiteLRUCache
+
+
+# ==== cache prediksi berbasis isi teks ====
+# Kunci = sha256(identitas model/bobot + teks yang dinormalisasi spasinya).
+# Tier 1: LRU di memori (per worker). Tier 2 (opsional): SQLite di disk, bertahan
+# setelah restart dan dipakai bersama oleh semua worker gunicorn (lihat sqlite_cache.py).
+
+_WS = re.compile(r"\s+")
+
+def normalize_for_key(text: str) -> str:
+    return _WS.sub(" ", text or "").strip()
+
+def weights_fingerprint(*paths: str) -> str:
+    # identitas bobot dari nama + ukuran + mtime semua file checkpoint (tanpa membaca isinya)
+    h = hashlib.sha256()
+    for path in paths:
+        files = sorted(set(glob.glob(glob.escape(path) + "*")) | set(glob.glob(os.path.join(glob.escape(path), "*"))))
+        h.update(path.encode("utf-8"))
+        for f in files:
+            if not os.path.isfile(f):
+                continue
+            st = os.stat(f)
+            h.update(f"{f}:{st.st_size}:{int(st.st_mtime)}".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class PredictionCache(SQLiteLRUCache):
+    table = "prediction"
+    version_column = "model_id"
+    label = "Prediction cache"
+
+    def __init__(self, model_id: str, max_entries: int = 10000, disk_path: Optional[str] = None,
+                 disk_entries: Optional[int] = 100000):
+        # disk_entries = batas baris tier disk (eviction LRU); None = tanpa batas
+        super().__init__(model_id, memory_entries=max_entries, disk_entries=disk_entries, disk_path=disk_path)
+        self.max_entries = self.memory_entries
+
+    @property
+    def model_id(self) -> str:
+        return self.version
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\x00{normalize_for_key(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[Any]:
+        return super().get(self.key(text))
+
+    def put(self, text: str, value: Any):
+        super().put(self.key(text), value)
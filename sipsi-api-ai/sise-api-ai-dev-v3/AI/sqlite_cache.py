@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+# ==== cache dua tier: LRU memori + SQLite di disk ====
+# Dasar PredictionCache (prediction_cache.py) dan ExtractCache (extract_cache.py).
+# Tier 1: LRU di memori (per worker). Tier 2 (opsional): SQLite di disk, bertahan setelah restart
+# dan dipakai bersama semua worker gunicorn. Setiap entri ditandai versi (model/ekstraktor);
+# entri versi lain dibuang saat start. disk_entries membatasi jumlah baris di disk dengan
+# eviction LRU (kolom used = waktu terakhir dibaca/ditulis); None = tanpa batas.
+# Kolom used TIDAK ditulis di setiap hit: hanya kalau nilainya lebih tua dari touch_interval,
+# dan penulisannya dikumpulkan lalu di-commit sekaligus paling cepat tiap touch_interval.
+# Subclass menentukan nama tabel, nama kolom versi, dan nama untuk log.
+
+class SQLiteLRUCache:
+    table = "cache"
+    version_column = "version"
+    label = "Cache"
+    touch_interval = 60.0
+
+    def __init__(self, version: str, memory_entries: int, disk_entries: Optional[int] = None,
+                 disk_path: Optional[str] = None):
+        self.version = version
+        self.memory_entries = max(0, int(memory_entries))
+        self.disk_entries = None if disk_entries is None else max(0, int(disk_entries))
+        self.disk_path = disk_path or None
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._conn = None
+        self._conn_pid = None
+        self._touched: Dict[str, float] = {}
+        self._touch_flushed = time.monotonic()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.disk_path:
+            self._purge_stale()
+
+    # --- tier disk ---
+    def _db(self):
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.disk_path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, "
+                f"{self.version_column} TEXT NOT NULL, value TEXT NOT NULL, used REAL NOT NULL)"
+            )
+            # tabel dari versi lama (tanpa kolom used): tambahkan, entri lama dianggap paling lama
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({self.table})")}
+            if "used" not in columns:
+                self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN used REAL NOT NULL DEFAULT 0")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_used ON {self.table} (used)")
+            self._conn_pid = os.getpid()
+            self._touched = {}
+        return self._conn
+
+    def _purge_stale(self):
+        # versi berganti -> entri lama tidak akan pernah kena lagi, buang semua
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(f"DELETE FROM {self.table} WHERE {self.version_column} != ?", (self.version,))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"{self.label}: disk tier disabled ({e})")
+            self.disk_path = None
+
+    def _disk_get(self, key: str):
+        try:
+            conn = self._db()
+            row = conn.execute(f"SELECT value, used FROM {self.table} WHERE key = ? AND {self.version_column} = ?",
+                               (key, self.version)).fetchone()
+            if row:
+                now = time.time()
+                if now - row[1] >= self.touch_interval:
+                    self._touched[key] = now
+                if self._touched and time.monotonic() - self._touch_flushed >= self.touch_interval:
+                    self._flush_touched(conn)
+                    conn.commit()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _flush_touched(self, conn):
+        # tanpa commit: pemanggil yang commit (sekalian dengan tulisan lain)
+        if self._touched:
+            conn.executemany(f"UPDATE {self.table} SET used = ? WHERE key = ?",
+                             [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+        self._touch_flushed = time.monotonic()
+
+    def _disk_put(self, key: str, value: Any):
+        try:
+            conn = self._db()
+            self._touched.pop(key, None)
+            conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, {self.version_column}, value, used) "
+                         f"VALUES (?, ?, ?, ?)", (key, self.version, json.dumps(value), time.time()))
+            if self.disk_entries is not None:
+                (count,) = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+                if count > self.disk_entries:
+                    # waktu baca yang masih tertunda ditulis dulu supaya yang dibuang benar yang paling lama
+                    self._flush_touched(conn)
+                    conn.execute(f"DELETE FROM {self.table} WHERE key IN "
+                                 f"(SELECT key FROM {self.table} ORDER BY used ASC LIMIT ?)",
+                                 (count - self.disk_entries,))
+                    self.evictions += count - self.disk_entries
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    # --- API ---
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return self._lru[key]
+            value = self._disk_get(key) if self.disk_path else None
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._remember(key, value)
+            if self.disk_path:
+                self._disk_put(key, value)
+
+    def _remember(self, key: str, value: Any):
+        if not self.memory_entries:
+            return
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+            if not self.disk_path:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            if self.disk_path:
+                try:
+                    conn = self._db()
+                    conn.execute(f"DELETE FROM {self.table}")
+                    conn.commit()
+                    self._touched = {}
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            entries = len(self._lru)
+            if self.disk_path:
+                try:
+                    entries = self._db().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                self.version_column: self.version,
+                "entries": entries,
+                "max_entries": self.disk_entries if self.disk_path else self.memory_entries,
+                "memory_entries": len(self._lru),
+                "disk_path": self.disk_path,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,131 @@
+import atexit
+import os
+import threading
+import time
+from typing import Callable, List
+
+from fork_reset import ForkResettable
+
+
+# ==== write-behind untuk baris feedback ====
+# Baris dari request tunggal (/api/confirm, /api/correct) dikumpulkan di memori lalu ditulis
+# `flush(rows)` sebagai SATU insert massal + satu commit tiap `interval_ms`, atau lebih cepat
+# kalau sudah `max_rows` baris. Konsekuensi: baris yang belum di-flush hilang kalau proses
+# mati mendadak (flush terakhir dijalankan saat proses keluar normal).
+# Flush gagal (mis. DB mati): baris dikembalikan ke antrean dan dicoba lagi, tapi tiap baris
+# paling banyak `max_retries` kali dan antrean paling banyak `max_pending` baris; sisanya dibuang
+# (dicatat di log + stats "dropped") supaya memori tidak tumbuh tanpa batas.
+class WriteBehindBuffer(ForkResettable):
+    def __init__(self, flush: Callable[[List[dict]], None], interval_ms: float = 500.0,
+                 max_rows: int = 500, max_pending: int = 10000, max_retries: int = 5,
+                 name: str = "write-behind"):
+        self.flush = flush
+        self.interval = max(0.001, float(interval_ms) / 1000.0)
+        self.max_rows = max(1, int(max_rows))
+        self.max_pending = max(self.max_rows, int(max_pending))
+        self.max_retries = max(0, int(max_retries))
+        self.name = name
+        self._pid = None
+        self._reset()
+        atexit.register(self._flush_pending)
+
+    def _reset(self):
+        # dipanggil ulang setelah fork (lihat fork_reset.py); _pid diisi paling akhir
+        self._cond = threading.Condition()
+        self._rows = []      # [(row, jumlah flush gagal)]
+        self._thread = None
+        self._flushes = 0
+        self._written = 0
+        self._errors = 0
+        self._dropped = 0
+        self._last_error = None
+        self._pid = os.getpid()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def add(self, row: dict):
+        self._check_fork()
+        cond = self._cond
+        with cond:
+            self._ensure_worker()
+            self._rows.append((row, 0))
+            overflow = self._trim()
+            if len(self._rows) >= self.max_rows:
+                cond.notify()
+        if overflow:
+            print(f"{self.name}: buffer full ({self.max_pending} rows), dropped {overflow} oldest rows")
+
+    def _trim(self) -> int:
+        # dipanggil dengan _cond dipegang; buang baris TERTUA kalau antrean melebihi max_pending
+        overflow = len(self._rows) - self.max_pending
+        if overflow <= 0:
+            return 0
+        del self._rows[:overflow]
+        self._dropped += overflow
+        return overflow
+
+    def _take(self) -> List[tuple]:
+        with self._cond:
+            deadline = time.monotonic() + self.interval
+            while len(self._rows) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            rows, self._rows = self._rows, []
+            return rows
+
+    def _write(self, entries: List[tuple]) -> bool:
+        try:
+            self.flush([row for row, _ in entries])
+        except Exception as e:
+            retry = [(row, failures + 1) for row, failures in entries if failures < self.max_retries]
+            given_up = len(entries) - len(retry)
+            with self._cond:
+                # kembalikan ke depan antrean, dicoba lagi pada flush berikutnya
+                self._rows[:0] = retry
+                overflow = self._trim()
+                self._errors += 1
+                self._dropped += given_up
+                self._last_error = f"{type(e).__name__}: {e}"
+            print(f"{self.name}: flush of {len(entries)} rows failed ({self._last_error})")
+            if given_up:
+                print(f"{self.name}: dropped {given_up} rows after {self.max_retries + 1} failed flushes")
+            if overflow:
+                print(f"{self.name}: buffer full ({self.max_pending} rows), dropped {overflow} oldest rows")
+            return False
+        with self._cond:
+            self._flushes += 1
+            self._written += len(entries)
+        return True
+
+    def _run(self):
+        while True:
+            rows = self._take()
+            if rows and not self._write(rows):
+                time.sleep(self.interval)
+
+    def _flush_pending(self):
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            rows, self._rows = self._rows, []
+        if rows:
+            self._write(rows)
+
+    def stats(self) -> dict:
+        self._check_fork()
+        with self._cond:
+            return {
+                "pending": len(self._rows),
+                "flushes": self._flushes,
+                "rows_written": self._written,
+                "errors": self._errors,
+                "rows_dropped": self._dropped,
+                "last_error": self._last_error,
+                "config": {"interval_ms": self.interval * 1000.0, "max_rows": self.max_rows,
+                           "max_pending": self.max_pending, "max_retries": self.max_retries},
+            }